@@ -1,220 +1,213 @@
-﻿import os
-from flask import Flask, send_from_directory, request
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from flask_swagger_ui import get_swaggerui_blueprint
-from flask_smorest import Api
-from datetime import timedelta
-from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
-from db import db, migrate
-
-load_dotenv()
-
-# Import models to register them with SQLAlchemy
-from models.user import UserModel
-from models.bakery import BakeryModel
-from models.product import ProductModel
-from models.surplus_bag import SurplusBagModel
-from models.order import OrderModel
-from models.order_item import OrderItemModel
-from models.review import ReviewModel
-from models.token_blacklist import TokenBlacklist
-
-# Import resources
-from resources.auth import blp as AuthBlueprint
-from resources.users import blp as UsersBlueprint
-from resources.products import blp as ProductsBlueprint
-from resources.orders import blp as OrdersBlueprint
-from resources.reviews import blp as ReviewsBlueprint
-from resources.bakeries import blp as BakeriesBlueprint
-from resources.surplus_bags import blp as SurplusBagsBlueprint
-from resources.recommendations import blp as RecommendationsBlueprint
-from resources.analytics import blp as AnalyticsBlueprint
-
-app = Flask(__name__)
-
-# Configuration
-app.config["API_TITLE"] = "Forni API"
-app.config["API_VERSION"] = "v1"
-app.config["OPENAPI_VERSION"] = "3.0.3"
-app.config["OPENAPI_URL_PREFIX"] = "/"
-app.config["OPENAPI_SWAGGER_UI_PATH"] = "/swagger-ui"
-app.config["OPENAPI_SWAGGER_UI_URL"] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
-app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///forni.db")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# JWT Configuration
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "jwt-secret-key-change-in-production")
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
-app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
-
-# Initialize extensions
-db.init_app(app)
-migrate.init_app(app, db)
-api = Api(app)
-jwt = JWTManager(app)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
-
-# Log all requests
-@app.before_request
-def log_request():
-    import sys
-    import json
-    
-    # Write to file
-    with open('requests.log', 'a') as f:
-        f.write(f"\n>>> {request.method} {request.path}\n")
-        if request.is_json:
-            f.write(f"Body: {json.dumps(request.get_json(), indent=2)}\n")
-    
-    msg = f"\n>>> Incoming {request.method} request to {request.path}"
-    print(msg, flush=True)
-    sys.stdout.flush()
-    if request.method == "POST" and request.is_json:
-        data_msg = f">>> Request body: {request.get_json()}"
-        print(data_msg, flush=True)
-        sys.stdout.flush()
-    print("", flush=True)
-
-# Add error handler for better debugging
-@app.errorhandler(422)
-def handle_unprocessable_entity(err):
-    # Get validation errors from flask-smorest
-    exc = err.data.get("errors", {})
-    with open('validation_errors.log', 'a') as f:
-        import json
-        f.write("\n" + "="*60 + "\n")
-        f.write("422 VALIDATION ERROR\n")
-        f.write(f"Errors: {json.dumps(exc, indent=2)}\n")
-        f.write(f"Full error data: {json.dumps(err.data, indent=2)}\n")
-        f.write("="*60 + "\n")
-    print("=" * 50, flush=True)
-    print("422 VALIDATION ERROR:", flush=True)
-    print(f"Errors: {exc}", flush=True)
-    print(f"Full error data: {err.data}", flush=True)
-    print("=" * 50, flush=True)
-    return {"errors": exc, "message": "Validation failed"}, 422
-
-@app.errorhandler(500)
-def handle_internal_server_error(err):
-    with open('500_errors.log', 'a') as f:
+﻿from flask import Flask, send_from_directory, request
+from db import db, init_db
+
+# Blueprints, in registration order (imported by create_app)
+BLUEPRINTS = (
+    "resources.auth",
+    "resources.users",
+    "resources.products",
+    "resources.orders",
+    "resources.reviews",
+    "resources.bakeries",
+    "resources.surplus_bags",
+    "resources.recommendations",
+    "resources.analytics",
+    "resources.tags",
+    "resources.search",
+    "resources.inventory",
+    "resources.metrics",
+)
+
+
+def create_app(config=None):
+    """
+    Build and configure the Flask app.
+
+    Settings come from config.Config (environment variables); `config` may
+    override them with another config class, an import path or a mapping.
+    Models, resources and extensions are imported here rather than at module
+    level, so importing this module stays cheap.
+    """
+    import click
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from flask_smorest import Api
+    from flask_swagger_ui import get_swaggerui_blueprint
+    from importlib import import_module
+
+    from config import Config
+    from cli import register_commands
+    from utils.request_logging import request_logger
+    from utils.response_cache import response_cache
+    from utils.serialization import init_serialization
+    from utils.token_blocklist import token_blocklist
+    import models  # noqa: F401  (registers every model with SQLAlchemy)
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # Initialize extensions
+    init_db(app)
+    if click.get_current_context(silent=True) is not None:
+        # Only the flask CLI needs `flask db`; web workers skip loading alembic
+        from db import init_migrate
+        init_migrate(app)
+    api = Api(app)
+    jwt = JWTManager(app)
+    token_blocklist.init_app(app)
+    response_cache.init_app(app)
+    init_serialization(app)
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    register_commands(app)
+
+    # Log requests as JSON lines from a background thread (see utils/request_logging.py)
+    request_logger.init_app(app)
+
+    # Add error handler for better debugging
+    @app.errorhandler(422)
+    def handle_unprocessable_entity(err):
+        # Get validation errors from flask-smorest
+        exc = err.data.get("errors", {})
+        with open('validation_errors.log', 'a') as f:
+            import json
+            f.write("\n" + "="*60 + "\n")
+            f.write("422 VALIDATION ERROR\n")
+            f.write(f"Errors: {json.dumps(exc, indent=2)}\n")
+            f.write(f"Full error data: {json.dumps(err.data, indent=2, default=str)}\n")
+            f.write("="*60 + "\n")
+        print("=" * 50, flush=True)
+        print("422 VALIDATION ERROR:", flush=True)
+        print(f"Errors: {exc}", flush=True)
+        print(f"Full error data: {err.data}", flush=True)
+        print("=" * 50, flush=True)
+        return {"errors": exc, "message": "Validation failed"}, 422
+
+    @app.errorhandler(500)
+    def handle_internal_server_error(err):
+        with open('500_errors.log', 'a') as f:
+            import traceback
+            f.write("\n" + "="*60 + "\n")
+            f.write("500 INTERNAL SERVER ERROR\n")
+            f.write(f"Error: {err}\n")
+            f.write(traceback.format_exc())
+            f.write("="*60 + "\n")
+        print("=" * 50, flush=True)
+        print("500 INTERNAL SERVER ERROR:", flush=True)
+        print(f"Error: {err}", flush=True)
         import traceback
-        f.write("\n" + "="*60 + "\n")
-        f.write("500 INTERNAL SERVER ERROR\n")
-        f.write(f"Error: {err}\n")
-        f.write(traceback.format_exc())
-        f.write("="*60 + "\n")
-    print("=" * 50, flush=True)
-    print("500 INTERNAL SERVER ERROR:", flush=True)
-    print(f"Error: {err}", flush=True)
-    import traceback
-    traceback.print_exc()
-    print("=" * 50, flush=True)
-    return {"message": "Internal server error", "error": str(err)}, 500
-
-@app.errorhandler(Exception)
-def handle_exception(err):
-    with open('exceptions.log', 'a') as f:
+        traceback.print_exc()
+        print("=" * 50, flush=True)
+        return {"message": "Internal server error", "error": str(err)}, 500
+
+    @app.errorhandler(Exception)
+    def handle_exception(err):
+        with open('exceptions.log', 'a') as f:
+            import traceback
+            f.write("\n" + "="*60 + "\n")
+            f.write("UNHANDLED EXCEPTION\n")
+            f.write(f"Error: {err}\n")
+            f.write(traceback.format_exc())
+            f.write("="*60 + "\n")
+        print("=" * 50, flush=True)
+        print("UNHANDLED EXCEPTION:", flush=True)
+        print(f"Error: {err}", flush=True)
         import traceback
-        f.write("\n" + "="*60 + "\n")
-        f.write("UNHANDLED EXCEPTION\n")
-        f.write(f"Error: {err}\n")
-        f.write(traceback.format_exc())
-        f.write("="*60 + "\n")
-    print("=" * 50, flush=True)
-    print("UNHANDLED EXCEPTION:", flush=True)
-    print(f"Error: {err}", flush=True)
-    import traceback
-    traceback.print_exc()
-    print("=" * 50, flush=True)
-    return {"message": "An error occurred", "error": str(err)}, 500
-
-# Test endpoint to verify logging works
-@app.route('/test', methods=['GET', 'POST'])
-def test_endpoint():
-    print("\n" + "="*60)
-    print("TEST ENDPOINT HIT!")
-    print(f"Method: {request.method}")
-    print(f"Data: {request.get_json() if request.is_json else 'No JSON'}")
-    print("="*60 + "\n")
-    return {"status": "ok", "message": "Test endpoint working"}
-
-# Serve swagger.json
-@app.route('/swagger.json')
-def swagger_json():
-    return send_from_directory('.', 'swagger.json')
-
-# Serve frontend
-@app.route('/')
-def index():
-    return send_from_directory('static', 'index.html')
-
-# Serve uploaded images
-@app.route('/static/uploads/<folder>/<filename>')
-def uploaded_file(folder, filename):
-    return send_from_directory(f'static/uploads/{folder}', filename)
-
-# Swagger UI configuration
-SWAGGER_URL = '/api/docs'
-API_URL = '/swagger.json'
-swaggerui_blueprint = get_swaggerui_blueprint(
-    SWAGGER_URL,
-    API_URL,
-    config={'app_name': "Forni API"}
-)
-app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
-
-# JWT token blacklist loader
-@jwt.token_in_blocklist_loader
-def check_if_token_in_blacklist(jwt_header, jwt_payload):
-    jti = jwt_payload['jti']
-    token = TokenBlacklist.query.filter_by(jti=jti).first()
-    return token is not None
-
-# JWT error handlers
-@jwt.expired_token_loader
-def expired_token_callback(jwt_header, jwt_payload):
-    return {"message": "Token has expired", "error": "token_expired"}, 401
-
-@jwt.invalid_token_loader
-def invalid_token_callback(error):
-    print("=" * 50)
-    print("INVALID TOKEN ERROR:")
-    print(f"Error: {error}")
-    print("=" * 50)
-    return {"message": "Invalid token", "error": "invalid_token", "details": str(error)}, 401
-
-@jwt.unauthorized_loader
-def missing_token_callback(error):
-    print("=" * 50)
-    print("MISSING TOKEN ERROR:")
-    print(f"Error: {error}")
-    print("=" * 50)
-    return {"message": "Authorization token is missing", "error": "authorization_required"}, 401
-
-@jwt.revoked_token_loader
-def revoked_token_callback(jwt_header, jwt_payload):
-    return {"message": "Token has been revoked", "error": "token_revoked"}, 401
-
-# Register blueprints
-api.register_blueprint(AuthBlueprint)
-api.register_blueprint(UsersBlueprint)
-api.register_blueprint(ProductsBlueprint)
-api.register_blueprint(OrdersBlueprint)
-api.register_blueprint(ReviewsBlueprint)
-api.register_blueprint(BakeriesBlueprint)
-api.register_blueprint(SurplusBagsBlueprint)
-api.register_blueprint(RecommendationsBlueprint)
-api.register_blueprint(AnalyticsBlueprint)
+        traceback.print_exc()
+        print("=" * 50, flush=True)
+        return {"message": "An error occurred", "error": str(err)}, 500
+
+    # Test endpoint to verify logging works
+    @app.route('/test', methods=['GET', 'POST'])
+    def test_endpoint():
+        print("\n" + "="*60)
+        print("TEST ENDPOINT HIT!")
+        print(f"Method: {request.method}")
+        print(f"Data: {request.get_json() if request.is_json else 'No JSON'}")
+        print("="*60 + "\n")
+        return {"status": "ok", "message": "Test endpoint working"}
+
+    # Serve swagger.json
+    @app.route('/swagger.json')
+    def swagger_json():
+        return send_from_directory('.', 'swagger.json')
+
+    # Serve frontend
+    @app.route('/')
+    def index():
+        return send_from_directory('static', 'index.html')
+
+    # Serve uploaded images
+    @app.route('/static/uploads/<folder>/<filename>')
+    def uploaded_file(folder, filename):
+        return send_from_directory(f'static/uploads/{folder}', filename)
+
+    # Swagger UI configuration
+    SWAGGER_URL = '/api/docs'
+    API_URL = '/swagger.json'
+    swaggerui_blueprint = get_swaggerui_blueprint(
+        SWAGGER_URL,
+        API_URL,
+        config={'app_name': "Forni API"}
+    )
+    app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+
+    # JWT token blacklist loader
+    @jwt.token_in_blocklist_loader
+    def check_if_token_in_blacklist(jwt_header, jwt_payload):
+        return token_blocklist.is_revoked(jwt_payload['jti'])
+
+    # JWT error handlers
+    @jwt.expired_token_loader
+    def expired_token_callback(jwt_header, jwt_payload):
+        return {"message": "Token has expired", "error": "token_expired"}, 401
+
+    @jwt.invalid_token_loader
+    def invalid_token_callback(error):
+        print("=" * 50)
+        print("INVALID TOKEN ERROR:")
+        print(f"Error: {error}")
+        print("=" * 50)
+        return {"message": "Invalid token", "error": "invalid_token", "details": str(error)}, 401
+
+    @jwt.unauthorized_loader
+    def missing_token_callback(error):
+        print("=" * 50)
+        print("MISSING TOKEN ERROR:")
+        print(f"Error: {error}")
+        print("=" * 50)
+        return {"message": "Authorization token is missing", "error": "authorization_required"}, 401
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return {"message": "Token has been revoked", "error": "token_revoked"}, 401
+
+    # Register blueprints
+    for module in BLUEPRINTS:
+        api.register_blueprint(import_module(module).blp)
+
+    return app
+
+
+def __getattr__(name):
+    # `from app import app`, FLASK_APP=app.py: build the default app on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
     import sys
     # Disable output buffering
     sys.stdout.reconfigure(line_buffering=True)
     sys.stderr.reconfigure(line_buffering=True)
-    
+
+    app = create_app()
     with app.app_context():
         db.create_all()
     
@@ -0,0 +1,51 @@
+"""
+Cost of a poll that changed nothing: full 200 responses vs 304 Not Modified.
+
+Seeds an in-memory SQLite database (same shape as
+benchmarks/response_cache.py), then polls a bakery page and surplus bag
+listings through the test client. Each URL is timed without validators and
+again with the If-None-Match value from its first response. The response
+cache is disabled, so the 200 path pays for the query and serialization.
+
+Run from the project root:
+    python benchmarks/conditional_get.py [polls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from app import create_app
+from benchmarks.response_cache import seed
+
+URLS = ["/bakery/1", "/surplus_bag", "/surplus_bag?limit=100", "/surplus_bag?bakery_id=2"]
+
+
+def timed(client, url, polls, headers=None):
+    started = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+    return (time.perf_counter() - started) / polls * 1000, response
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    app = create_app({"RESPONSE_CACHE_BACKEND": "none"})
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        print(f"{'url':28s} {'200 ms':>8s} {'bytes':>7s} {'304 ms':>8s}")
+        for url in URLS:
+            full_ms, response = timed(client, url, polls)
+            assert response.status_code == 200, url
+            etag = response.headers["ETag"]
+            cond_ms, cond = timed(client, url, polls, {"If-None-Match": etag})
+            assert cond.status_code == 304, url
+            print(f"{url:28s} {full_ms:8.2f} {len(response.data):7d} {cond_ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: scalar math Haversine loop vs the numpy GeoPointSet kernel.
+
+Run from the project root:
+    python benchmarks/geo_distance.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.geo import GeoPointSet, haversine_km
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    random.seed(42)
+    print("=" * 60)
+    print("Haversine: scalar loop vs vectorized")
+    print("=" * 60)
+
+    for n in (1_000, 10_000, 100_000):
+        # Points scattered over Tunisia
+        rows = [(i, random.uniform(30.2, 37.5), random.uniform(7.5, 11.6)) for i in range(n)]
+        points = GeoPointSet.from_rows(rows)
+        origin = (36.8065, 10.1815)
+
+        scalar = timed(lambda: [haversine_km(origin[0], origin[1], lat, lng) for _, lat, lng in rows])
+        vector = timed(lambda: points.distances(*origin))
+        print(f"\n{n:>7} points  one origin")
+        print(f"   scalar loop: {scalar * 1000:9.2f} ms")
+        print(f"   numpy:       {vector * 1000:9.2f} ms   ({scalar / vector:.0f}x)")
+
+    # Multi-origin: nearest 5 bakeries for each of 500 user locations
+    rows = [(i, random.uniform(30.2, 37.5), random.uniform(7.5, 11.6)) for i in range(10_000)]
+    points = GeoPointSet.from_rows(rows)
+    origins = [(random.uniform(30.2, 37.5), random.uniform(7.5, 11.6)) for _ in range(500)]
+
+    def scalar_nearest():
+        for o_lat, o_lng in origins:
+            sorted(rows, key=lambda r: haversine_km(o_lat, o_lng, r[1], r[2]))[:5]
+
+    scalar = timed(scalar_nearest, repeat=1)
+    vector = timed(lambda: points.nearest_many(origins, n=5))
+    print("\n500 origins x 10000 points, nearest 5")
+    print(f"   scalar loop: {scalar * 1000:9.2f} ms")
+    print(f"   numpy:       {vector * 1000:9.2f} ms   ({scalar / vector:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
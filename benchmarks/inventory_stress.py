@@ -0,0 +1,142 @@
+"""
+Concurrent-order stress test for surplus bag inventory: many clients race to
+buy (or hold, then buy) the same few bags. Afterwards every bag must satisfy
+
+    quantity_available >= 0
+    initial stock == quantity_available + bags sold + bags still held
+
+i.e. nothing was oversold and no stock was lost. Exits 1 otherwise.
+
+Run from the project root (SQLite file in a temp dir by default):
+    python benchmarks/inventory_stress.py
+    python benchmarks/inventory_stress.py --database-url postgresql://... --clients 32
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PASSWORD = "Passw0rd!"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=10, help="attempts per client")
+    parser.add_argument("--bags", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=25, help="initial quantity per bag")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URI"] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'stress.db')}"
+    os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+    from werkzeug.security import generate_password_hash
+    from app import app
+    from db import db
+    from models.bakery import BakeryModel
+    from models.inventory_hold import InventoryHoldModel
+    from models.order_item import OrderItemModel
+    from models.surplus_bag import SurplusBagModel
+    from models.user import UserModel
+
+    client = app.test_client()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        owner = UserModel(email="owner@example.com", password_hash="x", role="bakery_owner")
+        db.session.add(owner)
+        db.session.flush()
+        bakery = BakeryModel(name="Stress Bakery", owner_id=owner.id)
+        db.session.add(bakery)
+        db.session.flush()
+        now = datetime.utcnow()
+        bags = [
+            SurplusBagModel(bakery_id=bakery.id, title=f"Bag {i}", original_value=10, sale_price=4,
+                            quantity_available=args.stock, pickup_start=now,
+                            pickup_end=now + timedelta(hours=3))
+            for i in range(args.bags)
+        ]
+        db.session.add_all(bags)
+        password_hash = generate_password_hash(PASSWORD)
+        db.session.add_all(
+            UserModel(email=f"client{i}@example.com", password_hash=password_hash, role="customer")
+            for i in range(args.clients)
+        )
+        db.session.commit()
+        bakery_id = bakery.id
+        bag_ids = [b.id for b in bags]
+
+    tokens = []
+    for i in range(args.clients):
+        login = client.post("/login", json={"email": f"client{i}@example.com", "password": PASSWORD})
+        tokens.append({"Authorization": "Bearer " + login.get_json()["access_token"]})
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.clients)
+
+    def record(key):
+        with lock:
+            outcomes[key] += 1
+
+    def worker(n):
+        rnd = random.Random(n)
+        headers = tokens[n]
+        barrier.wait()
+        for _ in range(args.orders):
+            items = [{"surplus_bag_id": b, "quantity": rnd.randint(1, 2)}
+                     for b in rnd.sample(bag_ids, rnd.randint(1, len(bag_ids)))]
+            mode = rnd.choice(("direct", "direct", "hold", "abandon"))
+            if mode == "direct":
+                r = client.post("/order", json={"bakery_id": bakery_id, "items": items}, headers=headers)
+            else:
+                r = client.post("/inventory/hold", json={"items": items}, headers=headers)
+                if r.status_code == 201 and mode == "hold":
+                    hold_id = r.get_json()["hold_id"]
+                    r = client.post("/order", json={"bakery_id": bakery_id, "items": items, "hold_id": hold_id},
+                                    headers=headers)
+            record(f"{mode} {r.status_code}")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ok = True
+    with app.app_context():
+        print(f"{args.clients} clients x {args.orders} attempts in {elapsed:.2f}s")
+        for key, count in sorted(outcomes.items()):
+            print(f"  {key:<12} {count}")
+        print(f"\n{'bag':>5}{'stock':>8}{'sold':>8}{'held':>8}{'total':>8}")
+        for bag_id in bag_ids:
+            stock = db.session.get(SurplusBagModel, bag_id).quantity_available
+            sold = db.session.query(db.func.coalesce(db.func.sum(OrderItemModel.quantity), 0)).filter(
+                OrderItemModel.surplus_bag_id == bag_id).scalar()
+            held = db.session.query(db.func.coalesce(db.func.sum(InventoryHoldModel.quantity), 0)).filter(
+                InventoryHoldModel.surplus_bag_id == bag_id).scalar()
+            total = stock + sold + held
+            good = stock >= 0 and total == args.stock
+            ok &= good
+            print(f"{bag_id:>5}{stock:>8}{sold:>8}{held:>8}{total:>8}  {'ok' if good else 'OVERSOLD/LOST'}")
+
+    print("\nPASS: no overselling" if ok else "\nFAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
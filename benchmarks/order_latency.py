@@ -0,0 +1,87 @@
+"""
+Order-creation latency and query count against basket size.
+
+Posts baskets of N distinct products/bags to POST /order on an in-memory
+SQLite database and reports the median latency and the number of SQL
+statements per order. With batched item resolution the statement count is
+flat in N apart from the INSERTs of the order items themselves.
+
+Run from the project root:
+    python benchmarks/order_latency.py
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import app
+from db import db
+from models.bakery import BakeryModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+
+BASKET_SIZES = (1, 5, 10, 20, 50)
+REPEAT = 15
+PASSWORD = "Passw0rd!"
+
+
+def seed(max_items):
+    db.create_all()
+    customer = UserModel(email="c@example.com", password_hash=generate_password_hash(PASSWORD), role="customer")
+    owner = UserModel(email="o@example.com", password_hash="x", role="bakery_owner")
+    db.session.add_all([customer, owner])
+    db.session.flush()
+    bakery = BakeryModel(name="Bench Bakery", owner_id=owner.id)
+    db.session.add(bakery)
+    db.session.flush()
+    now = datetime.utcnow()
+    products = [ProductModel(bakery_id=bakery.id, name=f"Bread {i}", price="1.35") for i in range(max_items)]
+    bags = [
+        SurplusBagModel(bakery_id=bakery.id, title=f"Bag {i}", original_value=10, sale_price="3.99",
+                        quantity_available=1_000_000, pickup_start=now, pickup_end=now + timedelta(hours=3))
+        for i in range(max_items)
+    ]
+    db.session.add_all(products + bags)
+    db.session.commit()
+    return bakery.id, [p.id for p in products], [b.id for b in bags]
+
+
+def main():
+    client = app.test_client()
+    with app.app_context():
+        bakery_id, product_ids, bag_ids = seed(max(BASKET_SIZES))
+    login = client.post("/login", json={"email": "c@example.com", "password": PASSWORD})
+    headers = {"Authorization": "Bearer " + login.get_json()["access_token"]}
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    print(f"{'items':>6}{'median ms':>12}{'queries':>10}")
+    for size in BASKET_SIZES:
+        # Half products, half bags
+        items = [{"product_id": pid, "quantity": 2} for pid in product_ids[: (size + 1) // 2]]
+        items += [{"surplus_bag_id": bid, "quantity": 1} for bid in bag_ids[: size // 2]]
+        body = {"bakery_id": bakery_id, "items": items}
+
+        timings = []
+        for _ in range(REPEAT):
+            statements.clear()
+            start = time.perf_counter()
+            response = client.post("/order", json=body, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 201, response.get_json()
+        print(f"{size:>6}{statistics.median(timings):>12.2f}{len(statements):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Query-count check for the list endpoints: the number of SQL statements per
+request must not grow with the number of rows returned (no N+1 lazy loads).
+
+Seeds an in-memory SQLite database at two sizes and fails (exit 1) if any
+endpoint issues more queries for the larger one.
+
+Run from the project root:
+    python benchmarks/query_counts.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ.setdefault("REQUEST_LOG_ENABLED", "false")
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import app
+from db import db
+from models.bakery import BakeryModel
+from models.order import OrderModel
+from models.order_item import OrderItemModel
+from models.product import ProductModel
+from models.review import ReviewModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+
+ENDPOINTS = ["/order", "/review", "/bakery/1/reviews", "/product", "/surplus_bag"]
+PASSWORD = "Passw0rd!"
+
+
+def seed(n):
+    db.drop_all()
+    db.create_all()
+    admin = UserModel(email="admin@example.com", password_hash=generate_password_hash(PASSWORD), role="admin")
+    db.session.add(admin)
+    now = datetime.utcnow()
+    for i in range(n):
+        # Distinct users/bakeries per row so lazy loads can't hit the identity map
+        user = UserModel(email=f"user{i}@example.com", password_hash="x", role="customer")
+        owner = UserModel(email=f"owner{i}@example.com", password_hash="x", role="bakery_owner")
+        db.session.add_all([user, owner])
+        db.session.flush()
+        bakery = BakeryModel(name=f"Bakery {i}", owner_id=owner.id, city="Tunis")
+        db.session.add(bakery)
+        db.session.flush()
+        product = ProductModel(bakery_id=bakery.id, name=f"Bread {i}", price=1.5)
+        bag = SurplusBagModel(
+            bakery_id=bakery.id, title=f"Bag {i}", original_value=10, sale_price=4,
+            quantity_available=5, pickup_start=now, pickup_end=now + timedelta(hours=2),
+        )
+        db.session.add_all([product, bag])
+        db.session.flush()
+        order = OrderModel(user_id=user.id, bakery_id=bakery.id, surplus_bag_id=bag.id,
+                           total_price=5.5, status="completed")
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            OrderItemModel(order_id=order.id, product_id=product.id, quantity=1, unit_price=1.5, subtotal=1.5),
+            OrderItemModel(order_id=order.id, surplus_bag_id=bag.id, quantity=1, unit_price=4, subtotal=4),
+            # All reviews on bakery 1 so /bakery/1/reviews grows with n too
+            ReviewModel(user_id=user.id, bakery_id=1, rating=4),
+        ])
+    db.session.commit()
+
+
+def count_queries(client, headers, path):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+    assert response.status_code == 200, (path, response.status_code, response.get_data(as_text=True))
+    return len(statements), len(response.get_json())
+
+
+def main():
+    client = app.test_client()
+    results = {}
+    for n in (5, 50):
+        with app.app_context():
+            seed(n)
+            login = client.post("/login", json={"email": "admin@example.com", "password": PASSWORD})
+            headers = {"Authorization": "Bearer " + login.get_json()["access_token"]}
+            # Warm per-process caches (token blocklist etc.) outside the measurement
+            client.get("/order", headers=headers)
+            for path in ENDPOINTS:
+                results.setdefault(path, []).append(count_queries(client, headers, path))
+
+    failed = False
+    print(f"{'endpoint':<22}{'rows':>12}{'queries':>12}")
+    for path, ((q_small, rows_small), (q_large, rows_large)) in results.items():
+        status = "ok" if q_large <= q_small else "GROWS WITH ROWS"
+        failed |= q_large > q_small
+        print(f"{path:<22}{rows_small:>5} ->{rows_large:>4}{q_small:>6} ->{q_large:>4}  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
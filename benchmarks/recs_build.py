@@ -0,0 +1,126 @@
+"""
+Throughput of the batch recommendation build against per-user scoring.
+
+Seeds an in-memory SQLite database with bakeries, tagged surplus bags,
+users and order history, then times `recommendations.build()` (chunked
+matrix scoring) and the per-user path the endpoint falls back to
+(user_affinity + score_bags for each user). Exits with status 1 if the two
+paths rank any sampled user's bags differently.
+
+Run from the project root:
+    python benchmarks/recs_build.py [users]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from sqlalchemy import insert
+
+from app import app
+from db import db
+from models.bakery import BakeryModel
+from models.order import OrderModel
+from models.order_item import OrderItemModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+from models.user_recommendation import UserRecommendationModel
+from utils import recommendations
+
+BAKERIES = 60
+BAGS_PER_BAKERY = 8
+ORDERS_PER_USER = 6
+TAGS = ["vegan", "sweet", "savory", "bread", "pastry", "gluten-free", "breakfast", "cake"]
+SAMPLE = 50
+
+
+def seed(users):
+    rng = random.Random(7)
+    db.create_all()
+    now = datetime.utcnow()
+    owner = UserModel(email="owner@example.com", password_hash="x", role="bakery_owner")
+    db.session.add(owner)
+    db.session.flush()
+    bakeries = [
+        BakeryModel(name=f"Bakery {i}", owner_id=owner.id, latitude=36.7 + rng.random() * 0.3,
+                    longitude=10.0 + rng.random() * 0.3, bayesian_rating=round(2.5 + rng.random() * 2.5, 2))
+        for i in range(BAKERIES)
+    ]
+    db.session.add_all(bakeries)
+    db.session.flush()
+    bags = [
+        SurplusBagModel(bakery_id=b.id, title=f"Bag {b.id}-{j}", tags=",".join(rng.sample(TAGS, 2)),
+                        original_value=10, sale_price=4, quantity_available=20, pickup_start=now,
+                        pickup_end=now + timedelta(hours=rng.randint(1, 48)))
+        for b in bakeries for j in range(BAGS_PER_BAKERY)
+    ]
+    db.session.add_all(bags)
+    db.session.commit()
+
+    db.session.execute(insert(UserModel.__table__), [
+        {"email": f"user{i}@example.com", "password_hash": "x", "role": "customer",
+         "latitude": 36.7 + rng.random() * 0.3 if i % 4 else None,
+         "longitude": 10.0 + rng.random() * 0.3 if i % 4 else None}
+        for i in range(users)
+    ])
+    user_ids = [u for (u,) in db.session.query(UserModel.id).filter(UserModel.role == "customer")]
+    orders, items = [], []
+    order_id = 0
+    for user_id in user_ids:
+        for _ in range(rng.randint(1, ORDERS_PER_USER)):
+            order_id += 1
+            bag = rng.choice(bags)
+            orders.append({"id": order_id, "user_id": user_id, "bakery_id": bag.bakery_id, "total_price": 4,
+                           "status": rng.choice(["pending", "completed", "completed", "cancelled"]),
+                           "created_at": now - timedelta(days=rng.randint(0, 60))})
+            items.append({"order_id": order_id, "surplus_bag_id": bag.id, "quantity": rng.randint(1, 3),
+                          "unit_price": 4, "subtotal": 4})
+    db.session.execute(insert(OrderModel.__table__), orders)
+    db.session.execute(insert(OrderItemModel.__table__), items)
+    db.session.commit()
+    return user_ids
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with app.app_context():
+        user_ids = seed(users)
+        print(f"{len(user_ids)} users, {BAKERIES * BAGS_PER_BAKERY} bags")
+
+        stats = recommendations.build(full=True)
+        print(f"batch build:   {stats['users'] / stats['seconds']:8.0f} users/s "
+              f"({stats['rows']} rows in {stats['seconds']:.2f}s)")
+
+        pool = recommendations.CandidatePool.load()
+        now = recommendations._utc_seconds(datetime.utcnow())
+        sample = db.session.query(UserModel).filter(UserModel.id.in_(user_ids[:SAMPLE])).all()
+        started = time.perf_counter()
+        live = {}
+        for user in sample:
+            bakery_weights, tag_weights = recommendations.user_affinity(user.id)
+            scores = recommendations.score_bags(pool, bakery_weights, tag_weights, user.latitude, user.longitude, now)
+            live[user.id] = pool.rank(scores, recommendations.MAX_RECOMMENDATIONS)
+        seconds = time.perf_counter() - started
+        print(f"per-user path: {len(sample) / seconds:8.0f} users/s (sample of {len(sample)})")
+
+        # Same clock for both paths, so the rankings must match exactly
+        batch_scores = recommendations.score_users(pool, [(u.id, u.latitude, u.longitude) for u in sample], now=now)
+        batch_ids, _ = pool.rank_many(batch_scores, recommendations.MAX_RECOMMENDATIONS)
+        mismatches = sum(live[user.id] != ids for user, ids in zip(sample, batch_ids.tolist()))
+        print(f"ranking mismatches: {mismatches}/{len(sample)}")
+
+        stored = db.session.query(UserRecommendationModel.user_id).distinct().count()
+        print(f"users with stored recommendations: {stored}")
+
+        incremental = recommendations.build()
+        print(f"incremental rebuild with no new orders: {incremental['users']} users")
+        return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Replay request log traffic against a running server and report throughput.
+
+Reads both log formats (several files, e.g. one per worker, are replayed
+one after the other):
+  - legacy debug lines: ">>> METHOD /path" optionally followed by
+    "Body: {...}" (multi-line JSON)
+  - JSON lines from utils/request_logging.py ({"method", "path", "query",
+    optional "body"})
+
+The parsed requests are replayed in log order, round-robin across N client
+threads (one keep-alive session each), for a fixed number of requests or
+seconds. Requests carry a bearer token from one login, since logs do not
+store credentials. Reports overall req/s, the status code mix and latency
+percentiles per endpoint.
+
+Example, against a seeded database (python seed.py):
+    gunicorn -c gunicorn.conf.py &
+    python benchmarks/replay_load.py requests-*.log --url http://127.0.0.1:5000 \\
+        --concurrency 16 --duration 30 --methods GET,OPTIONS
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import cycle
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+LEGACY_LINE = re.compile(r"^>>> ([A-Z]+) (\S+)")
+ID_SEGMENT = re.compile(r"/(\d+|undefined|null)(?=/|$)")
+
+
+def parse_log(path):
+    """[(method, path_with_query, json_body_or_None)] in log order"""
+    entries = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+        if line.startswith("{"):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            target = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+            body = entry.get("body") if isinstance(entry.get("body"), (dict, list)) else None
+            entries.append((entry["method"], target, body))
+            continue
+
+        match = LEGACY_LINE.match(line)
+        if not match:
+            continue
+        body = None
+        if i < len(lines) and lines[i].startswith("Body: "):
+            # JSON body spans lines until it parses
+            chunk = [lines[i][len("Body: "):]]
+            i += 1
+            while True:
+                try:
+                    body = json.loads("\n".join(chunk))
+                    break
+                except ValueError:
+                    if i >= len(lines) or lines[i].startswith(">>>"):
+                        break
+                    chunk.append(lines[i])
+                    i += 1
+        entries.append((match.group(1), match.group(2), body))
+    return entries
+
+
+def endpoint(method, target):
+    """Group key for reporting: method plus path with ids collapsed"""
+    return f"{method} {ID_SEGMENT.sub('/<id>', target.split('?')[0])}"
+
+
+def login(url, email, password):
+    response = requests.post(f"{url}/login", json={"email": email, "password": password}, timeout=10)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def replay(url, entries, token, concurrency, total=None, duration=None):
+    """Run the replay; returns (elapsed seconds, [(endpoint, status, seconds)])"""
+    feed = cycle(entries)
+    feed_lock = threading.Lock()
+    results = []
+    results_lock = threading.Lock()
+    sent = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_entry():
+        with feed_lock:
+            if total is not None and sent[0] >= total:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            sent[0] += 1
+            return next(feed)
+
+    def worker():
+        session = requests.Session()
+        # Like browsers, retry idempotent requests once when a recycled
+        # worker closed the keep-alive connection under us
+        session.mount("http://", HTTPAdapter(max_retries=Retry(total=1, read=0, status=0)))
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        local = []
+        while True:
+            entry = next_entry()
+            if entry is None:
+                break
+            method, target, body = entry
+            started = time.perf_counter()
+            try:
+                status = session.request(method, url + target, json=body, headers=headers, timeout=30).status_code
+            except requests.RequestException:
+                status = "error"
+            local.append((endpoint(method, target), status, time.perf_counter() - started))
+        with results_lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, results
+
+
+def report(elapsed, results, top=12):
+    print(f"{len(results)} requests in {elapsed:.1f}s: {len(results) / elapsed:.1f} req/s")
+    statuses = Counter(status for _, status, _ in results)
+    print("status mix: " + ", ".join(f"{s}={n}" for s, n in sorted(statuses.items(), key=str)))
+    latencies = [seconds for _, _, seconds in results]
+    print(f"latency ms: p50={percentile(latencies, 50) * 1000:.1f} "
+          f"p95={percentile(latencies, 95) * 1000:.1f} p99={percentile(latencies, 99) * 1000:.1f}")
+
+    by_endpoint = defaultdict(list)
+    for name, _, seconds in results:
+        by_endpoint[name].append(seconds)
+    print(f"\n{'endpoint':40s} {'count':>7s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for name, values in sorted(by_endpoint.items(), key=lambda item: -len(item[1]))[:top]:
+        print(f"{name:40s} {len(values):7d} {statistics.median(values) * 1000:8.1f} "
+              f"{percentile(values, 95) * 1000:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("log", nargs="*", default=["requests.log"])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default 30)")
+    parser.add_argument("--methods", help="only replay these methods, e.g. GET,OPTIONS")
+    parser.add_argument("--email", default="customer@forni.tn", help="account to replay as (seed.py user)")
+    parser.add_argument("--password", default="Customer123!")
+    parser.add_argument("--no-auth", action="store_true", help="send requests without a token")
+    args = parser.parse_args()
+
+    entries = [entry for path in args.log for entry in parse_log(path)]
+    if args.methods:
+        allowed = {m.strip().upper() for m in args.methods.split(",")}
+        entries = [e for e in entries if e[0] in allowed]
+    # Logins would replace the token's user mid-run and are slow by design (password hashing)
+    entries = [e for e in entries if not (e[0] == "POST" and e[1] == "/login")]
+    if not entries:
+        sys.exit("No requests to replay")
+
+    mix = Counter(endpoint(method, target) for method, target, _ in entries)
+    print(f"{len(entries)} requests parsed from {', '.join(args.log)}, {len(mix)} endpoints; top: "
+          + ", ".join(f"{name} {n / len(entries):.0%}" for name, n in mix.most_common(5)))
+
+    token = None if args.no_auth else login(args.url, args.email, args.password)
+    duration = args.duration if args.duration or args.requests else 30
+    elapsed, results = replay(args.url, entries, token, args.concurrency, args.requests, duration)
+    report(elapsed, results)
+
+
+if __name__ == "__main__":
+    main()
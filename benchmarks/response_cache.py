@@ -0,0 +1,123 @@
+"""
+Public catalog GETs with and without the response cache.
+
+Seeds an in-memory SQLite database with bakeries, products and surplus bags,
+then serves the same request mix (bakery/product/bag listings and bakery
+details) through the test client with each cache backend. A write touching
+one bakery is committed every N requests so invalidation cost is included.
+
+Run from the project root:
+    python benchmarks/response_cache.py [requests] [--redis URL]
+
+--redis also measures the shared backend, e.g. against a local Redis or
+fakeredis' TCP server.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from app import create_app
+from db import db
+from models.bakery import BakeryModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+
+BAKERIES = 100
+PRODUCTS_PER_BAKERY = 10
+BAGS_PER_BAKERY = 4
+WRITE_EVERY = 50
+TAGS = ["bread", "pastry", "vegan", "sweet", "savory"]
+
+
+def seed():
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    db.create_all()
+    owner = UserModel(email="owner@example.com", password_hash="x", role="bakery_owner")
+    db.session.add(owner)
+    db.session.flush()
+    bakeries = [BakeryModel(name=f"Bakery {i}", owner_id=owner.id, city="Tunis") for i in range(BAKERIES)]
+    db.session.add_all(bakeries)
+    db.session.flush()
+    for b in bakeries:
+        db.session.add_all(
+            ProductModel(bakery_id=b.id, name=f"Product {j}", price=2.5, category="bread",
+                         tags=",".join(rng.sample(TAGS, 2)), is_available=True, quantity_available=10)
+            for j in range(PRODUCTS_PER_BAKERY)
+        )
+        db.session.add_all(
+            SurplusBagModel(bakery_id=b.id, title=f"Bag {j}", tags=",".join(rng.sample(TAGS, 2)),
+                            original_value=10, sale_price=4, quantity_available=5,
+                            pickup_start=now, pickup_end=now + timedelta(hours=4))
+            for j in range(BAGS_PER_BAKERY)
+        )
+    db.session.commit()
+
+
+def request_mix(count):
+    """Listings and popular bakery pages, skewed like real traffic"""
+    rng = random.Random(11)
+    urls = []
+    for _ in range(count):
+        roll = rng.random()
+        bakery_id = min(int(rng.paretovariate(1.2)), BAKERIES)
+        if roll < 0.3:
+            urls.append(f"/bakery/{bakery_id}")
+        elif roll < 0.5:
+            urls.append(rng.choice(["/bakery", "/bakery?limit=20", "/bakery?product_tags=vegan"]))
+        elif roll < 0.75:
+            urls.append(rng.choice(["/product", "/product?tags=bread", f"/product?bakery_id={bakery_id}"]))
+        else:
+            urls.append(rng.choice(["/surplus_bag", "/surplus_bag?tags=sweet", f"/surplus_bag?bakery_id={bakery_id}"]))
+    return urls
+
+
+def run(app, label, config, urls):
+    from utils.response_cache import response_cache
+
+    app.config.update(config)
+    response_cache.init_app(app)
+    response_cache.clear()
+    client = app.test_client()
+    rng = random.Random(5)
+    started = time.perf_counter()
+    for i, url in enumerate(urls, 1):
+        assert client.get(url).status_code == 200, url
+        if i % WRITE_EVERY == 0:
+            bag = db.session.get(SurplusBagModel, rng.randint(1, BAKERIES * BAGS_PER_BAKERY))
+            bag.quantity_available = rng.randint(1, 9)
+            db.session.commit()
+    elapsed = time.perf_counter() - started
+    stats = response_cache.stats()
+    response_cache.clear()
+    print(f"{label:8s} {len(urls) / elapsed:8.0f} req/s  hit ratio {stats['hit_ratio'] or 0:.0%}")
+
+
+def main():
+    args = sys.argv[1:]
+    redis_url = None
+    if "--redis" in args:
+        i = args.index("--redis")
+        redis_url = args[i + 1]
+        del args[i:i + 2]
+    count = int(args[0]) if args else 3000
+    urls = request_mix(count)
+    print(f"{count} requests, {len(set(urls))} distinct URLs, one bag write every {WRITE_EVERY}")
+    app = create_app()
+    with app.app_context():
+        seed()
+        run(app, "none", {"RESPONSE_CACHE_BACKEND": "none"}, urls)
+        run(app, "memory", {"RESPONSE_CACHE_BACKEND": "memory"}, urls)
+        if redis_url:
+            run(app, "redis", {"RESPONSE_CACHE_BACKEND": "redis", "RESPONSE_CACHE_URL": redis_url}, urls)
+
+
+if __name__ == "__main__":
+    main()
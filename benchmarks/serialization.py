@@ -0,0 +1,113 @@
+"""
+Schema dumps per second: marshmallow's stock dump() against the compiled
+dumps (utils/serialization.py), and JSON encoding with the stdlib against
+orjson.
+
+Seeds an in-memory SQLite database (bakeries with products and bags, orders
+with items) and loads the rows up front so only serialization is timed,
+checks both paths produce the same output, then dumps each response schema
+repeatedly.
+
+Run from the project root:
+    python benchmarks/serialization.py [seconds per case]
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from marshmallow import Schema
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import create_app
+from benchmarks.response_cache import seed
+from db import db
+from models.bakery import BakeryModel
+from models.order import OrderModel
+from models.order_item import OrderItemModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+from schemas import BakeryDetailSchema, BakerySchema, OrderSchema, ProductSchema, SurplusBagSchema
+
+ROWS = 50
+
+
+def build():
+    """Loaded rows (every attribute the schemas read already fetched), per schema"""
+    seed()
+    customer = UserModel(email="customer@example.com", password_hash="x", first_name="Amel")
+    db.session.add(customer)
+    db.session.flush()
+    for bakery_id in range(1, ROWS + 1):
+        product = ProductModel.query.filter_by(bakery_id=bakery_id).first()
+        bag = SurplusBagModel.query.filter_by(bakery_id=bakery_id).first()
+        order = OrderModel(user_id=customer.id, bakery_id=bakery_id, status="confirmed", total_price=10.5,
+                           pickup_code=f"CODE{bakery_id}")
+        order.order_items = [
+            OrderItemModel(product_id=product.id, quantity=1, unit_price=2.5, subtotal=2.5),
+            OrderItemModel(surplus_bag_id=bag.id, quantity=2, unit_price=4, subtotal=8),
+        ]
+        db.session.add(order)
+    db.session.commit()
+
+    bakeries = BakeryModel.query.order_by(BakeryModel.id).limit(ROWS).all()
+    products = ProductModel.query.options(joinedload(ProductModel.bakery)).order_by(ProductModel.id).limit(ROWS).all()
+    bags = SurplusBagModel.query.options(joinedload(SurplusBagModel.bakery)).order_by(SurplusBagModel.id).limit(ROWS).all()
+    orders = OrderModel.query.options(
+        joinedload(OrderModel.user), joinedload(OrderModel.bakery), joinedload(OrderModel.surplus_bag),
+        selectinload(OrderModel.order_items).joinedload(OrderItemModel.product),
+        selectinload(OrderModel.order_items).joinedload(OrderItemModel.surplus_bag),
+    ).order_by(OrderModel.id).all()
+    # Bakery.products / surplus_bags are dynamic (a query per access): the
+    # detail view's children as plain lists
+    detail = SimpleNamespace(**{name: getattr(bakeries[0], name) for name in BakerySchema().dump_fields},
+                             products=bakeries[0].products.all(), surplus_bags=bakeries[0].surplus_bags.all())
+    return {
+        "BakerySchema(many)": (BakerySchema(many=True), bakeries),
+        "BakeryDetailSchema": (BakeryDetailSchema(), detail),
+        "ProductSchema(many)": (ProductSchema(many=True), products),
+        "SurplusBagSchema(many)": (SurplusBagSchema(many=True), bags),
+        "OrderSchema(many)": (OrderSchema(many=True), orders),
+    }
+
+
+def rate(fn, seconds):
+    count, started = 0, time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    app = create_app()
+    with app.app_context():
+        cases = build()
+        print(f"{'schema':26s} {'stock/s':>9s} {'compiled/s':>11s} {'speedup':>8s}   "
+              f"{'json/s':>8s} {'orjson/s':>9s} {'speedup':>8s}")
+        for name, (schema, obj) in cases.items():
+            compiled = schema.dump(obj)
+            stock = Schema.dump(schema, obj)
+            assert compiled == stock, f"{name}: compiled output differs"
+            slow = rate(lambda: Schema.dump(schema, obj), seconds)
+            fast = rate(lambda: schema.dump(obj), seconds)
+            stdlib = rate(lambda: json.dumps(compiled, sort_keys=True, separators=(",", ":")), seconds)
+            orjson = None
+            if hasattr(app.json, "_orjson"):
+                orjson = rate(lambda: app.json.dumps(compiled, separators=(",", ":")), seconds)
+            print(f"{name:26s} {slow:9.0f} {fast:11.0f} {fast / slow:7.1f}x   {stdlib:8.0f} "
+                  + (f"{orjson:9.0f} {orjson / stdlib:7.1f}x" if orjson else "  (no orjson)"))
+        print(f"\n(many) schemas dump {ROWS} rows per call; the detail dump includes 10 products and 4 bags")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+List endpoints with and without sparse fieldsets (?fields= / ?exclude=).
+
+Seeds an in-memory SQLite database (same shape as
+benchmarks/serialization.py, with description texts filled in), then
+requests each list page in full and with the fields a catalog card or an
+order summary actually shows. Reports the payload size, the columns the
+page's SELECTs fetch and the time per request. The response cache is
+disabled, so every request pays for its queries and serialization.
+
+Run from the project root:
+    python benchmarks/sparse_fieldsets.py [requests per url]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+os.environ["REQUEST_LOG_ENABLED"] = "false"
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, update
+
+from app import create_app
+from benchmarks.serialization import build
+from db import db
+from models.bakery import BakeryModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from models.user import UserModel
+
+DESCRIPTION = "Stone-milled flour, slow fermented overnight and baked in a wood-fired oven. " * 4
+
+CASES = [
+    ("/product?limit=100", "fields=id,name,price,image_url"),
+    ("/product?limit=100", "exclude=description,bakery"),
+    ("/surplus_bag?limit=100", "fields=id,title,sale_price,pickup_end,bakery.name"),
+    ("/bakery?limit=100", "fields=id,name,city,rating,image_url"),
+    ("/order?limit=50", "fields=id,status,total_price,pickup_code,bakery.name"),
+]
+
+
+def timed(client, url, count, headers):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the order list logs every call
+        for _ in range(count):
+            response = client.get(url, headers=headers)
+    assert response.status_code == 200, url
+    return (time.perf_counter() - started) / count * 1000, response
+
+
+def selected_columns(client, url, headers):
+    """Columns fetched by the SELECTs serving `url`"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", record)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.get(url, headers=headers)
+    event.remove(db.engine, "before_cursor_execute", record)
+    return sum(s.split(" FROM ", 1)[0].count(",") + 1 for s in statements if s.startswith("SELECT"))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = create_app({"RESPONSE_CACHE_BACKEND": "none"})
+    with app.app_context():
+        build()
+        for model in (BakeryModel, ProductModel, SurplusBagModel):
+            db.session.execute(update(model).values(description=DESCRIPTION))
+        db.session.commit()
+        customer = UserModel.query.filter_by(email="customer@example.com").one()
+        headers = {"Authorization": "Bearer " + create_access_token(
+            identity=str(customer.id), additional_claims={"role": customer.role})}
+
+        client = app.test_client()
+        print(f"{'request':62s} {'bytes':>8s} {'columns':>8s} {'ms':>7s}")
+        for url, fieldset in CASES:
+            for label, target in (("full", url), (fieldset, f"{url}&{fieldset}")):
+                ms, response = timed(client, target, count, headers)
+                columns = selected_columns(client, target, headers)
+                name = url if label == "full" else f"  {label}"
+                print(f"{name:62s} {len(response.data):8d} {columns:8d} {ms:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
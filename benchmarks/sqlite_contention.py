@@ -0,0 +1,131 @@
+"""
+SQLite lock contention between worker processes, with and without the
+connection PRAGMAs from db.sqlite_pragmas.
+
+Starts N processes (like gunicorn sync workers) against one database file.
+Each runs a request-like mix for a fixed time: mostly reads that scan the
+orders table, plus short write transactions (insert an order, update a
+bag's stock). Meanwhile one more process holds a long write transaction,
+like a maintenance rebuild. Reports completed operations per second and
+how many reads and writes failed with "database is locked", once with
+SQLAlchemy's defaults and once tuned.
+
+Run from the project root:
+    python benchmarks/sqlite_contention.py [processes] [seconds]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from db import sqlite_pragmas
+
+WRITE_RATIO = 0.3
+# A maintenance job (e.g. a full rebuild) holding one write transaction
+BATCH_SECONDS = 3
+SCHEMA = [
+    "CREATE TABLE bags (id INTEGER PRIMARY KEY, stock INTEGER NOT NULL)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, bag_id INTEGER NOT NULL, "
+    "total REAL NOT NULL, note TEXT, created_at REAL NOT NULL)",
+    "CREATE INDEX ix_orders_bag_id ON orders (bag_id)",
+]
+
+
+def make_engine(path, tuned):
+    engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        event.listen(engine, "connect", sqlite_pragmas(vars(Config)))
+    return engine
+
+
+def setup(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO bags (id, stock) VALUES (:id, 1000000)"),
+                     [{"id": i} for i in range(1, 201)])
+        conn.execute(text("INSERT INTO orders (bag_id, total, note, created_at) VALUES (:b, 4.5, :n, 0)"),
+                     [{"b": i % 200 + 1, "n": "x" * 200} for i in range(5000)])
+    engine.dispose()
+
+
+def worker(path, tuned, seconds, seed, queue):
+    rng = random.Random(seed)
+    engine = make_engine(path, tuned)
+    done = 0
+    locked = {"read": 0, "write": 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        bag_id = rng.randint(1, 200)
+        kind = "write" if rng.random() < WRITE_RATIO else "read"
+        try:
+            if kind == "write":
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO orders (bag_id, total, note, created_at) "
+                                      "VALUES (:b, 4.5, :n, :t)"), {"b": bag_id, "n": "x" * 200, "t": time.time()})
+                    conn.execute(text("UPDATE bags SET stock = stock - 1 WHERE id = :b"), {"b": bag_id})
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT bag_id, count(*), sum(total) FROM orders "
+                                      "GROUP BY bag_id ORDER BY 2 DESC LIMIT 10")).all()
+            done += 1
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            locked[kind] += 1
+    queue.put((done, locked))
+
+
+def batch_job(path, tuned, queue):
+    """One long write transaction, large enough to spill SQLite's page cache"""
+    engine = make_engine(path, tuned)
+    rows = 0
+    time.sleep(1)
+    deadline = time.perf_counter() + BATCH_SECONDS
+    with engine.begin() as conn:
+        while time.perf_counter() < deadline:
+            conn.execute(text("INSERT INTO orders (bag_id, total, note, created_at) VALUES (:b, 1, :n, 0)"),
+                         [{"b": i % 200 + 1, "n": "y" * 200} for i in range(1000)])
+            rows += 1000
+    queue.put((0, {"read": 0, "write": 0}))
+
+
+def run(processes, seconds, tuned):
+    path = os.path.join(tempfile.mkdtemp(), "contention.db")
+    setup(path)
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(path, tuned, seconds, i, queue))
+             for i in range(processes)]
+    procs.append(multiprocessing.Process(target=batch_job, args=(path, tuned, queue)))
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    done = sum(r[0] for r in results)
+    locked_reads = sum(r[1]["read"] for r in results)
+    locked_writes = sum(r[1]["write"] for r in results)
+    label = "tuned (WAL, NORMAL, busy_timeout)" if tuned else "defaults (rollback journal)"
+    print(f"{label:36s} {done / seconds:8.0f} ops/s  locked errors: "
+          f"{locked_reads} reads, {locked_writes} writes")
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{processes} processes, {seconds:.0f}s each, {WRITE_RATIO:.0%} writes")
+    run(processes, seconds, tuned=False)
+    run(processes, seconds, tuned=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Worker cold start: time from interpreter start to the first served request.
+
+Each run is a fresh Python process that imports the app module, builds the
+app with create_app(), creates the schema on an in-memory SQLite database
+and serves one GET /bakery through the test client. Reports the median of
+each phase over several runs.
+
+Run from the project root:
+    python benchmarks/startup.py [runs] [--repo PATH]
+
+--repo points at another checkout (e.g. a `git worktree` of an older
+commit) to compare; checkouts without create_app fall back to `app.app`.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app as app_module
+t_import = time.perf_counter()
+if hasattr(app_module, "create_app"):
+    app = app_module.create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "REQUEST_LOG_ENABLED": False})
+else:
+    app = app_module.app
+t_app = time.perf_counter()
+from db import db
+with app.app_context():
+    db.create_all()
+response = app.test_client().get("/bakery")
+t_first = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    "import": t_import - t0,
+    "create_app": t_app - t_import,
+    "first_request": t_first - t_app,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def run_once(repo):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI="sqlite://", REQUEST_LOG_ENABLED="false")
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, repo], env=env, cwd=repo,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    wall = time.perf_counter() - started
+    # Handlers may print to stdout; the timings are the last line
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process"] = wall
+    return timings
+
+
+def main():
+    args = sys.argv[1:]
+    repo = os.path.abspath(ROOT)
+    if "--repo" in args:
+        i = args.index("--repo")
+        repo = os.path.abspath(args[i + 1])
+        del args[i:i + 2]
+    runs = int(args[0]) if args else 7
+
+    run_once(repo)  # warm the filesystem cache and .pyc files
+    results = [run_once(repo) for _ in range(runs)]
+    print(f"{repo} ({runs} runs, medians)")
+    for phase in ("import", "create_app", "first_request", "process"):
+        print(f"  {phase:14s} {statistics.median(r[phase] for r in results) * 1000:8.1f} ms")
+    print(f"  {'modules':14s} {statistics.median(r['modules'] for r in results):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
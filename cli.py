@@ -0,0 +1,125 @@
+"""
+Maintenance commands, registered on the app's `flask` CLI.
+
+    flask tags rebuild
+    flask search rebuild
+    flask tokens purge
+    flask inventory release
+    flask ratings rebuild
+    flask analytics rebuild
+    flask recs build [--full]
+    flask templates rebuild
+"""
+import click
+from flask.cli import AppGroup
+from db import db
+
+tags_cli = AppGroup("tags", help="Normalized tag index maintenance.")
+search_cli = AppGroup("search", help="Full-text search index maintenance.")
+tokens_cli = AppGroup("tokens", help="Revoked token blocklist maintenance.")
+inventory_cli = AppGroup("inventory", help="Surplus bag hold maintenance.")
+ratings_cli = AppGroup("ratings", help="Bakery rating aggregates.")
+analytics_cli = AppGroup("analytics", help="Daily analytics rollups.")
+recs_cli = AppGroup("recs", help="Precomputed surplus bag recommendations.")
+templates_cli = AppGroup("templates", help="Product template catalog.")
+
+
+@tags_cli.command("rebuild")
+def rebuild_tags():
+    """Re-sync the tag tables from every product's and bag's `tags` column."""
+    from models.product import ProductModel
+    from models.surplus_bag import SurplusBagModel
+
+    db.create_all()  # creates the tag tables on databases that predate them
+    for model in (ProductModel, SurplusBagModel):
+        count = 0
+        for obj in model.query.yield_per(500):
+            obj.sync_tags(db.session)
+            count += 1
+        db.session.commit()
+        click.echo(f"Indexed tags for {count} {model.__tablename__}")
+
+
+@search_cli.command("rebuild")
+def rebuild_search():
+    """Drop and re-index every bakery, product and surplus bag."""
+    from utils.search import search_index
+
+    counts = search_index.rebuild(db.engine)
+    for kind, count in counts.items():
+        click.echo(f"Indexed {count} {kind} documents")
+
+
+@tokens_cli.command("purge")
+def purge_tokens():
+    """Delete blocklist rows for tokens that have expired anyway."""
+    from utils.token_blocklist import token_blocklist
+
+    deleted = token_blocklist.purge_expired()
+    click.echo(f"Purged {deleted} expired blocklist entries")
+
+
+@inventory_cli.command("release")
+def release_holds():
+    """Put the bags of every expired hold back on sale."""
+    from utils.inventory import release_expired
+
+    released = release_expired()
+    click.echo(f"Released {released} held bags")
+
+
+@ratings_cli.command("rebuild")
+def rebuild_ratings():
+    """Recompute every bakery's rating aggregates from its reviews."""
+    from utils import ratings
+
+    rated = ratings.rebuild()
+    click.echo(f"Recomputed ratings; {rated} bakeries have reviews")
+
+
+@analytics_cli.command("rebuild")
+def rebuild_analytics():
+    """Recompute the daily bakery rollups from every completed order."""
+    from utils import analytics
+
+    db.create_all()  # creates the rollup table on databases that predate it
+    rows = analytics.rebuild()
+    click.echo(f"Rebuilt {rows} daily bakery rollups")
+
+
+@recs_cli.command("build")
+@click.option("--full", is_flag=True, help="Rescore every active user, not just those with new orders.")
+@click.option("--chunk-size", default=500, show_default=True, help="Users scored per batch.")
+def build_recommendations(full, chunk_size):
+    """Recompute the top surplus bags for users with new orders (or everyone active)."""
+    from utils import recommendations
+
+    db.create_all()  # creates user_recommendations on databases that predate it
+    stats = recommendations.build(full=full, chunk_size=chunk_size)
+    rate = stats["users"] / stats["seconds"] if stats["seconds"] else 0
+    kind = "incremental" if stats["incremental"] else "full"
+    click.echo(
+        f"{kind.capitalize()} build: {stats['rows']} recommendations for {stats['users']} users "
+        f"from {stats['candidates']} candidate bags in {stats['seconds']:.2f}s ({rate:.0f} users/s)"
+    )
+
+
+@templates_cli.command("rebuild")
+def rebuild_templates():
+    """Regroup every product into the template catalog."""
+    from utils import product_templates
+
+    db.create_all()  # creates product_templates on databases that predate it
+    count = product_templates.rebuild()
+    click.echo(f"Rebuilt {count} product templates")
+
+
+def register_commands(app):
+    app.cli.add_command(tags_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(inventory_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(recs_cli)
+    app.cli.add_command(templates_cli)
@@ -5,14 +5,75 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
+    # OpenAPI / flask-smorest
+    API_TITLE = "Forni API"
+    API_VERSION = "v1"
+    OPENAPI_VERSION = "3.0.3"
+    OPENAPI_URL_PREFIX = "/"
+    OPENAPI_SWAGGER_UI_PATH = "/swagger-ui"
+    OPENAPI_SWAGGER_UI_URL = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
+
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///forni.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Engine tuning (see db.engine_options / db.sqlite_pragmas)
+    # Postgres pool, per worker process: size it so workers x (size + overflow)
+    # stays under the server's max_connections
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))
+    # SQLite: wait this long for the write lock, memory-map up to this many bytes
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
     
     # JWT Config
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Seconds between polls for JTIs revoked by other workers
+    BLOCKLIST_SYNC_INTERVAL = int(os.getenv('BLOCKLIST_SYNC_INTERVAL', 2))
+
+    # Geo index: seconds before a rebuild (0 = bounding-box SQL only)
+    GEO_INDEX_TTL = int(os.getenv('GEO_INDEX_TTL', 60))
+
+    # Surplus bag holds (seconds)
+    INVENTORY_HOLD_TTL = int(os.getenv('INVENTORY_HOLD_TTL', 600))
+    INVENTORY_RELEASE_INTERVAL = int(os.getenv('INVENTORY_RELEASE_INTERVAL', 30))
+
+    # Analytics aggregates cache (seconds)
+    ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 60))
+
+    # Recommendations: candidate pool rebuild / per-user ranking cache (seconds)
+    RECS_CANDIDATE_TTL = int(os.getenv('RECS_CANDIDATE_TTL', 300))
+    RECS_USER_TTL = int(os.getenv('RECS_USER_TTL', 300))
+    # Users with an order in this many days get precomputed recommendations
+    RECS_ACTIVE_DAYS = int(os.getenv('RECS_ACTIVE_DAYS', 90))
+    # Incremental builds rescore stored lists older than this (seconds)
+    RECS_MAX_AGE = int(os.getenv('RECS_MAX_AGE', 21600))
+
+    # Public catalog response cache: memory (per worker), redis (shared) or none
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv('RESPONSE_CACHE_MAXSIZE', 4096))
+
+    # Response serialization: generated schema dumps, orjson bodies when
+    # installed (auto), orjson (required) or default (stdlib json)
+    COMPILED_SERIALIZERS = os.getenv('COMPILED_SERIALIZERS', 'true').lower() == 'true'
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+
+    # Request logging (production: sample, never dump bodies)
+    REQUEST_LOG_ENABLED = os.getenv('REQUEST_LOG_ENABLED', 'true').lower() == 'true'
+    # One file per process ({pid}): rotation is not safe across gunicorn workers
+    REQUEST_LOG_PATH = os.getenv('REQUEST_LOG_PATH', 'requests-{pid}.log')
+    REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', 1.0))
+    REQUEST_LOG_BODIES = os.getenv('REQUEST_LOG_BODIES', 'false').lower() == 'true'
+    REQUEST_LOG_MAX_BYTES = int(os.getenv('REQUEST_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    REQUEST_LOG_BACKUP_COUNT = int(os.getenv('REQUEST_LOG_BACKUP_COUNT', 5))
     
     # CORS
     CORS_HEADERS = 'Content-Type'
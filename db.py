@@ -1,5 +1,139 @@
-﻿from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+﻿from weakref import WeakKeyDictionary
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
-migrate = Migrate()
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS tuned for the configured database.
+
+    Postgres gets a sized pool with pre-ping and a server-side statement
+    timeout. SQLite keeps SQLAlchemy's defaults; it is tuned with PRAGMAs
+    on each new connection instead (see sqlite_pragmas).
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "postgresql":
+        return {}
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+    if url.get_driver_name() in ("psycopg2", "psycopg"):
+        # libpq startup options: a runaway query or a transaction left open
+        # cannot hold a pooled connection (and its locks) forever
+        options["connect_args"] = {"options": (
+            f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']} "
+            f"-c idle_in_transaction_session_timeout={config['DB_IDLE_IN_TRANSACTION_TIMEOUT_MS']}"
+        )}
+    return options
+
+
+def sqlite_pragmas(config, memory=False):
+    """
+    Connect-event listener applying SQLite PRAGMAs to every new connection.
+
+    WAL lets readers run alongside the single writer, and the busy timeout
+    makes a writer wait for the lock instead of failing at once with
+    "database is locked". synchronous=NORMAL is durable in WAL mode except
+    for the last transactions on power loss. In-memory databases only get
+    the busy timeout.
+    """
+    pragmas = [f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}"]
+    if not memory:
+        pragmas += [
+            "PRAGMA journal_mode = WAL",
+            "PRAGMA synchronous = NORMAL",
+            f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        ]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+class PoolStats:
+    """Connection pool event counters for one engine (per worker process)"""
+
+    def __init__(self, engine):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+        self._checked_out = 0
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    # Counters are updated under the GIL; off-by-one races only skew the peak
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self._checked_out += 1
+        self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._checked_out = max(0, self._checked_out - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+
+_pool_stats = WeakKeyDictionary()
+
+
+def init_db(app):
+    """db.init_app with tuned engine options, SQLite PRAGMAs and pool counters"""
+    options = engine_options(app.config)
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS win over the tuned defaults
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == "sqlite":
+        memory = engine.url.database in (None, "", ":memory:")
+        event.listen(engine, "connect", sqlite_pragmas(app.config, memory))
+    _pool_stats[engine] = PoolStats(engine)
+
+
+def pool_status(engine):
+    """Current pool occupancy plus event counters, for the metrics endpoint"""
+    pool = engine.pool
+    status = {"dialect": engine.dialect.name, "pool_class": type(pool).__name__}
+    # Only queue-style pools are sized (SQLite in-memory uses a static pool)
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    stats = _pool_stats.get(engine)
+    if stats is not None:
+        status.update(
+            connects=stats.connects,
+            checkouts=stats.checkouts,
+            invalidations=stats.invalidations,
+            peak_checked_out=stats.peak_checked_out,
+        )
+    return status
+
+
+def init_migrate(app):
+    """Attach Flask-Migrate; imported on demand since alembic is slow to load"""
+    from flask_migrate import Migrate
+    return Migrate(app, db)
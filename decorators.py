@@ -1,17 +1,77 @@
 from functools import wraps
-from flask_jwt_extended import get_jwt_identity
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
 from flask_smorest import abort
 from models.user import UserModel
 from db import db
 
 
+# ============================================================
+# REQUEST-SCOPED IDENTITY / RESOURCE CACHE
+# Decorators fill it, handlers reuse it: each user and resource is
+# loaded at most once per request.
+# ============================================================
+
+def current_user():
+    """The authenticated user, loaded once per request."""
+    if "current_user" not in g:
+        g.current_user = UserModel.find_by_id(int(get_jwt_identity()))
+    return g.current_user
+
+
+def current_role():
+    """
+    Role of the authenticated user.
+
+    Read from the token's "role" claim when present (no DB lookup); tokens
+    issued before roles were embedded fall back to loading the user.
+    """
+    role = get_jwt().get("role")
+    if role:
+        return role
+    user = current_user()
+    return user.role if user else None
+
+
+def get_resource_or_404(model, resource_id):
+    """model.query.get_or_404, memoized for the rest of the request."""
+    if "resources" not in g:
+        g.resources = {}
+    key = (model, int(resource_id))
+    if key not in g.resources:
+        g.resources[key] = model.query.get_or_404(resource_id)
+    return g.resources[key]
+
+
+def _resource_id(kwargs):
+    return (
+        kwargs.get("bakery_id")
+        or kwargs.get("product_id")
+        or kwargs.get("surplus_bag_id")
+        or kwargs.get("bag_id")
+        or kwargs.get("order_id")
+    )
+
+
+def _owner_id(resource):
+    # BakeryModel → owner_id
+    # ProductModel → bakery.owner_id
+    # SurplusBagModel → bakery.owner_id
+    # OrderModel → bakery.owner_id
+    if hasattr(resource, "owner_id"):
+        return resource.owner_id
+    if getattr(resource, "bakery_id", None) is not None:
+        from models.bakery import BakeryModel
+        return get_resource_or_404(BakeryModel, resource.bakery_id).owner_id
+    return None
+
+
 def admin_required():
     """Allow only admin users."""
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user = UserModel.find_by_id(int(get_jwt_identity()))
-            if not user or user.role != "admin":
+            if current_role() != "admin":
                 abort(403, message="Admin privileges required")
             return fn(*args, **kwargs)
         return wrapper
@@ -26,23 +86,9 @@ def owner_required(model):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user = UserModel.find_by_id(int(get_jwt_identity()))
-            resource_id = kwargs.get("bakery_id") or kwargs.get("product_id") or kwargs.get("bag_id") or kwargs.get("order_id")
+            resource = get_resource_or_404(model, _resource_id(kwargs))
 
-            resource = model.query.get_or_404(resource_id)
-
-            # BakeryModel → owner_id
-            # ProductModel → bakery.owner_id
-            # SurplusBagModel → bakery.owner_id
-            # OrderModel → bakery.owner_id
-            owner_id = None
-
-            if hasattr(resource, "owner_id"):
-                owner_id = resource.owner_id
-            elif hasattr(resource, "bakery") and hasattr(resource.bakery, "owner_id"):
-                owner_id = resource.bakery.owner_id
-
-            if user.id != owner_id:
+            if int(get_jwt_identity()) != _owner_id(resource):
                 abort(403, message="Only the owner can perform this action")
 
             return fn(*args, **kwargs)
@@ -59,25 +105,10 @@ def owner_or_admin_required(model):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user = UserModel.find_by_id(int(get_jwt_identity()))
-            resource_id = (
-                kwargs.get("bakery_id")
-                or kwargs.get("product_id")
-                or kwargs.get("bag_id")
-                or kwargs.get("order_id")
-            )
-
-            resource = model.query.get_or_404(resource_id)
-
-            # Determine owner
-            owner_id = None
-            if hasattr(resource, "owner_id"):
-                owner_id = resource.owner_id
-            elif hasattr(resource, "bakery") and hasattr(resource.bakery, "owner_id"):
-                owner_id = resource.bakery.owner_id
-
-            # Check permissions
-            if user.role != "admin" and user.id != owner_id:
+            resource = get_resource_or_404(model, _resource_id(kwargs))
+
+            # Check permissions (role from the token, no user lookup needed)
+            if current_role() != "admin" and int(get_jwt_identity()) != _owner_id(resource):
                 abort(403, message="Only the owner or an admin can perform this action")
 
             return fn(*args, **kwargs)
@@ -0,0 +1,79 @@
+"""
+Gunicorn settings for production serving.
+
+    gunicorn -c gunicorn.conf.py
+
+Every setting can be overridden from the environment:
+
+    GUNICORN_BIND              address to listen on (default 0.0.0.0:$PORT, PORT=5000)
+    GUNICORN_WORKER_CLASS      "gthread" (default) or "sync"
+    GUNICORN_WORKERS           worker processes (default 2 x CPUs + 1 for sync,
+                               CPUs + 1 for gthread)
+    GUNICORN_THREADS           threads per gthread worker (default 4)
+    GUNICORN_PRELOAD           import the app once in the master (default true)
+    GUNICORN_KEEPALIVE         idle keep-alive seconds (default 5; behind a load
+                               balancer, set it above the balancer's idle timeout)
+    GUNICORN_TIMEOUT           seconds before a silent worker is killed (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds workers get to finish on restart (default 30)
+    GUNICORN_MAX_REQUESTS      recycle a worker after this many requests (default
+                               1000, 0 = never), with up to 10% random jitter
+
+gthread suits this app: requests mostly wait on the database, threads share
+one worker's caches (geo index, candidate pool, blocklist) and keep-alive
+connections are supported. sync workers serve one request at a time with
+no keep-alive; use them for CPU-heavy traffic.
+
+Reloads: `kill -HUP <master>` starts fresh workers with the new settings
+and stops the old ones gracefully. With preload on, workers fork from the
+code the master loaded, so deploying new code needs a full restart (or
+USR2 then QUIT on the old master); set GUNICORN_PRELOAD=false to let HUP
+pick up new code at the cost of a slower worker start.
+"""
+import multiprocessing
+import os
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class not in ("gthread", "sync"):
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be gthread or sync, not {worker_class!r}")
+
+cpus = multiprocessing.cpu_count()
+default_workers = 2 * cpus + 1 if worker_class == "sync" else cpus + 1
+workers = int(os.getenv("GUNICORN_WORKERS", default_workers))
+threads = int(os.getenv("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# Worker heartbeats on tmpfs: a slow disk must not get workers killed
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# Requests are logged by the app itself (utils/request_logging.py)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def post_fork(server, worker):
+    # Connections opened in the master (preload) must not be shared across
+    # processes: drop the inherited pool without closing the parent's sockets
+    if not preload_app:
+        return
+    from db import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -6,6 +6,10 @@ import os
 
 db_path = "instance/forni.db"
 
+# Bayesian rating prior, as in models/bakery.py
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_WEIGHT = 5
+
 if not os.path.exists(db_path):
     print(f"Database not found at {db_path}")
     exit(1)
@@ -14,6 +18,10 @@ conn = sqlite3.connect(db_path)
 cursor = conn.cursor()
 
 try:
+    # One transaction for the whole migration (sqlite3 would autocommit
+    # each ALTER/CREATE): new columns are never visible without their backfill
+    cursor.execute("BEGIN")
+
     # Check if column exists
     cursor.execute("PRAGMA table_info(bakeries)")
     columns = [col[1] for col in cursor.fetchall()]
@@ -31,6 +39,204 @@ try:
         print("Added 'opening_hours' column to bakeries table")
     else:
         print("'opening_hours' column already exists")
+
+    # Composite index used by the /bakery/nearby bounding-box prefilter
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_bakeries_lat_lng ON bakeries (latitude, longitude)")
+    print("Ensured 'ix_bakeries_lat_lng' index on bakeries")
+
+    # Incremental rating aggregates
+    rating_columns = {
+        'rating_sum': "INTEGER NOT NULL DEFAULT 0",
+        'rating_sq_sum': "INTEGER NOT NULL DEFAULT 0",
+        'bayesian_rating': "FLOAT NOT NULL DEFAULT 3.5",
+    }
+    added = [name for name in rating_columns if name not in columns]
+    for name in added:
+        cursor.execute(f"ALTER TABLE bakeries ADD COLUMN {name} {rating_columns[name]}")
+        print(f"Added '{name}' column to bakeries table")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_bakeries_bayesian_rating ON bakeries (bayesian_rating)")
+    if added:
+        # Reviews are applied as deltas on these sums from now on: fill them
+        # (and the count, mean and Bayesian rating they imply) from the
+        # existing reviews, as `flask ratings rebuild` does
+        cursor.execute(
+            "UPDATE bakeries SET review_count = 0, rating_sum = 0, rating_sq_sum = 0, "
+            "rating = 0.0, bayesian_rating = ?", (RATING_PRIOR_MEAN,)
+        )
+        cursor.execute(
+            "SELECT bakery_id, count(id), sum(rating), sum(rating * rating) FROM reviews "
+            "WHERE bakery_id IS NOT NULL GROUP BY bakery_id"
+        )
+        totals = cursor.fetchall()
+        cursor.executemany(
+            "UPDATE bakeries SET review_count = ?, rating_sum = ?, rating_sq_sum = ?, "
+            "rating = ?, bayesian_rating = ? WHERE id = ?",
+            [
+                (count, total, squares, total / count,
+                 (RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + total) / (RATING_PRIOR_WEIGHT + count), bakery_id)
+                for bakery_id, count, total, squares in totals
+            ],
+        )
+        print(f"Filled rating aggregates of {len(totals)} bakeries from existing reviews")
+
+    # Token blocklist expiry (lets expired revocations be purged)
+    cursor.execute("PRAGMA table_info(token_blacklist)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if columns and 'expires_at' not in columns:
+        cursor.execute("ALTER TABLE token_blacklist ADD COLUMN expires_at DATETIME")
+        print("Added 'expires_at' column to token_blacklist table")
+    if columns:
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_token_blacklist_expires_at ON token_blacklist (expires_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_token_blacklist_created_at ON token_blacklist (created_at)")
+
+    # Keyset pagination indexes on (created_at, id), plus the filtered variants
+    pagination_indexes = [
+        ("ix_bakeries_created_at_id", "bakeries", "created_at, id"),
+        ("ix_products_created_at_id", "products", "created_at, id"),
+        ("ix_products_bakery_created_at_id", "products", "bakery_id, created_at, id"),
+        ("ix_surplus_bags_created_at_id", "surplus_bags", "created_at, id"),
+        ("ix_surplus_bags_bakery_created_at_id", "surplus_bags", "bakery_id, created_at, id"),
+        ("ix_orders_created_at_id", "orders", "created_at, id"),
+        ("ix_orders_user_created_at_id", "orders", "user_id, created_at, id"),
+        ("ix_orders_bakery_created_at_id", "orders", "bakery_id, created_at, id"),
+        ("ix_reviews_created_at_id", "reviews", "created_at, id"),
+        ("ix_reviews_bakery_created_at_id", "reviews", "bakery_id, created_at, id"),
+        # Analytics aggregates
+        ("ix_orders_bakery_status_created_at", "orders", "bakery_id, status, created_at"),
+        ("ix_orders_bakery_pickup_time", "orders", "bakery_id, pickup_time"),
+        ("ix_order_items_order_id", "order_items", "order_id"),
+        ("ix_order_items_product_id", "order_items", "product_id, order_id"),
+        ("ix_order_items_surplus_bag_id", "order_items", "surplus_bag_id, order_id"),
+        ("ix_surplus_bags_bakery_pickup_start", "surplus_bags", "bakery_id, pickup_start"),
+    ]
+    for name, table, cols in pagination_indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+    print("Ensured keyset pagination and analytics indexes")
+
+    # Normalized tags (products and surplus bags)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL UNIQUE
+        )
+    """)
+    for table, owner, owner_table in (
+        ("product_tags", "product_id", "products"),
+        ("surplus_bag_tags", "surplus_bag_id", "surplus_bags"),
+    ):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {owner} INTEGER NOT NULL REFERENCES {owner_table} (id) ON DELETE CASCADE,
+                tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+                PRIMARY KEY ({owner}, tag_id)
+            )
+        """)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_tag_id ON {table} (tag_id, {owner})")
+    print("Ensured 'tags' tables; run 'flask tags rebuild' to fill them from existing tag strings")
+
+    # Short-lived surplus bag holds
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_holds (
+            id INTEGER PRIMARY KEY,
+            hold_id VARCHAR(32) NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            surplus_bag_id INTEGER NOT NULL REFERENCES surplus_bags (id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL,
+            expires_at DATETIME NOT NULL,
+            created_at DATETIME
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_inventory_holds_hold_id ON inventory_holds (hold_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_inventory_holds_expires_at ON inventory_holds (expires_at)")
+    print("Ensured 'inventory_holds' table")
+
+    # Daily analytics rollups
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bakery_daily_stats'")
+    if not cursor.fetchone():
+        cursor.execute("""
+            CREATE TABLE bakery_daily_stats (
+                bakery_id INTEGER NOT NULL REFERENCES bakeries (id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                orders INTEGER NOT NULL DEFAULT 0,
+                revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+                bags_saved INTEGER NOT NULL DEFAULT 0,
+                value_saved NUMERIC(12, 2) NOT NULL DEFAULT 0,
+                PRIMARY KEY (bakery_id, day)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_bakery_daily_stats_day ON bakery_daily_stats (day)")
+        print("Created 'bakery_daily_stats' table; run 'flask analytics rebuild' to fill it")
+
+    # Precomputed recommendations
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_recommendations (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            rank SMALLINT NOT NULL,
+            surplus_bag_id INTEGER NOT NULL REFERENCES surplus_bags (id) ON DELETE CASCADE,
+            score FLOAT NOT NULL,
+            computed_at DATETIME NOT NULL,
+            PRIMARY KEY (user_id, rank)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_user_recommendations_surplus_bag_id ON user_recommendations (surplus_bag_id)")
+    print("Ensured 'user_recommendations' table; run 'flask recs build' to fill it")
+
+    # Product template catalog
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_products_name_key ON products (lower(trim(name)))")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='product_templates'")
+    if not cursor.fetchone():
+        cursor.execute("""
+            CREATE TABLE product_templates (
+                name_key VARCHAR(255) NOT NULL,
+                category VARCHAR(50) NOT NULL DEFAULT '',
+                product_count INTEGER NOT NULL DEFAULT 0,
+                price_sum NUMERIC(12, 2) NOT NULL DEFAULT 0,
+                template_product_id INTEGER NOT NULL REFERENCES products (id) ON DELETE CASCADE,
+                PRIMARY KEY (name_key, category)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_product_templates_count ON product_templates (product_count)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_product_templates_category_count ON product_templates (category, product_count)")
+        print("Created 'product_templates' table; run 'flask templates rebuild' to fill it")
+
+    # Row versions for conditional GETs (ETag / Last-Modified)
+    for table in ("bakeries", "products", "surplus_bags"):
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'version' not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            print(f"Added 'version' column to {table} table")
+        if 'updated_at' not in columns:
+            # SQLite can't add a NOT NULL column without a constant default: backfill instead
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+            cursor.execute(f"UPDATE {table} SET updated_at = coalesce(created_at, CURRENT_TIMESTAMP)")
+            print(f"Added 'updated_at' column to {table} table")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_products_bakery_updated_at ON products (bakery_id, updated_at, version)")
+    print("Ensured row version indexes")
+
+    # Bakery detail pages: a bakery's available bags (replaces the bag version index)
+    cursor.execute("DROP INDEX IF EXISTS ix_surplus_bags_bakery_updated_at")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_surplus_bags_bakery_pickup_end "
+        "ON surplus_bags (bakery_id, pickup_end, quantity_available, version, updated_at)"
+    )
+    print("Ensured available bags index")
+
+    # Keyset pagination keys: (created_at, id) > (...) never returns NULL
+    # created_at rows, and their cursors can't be decoded. Backfill legacy
+    # rows (oldest first, as NULLs sorted) and reject new NULLs; SQLite
+    # can't add NOT NULL to an existing column, triggers stand in for it
+    for table in ("bakeries", "products", "surplus_bags", "orders", "reviews", "users"):
+        cursor.execute(f"UPDATE {table} SET created_at = '1970-01-01 00:00:00.000000' WHERE created_at IS NULL")
+        if cursor.rowcount:
+            print(f"Backfilled created_at of {cursor.rowcount} {table} rows")
+        for event in ("INSERT", "UPDATE OF created_at"):
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_created_at_{event.split()[0].lower()} "
+                f"BEFORE {event} ON {table} WHEN NEW.created_at IS NULL "
+                f"BEGIN SELECT RAISE(ABORT, 'NOT NULL constraint failed: {table}.created_at'); END"
+            )
+    print("Ensured created_at is never NULL")
     
     conn.commit()
     print("\nDatabase migration completed successfully!")
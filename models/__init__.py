@@ -6,5 +6,10 @@ from models.order import OrderModel as Order
 from models.order_item import OrderItemModel as OrderItem
 from models.review import ReviewModel as Review
 from models.token_blacklist import TokenBlacklist
+from models.tag import TagModel as Tag
+from models.inventory_hold import InventoryHoldModel as InventoryHold
+from models.bakery_daily_stats import BakeryDailyStatsModel as BakeryDailyStats
+from models.user_recommendation import UserRecommendationModel as UserRecommendation
+from models.product_template import ProductTemplateModel as ProductTemplate
 
-__all__ = ['User', 'Bakery', 'Product', 'SurplusBag', 'Order', 'OrderItem', 'Review', 'TokenBlacklist']
+__all__ = ['User', 'Bakery', 'Product', 'SurplusBag', 'Order', 'OrderItem', 'Review', 'TokenBlacklist', 'Tag', 'InventoryHold', 'BakeryDailyStats', 'UserRecommendation', 'ProductTemplate']
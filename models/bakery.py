@@ -1,9 +1,25 @@
 # UPDATED models/bakery.py
+import math
 from datetime import datetime
 from db import db
+from models.versioned import VersionedMixin
 
-class BakeryModel(db.Model):
+# Bayesian average prior: a bakery starts as if it had RATING_PRIOR_WEIGHT
+# reviews of RATING_PRIOR_MEAN stars, so a single 5-star review can't top
+# the ranking
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_WEIGHT = 5
+
+class BakeryModel(db.Model, VersionedMixin):
     __tablename__ = "bakeries"
+    __table_args__ = (
+        # Bounding-box prefilter for nearby searches
+        db.Index("ix_bakeries_lat_lng", "latitude", "longitude"),
+        # Keyset pagination order
+        db.Index("ix_bakeries_created_at_id", "created_at", "id"),
+        # Top-rated listing
+        db.Index("ix_bakeries_bayesian_rating", "bayesian_rating"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -22,12 +38,24 @@ class BakeryModel(db.Model):
 
     rating = db.Column(db.Float, default=0.0)
     review_count = db.Column(db.Integer, default=0)
+    # Running aggregates maintained by utils.ratings (no per-write rescans)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_sq_sum = db.Column(db.Integer, nullable=False, default=0)
+    bayesian_rating = db.Column(db.Float, nullable=False, default=RATING_PRIOR_MEAN)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
     # Relationships
     owner = db.relationship("UserModel", back_populates="bakeries")
     products = db.relationship("ProductModel", back_populates="bakery", lazy="dynamic")
     surplus_bags = db.relationship("SurplusBagModel", back_populates="bakery", lazy="dynamic")
     orders = db.relationship("OrderModel", back_populates="bakery", lazy="dynamic")
-    reviews = db.relationship("ReviewModel", back_populates="bakery", lazy="dynamic")
\ No newline at end of file
+    reviews = db.relationship("ReviewModel", back_populates="bakery", lazy="dynamic")
+
+    @property
+    def rating_stddev(self):
+        """Population standard deviation of the ratings, from the running sums"""
+        if not self.review_count:
+            return 0.0
+        mean = self.rating_sum / self.review_count
+        return round(math.sqrt(max(self.rating_sq_sum / self.review_count - mean * mean, 0.0)), 3)
@@ -0,0 +1,20 @@
+from db import db
+
+class BakeryDailyStatsModel(db.Model):
+    """Per-bakery, per-day totals of completed orders, maintained by utils.analytics"""
+    __tablename__ = "bakery_daily_stats"
+    __table_args__ = (
+        # Admin-wide date range queries (bakery-scoped ones use the primary key)
+        db.Index("ix_bakery_daily_stats_day", "day"),
+    )
+
+    bakery_id = db.Column(db.Integer, db.ForeignKey("bakeries.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # order date (orders.created_at, UTC)
+
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    bags_saved = db.Column(db.Integer, nullable=False, default=0)
+    value_saved = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # original value - price paid
+
+    def __repr__(self):
+        return f"<BakeryDailyStats {self.bakery_id} {self.day}>"
@@ -0,0 +1,17 @@
+from datetime import datetime
+from db import db
+
+class InventoryHoldModel(db.Model):
+    """Surplus bags set aside for a customer until checkout or `expires_at`"""
+    __tablename__ = "inventory_holds"
+
+    id = db.Column(db.Integer, primary_key=True)
+    hold_id = db.Column(db.String(32), nullable=False, index=True)  # groups the rows of one hold
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    surplus_bag_id = db.Column(db.Integer, db.ForeignKey("surplus_bags.id", ondelete="CASCADE"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<InventoryHold {self.hold_id} bag={self.surplus_bag_id} x{self.quantity}>"
@@ -3,6 +3,15 @@ from db import db
 
 class OrderModel(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Keyset pagination: all orders, a customer's orders, a bakery's orders
+        db.Index("ix_orders_created_at_id", "created_at", "id"),
+        db.Index("ix_orders_user_created_at_id", "user_id", "created_at", "id"),
+        db.Index("ix_orders_bakery_created_at_id", "bakery_id", "created_at", "id"),
+        # Analytics: completed orders of a bakery over time, pickups due
+        db.Index("ix_orders_bakery_status_created_at", "bakery_id", "status", "created_at"),
+        db.Index("ix_orders_bakery_pickup_time", "bakery_id", "pickup_time"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -13,14 +22,16 @@ class OrderModel(db.Model):
     surplus_bag_id = db.Column(db.Integer, db.ForeignKey("surplus_bags.id"))
 
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
-    status = db.Column(db.String(20), default="pending")
+    # active_history: the analytics rollup needs the previous status even
+    # when it was expired (or never loaded) before being assigned
+    status = db.column_property(db.Column(db.String(20), default="pending"), active_history=True)
 
     pickup_code = db.Column(db.String(10))
     pickup_confirmed_at = db.Column(db.DateTime)
     pickup_time = db.Column(db.DateTime)
     payment_intent_id = db.Column(db.String(255))
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
     user = db.relationship("UserModel", back_populates="orders")
     bakery = db.relationship("BakeryModel", back_populates="orders")
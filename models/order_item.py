@@ -2,6 +2,12 @@ from db import db
 
 class OrderItemModel(db.Model):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Item lookups by order, and analytics joins by product / bag
+        db.Index("ix_order_items_order_id", "order_id"),
+        db.Index("ix_order_items_product_id", "product_id", "order_id"),
+        db.Index("ix_order_items_surplus_bag_id", "surplus_bag_id", "order_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
@@ -1,8 +1,22 @@
 from datetime import datetime
 from db import db
+from models.tag import TaggedMixin, product_tags
+from models.versioned import VersionedMixin
 
-class ProductModel(db.Model):
+class ProductModel(db.Model, TaggedMixin, VersionedMixin):
     __tablename__ = "products"
+    __tag_table__ = product_tags
+    __tag_fk__ = "product_id"
+    __version_parent__ = "bakery"
+    __table_args__ = (
+        # Keyset pagination: all products and a bakery's products
+        db.Index("ix_products_created_at_id", "created_at", "id"),
+        db.Index("ix_products_bakery_created_at_id", "bakery_id", "created_at", "id"),
+        # Conditional GET validators of a bakery's page (covering)
+        db.Index("ix_products_bakery_updated_at", "bakery_id", "updated_at", "version"),
+        # Template grouping by normalized name (utils.product_templates)
+        db.Index("ix_products_name_key", db.text("lower(trim(name))")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     bakery_id = db.Column(db.Integer, db.ForeignKey("bakeries.id"), nullable=False)
@@ -17,6 +31,7 @@ class ProductModel(db.Model):
     quantity_available = db.Column(db.Integer)  # Optional inventory tracking
     image_url = db.Column(db.String(500))  # NEW FIELD
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
-    bakery = db.relationship("BakeryModel", back_populates="products")
\ No newline at end of file
+    bakery = db.relationship("BakeryModel", back_populates="products")
+    tag_set = db.relationship("TagModel", secondary=product_tags)  # normalized mirror of `tags`
\ No newline at end of file
@@ -0,0 +1,20 @@
+from db import db
+
+class ProductTemplateModel(db.Model):
+    """Products grouped by normalized name and category, maintained by utils.product_templates"""
+    __tablename__ = "product_templates"
+    __table_args__ = (
+        # Most popular templates, overall or within one category
+        db.Index("ix_product_templates_count", "product_count"),
+        db.Index("ix_product_templates_category_count", "category", "product_count"),
+    )
+
+    name_key = db.Column(db.String(255), primary_key=True)  # lower(trim(products.name))
+    category = db.Column(db.String(50), primary_key=True, default="")  # "" for uncategorized
+
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    price_sum = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    template_product_id = db.Column(db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), nullable=False)  # lowest id
+
+    def __repr__(self):
+        return f"<ProductTemplate {self.name_key!r} {self.category!r}>"
@@ -3,6 +3,11 @@ from db import db
 
 class ReviewModel(db.Model):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination: all reviews and a bakery's reviews
+        db.Index("ix_reviews_created_at_id", "created_at", "id"),
+        db.Index("ix_reviews_bakery_created_at_id", "bakery_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -13,7 +18,7 @@ class ReviewModel(db.Model):
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
     user = db.relationship("UserModel", back_populates="reviews")
     bakery = db.relationship("BakeryModel", back_populates="reviews")
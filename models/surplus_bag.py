@@ -1,8 +1,23 @@
 from datetime import datetime
 from db import db
+from models.tag import TaggedMixin, surplus_bag_tags
+from models.versioned import VersionedMixin
 
-class SurplusBagModel(db.Model):
+class SurplusBagModel(db.Model, TaggedMixin, VersionedMixin):
     __tablename__ = "surplus_bags"
+    __tag_table__ = surplus_bag_tags
+    __tag_fk__ = "surplus_bag_id"
+    __version_parent__ = "bakery"
+    __table_args__ = (
+        # Keyset pagination: all bags and a bakery's bags
+        db.Index("ix_surplus_bags_created_at_id", "created_at", "id"),
+        db.Index("ix_surplus_bags_bakery_created_at_id", "bakery_id", "created_at", "id"),
+        # A bakery's available bags, and the validators of its page (covering)
+        db.Index("ix_surplus_bags_bakery_pickup_end", "bakery_id", "pickup_end", "quantity_available",
+                 "version", "updated_at"),
+        # Analytics: sell-through by pickup window
+        db.Index("ix_surplus_bags_bakery_pickup_start", "bakery_id", "pickup_start"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     bakery_id = db.Column(db.Integer, db.ForeignKey("bakeries.id"), nullable=False)
@@ -22,8 +37,14 @@ class SurplusBagModel(db.Model):
 
     # status field removed
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
     bakery = db.relationship("BakeryModel", back_populates="surplus_bags")
+    tag_set = db.relationship("TagModel", secondary=surplus_bag_tags)  # normalized mirror of `tags`
     orders = db.relationship("OrderModel", back_populates="surplus_bag", lazy="dynamic")
-    reviews = db.relationship("ReviewModel", back_populates="surplus_bag", lazy="dynamic")
\ No newline at end of file
+    reviews = db.relationship("ReviewModel", back_populates="surplus_bag", lazy="dynamic")
+
+    @classmethod
+    def available(cls, now=None):
+        """Criterion for bags that can still be ordered: stock left, pickup window not over"""
+        return db.and_(cls.quantity_available > 0, cls.pickup_end > (now or datetime.utcnow()))
\ No newline at end of file
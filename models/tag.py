@@ -0,0 +1,138 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from db import db
+
+
+product_tags = db.Table(
+    "product_tags",
+    db.Column("product_id", db.Integer, db.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_product_tags_tag_id", "tag_id", "product_id"),
+)
+
+surplus_bag_tags = db.Table(
+    "surplus_bag_tags",
+    db.Column("surplus_bag_id", db.Integer, db.ForeignKey("surplus_bags.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_surplus_bag_tags_tag_id", "tag_id", "surplus_bag_id"),
+)
+
+
+class TagModel(db.Model):
+    __tablename__ = "tags"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # normalized: stripped, lowercase
+
+    def __repr__(self):
+        return f"<Tag {self.name}>"
+
+
+def parse_tags(value):
+    """Split a comma-separated tag string into unique normalized names"""
+    if not value:
+        return []
+    names = []
+    for tag in value.split(","):
+        tag = tag.strip().lower()[:100]
+        if tag and tag not in names:
+            names.append(tag)
+    return names
+
+
+def insert_tags(conn, names):
+    """
+    Create the tags in `names` that don't exist yet. An upsert, not
+    check-then-insert: a concurrent transaction adding the same new tag
+    must not fail either write on the unique name.
+    """
+    table = TagModel.__table__
+    rows = [{"name": name} for name in names]
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        conn.execute(insert(table).on_conflict_do_nothing(index_elements=[table.c.name]), rows)
+        return
+
+    # Portable fallback: one savepoint per tag, a duplicate is someone else's
+    for row in rows:
+        try:
+            with conn.begin_nested():
+                conn.execute(table.insert().values(**row))
+        except IntegrityError:
+            pass
+
+
+class TaggedMixin:
+    """
+    Keeps the legacy comma-separated `tags` column mirrored into the
+    normalized tags/association tables, and builds SQL tag filters on them.
+
+    Subclasses set `__tag_table__` (association table) and `__tag_fk__`
+    (its column pointing back at the model) and define a `tag_set`
+    relationship through that table.
+    """
+
+    def sync_tags(self, session):
+        names = parse_tags(self.tags)
+        if not names:
+            self.tag_set = []
+            return
+
+        with session.no_autoflush:
+            existing = {t.name: t for t in session.query(TagModel).filter(TagModel.name.in_(names))}
+            missing = [name for name in names if name not in existing]
+            if missing:
+                insert_tags(session.connection(), missing)
+                existing.update((t.name, t) for t in session.query(TagModel).filter(TagModel.name.in_(missing)))
+        self.tag_set = [existing[name] for name in names]
+
+    @classmethod
+    def tag_filter(cls, names, match="any"):
+        """
+        SQL criterion selecting rows tagged with any (or all) of `names`.
+
+        Resolves through the indexed association table, so it composes with
+        any other filter on the query.
+        """
+        assoc = cls.__tag_table__
+        fk = assoc.c[cls.__tag_fk__]
+        matching = (
+            select(fk)
+            .join(TagModel, TagModel.id == assoc.c.tag_id)
+            .where(TagModel.name.in_(names))
+        )
+        if match == "all":
+            matching = matching.group_by(fk).having(func.count(assoc.c.tag_id) == len(names))
+        return cls.id.in_(matching)
+
+    @classmethod
+    def tag_counts(cls, query=None, limit=50):
+        """Return [(tag, count)] over the rows selected by `query` (default: all)"""
+        assoc = cls.__tag_table__
+        fk = assoc.c[cls.__tag_fk__]
+        counts = (
+            db.session.query(TagModel.name, func.count(fk).label("count"))
+            .join(assoc, assoc.c.tag_id == TagModel.id)
+        )
+        if query is not None:
+            counts = counts.filter(fk.in_(query.with_entities(cls.id).order_by(None)))
+        return (
+            counts.group_by(TagModel.name)
+            .order_by(func.count(fk).desc(), TagModel.name)
+            .limit(limit)
+            .all()
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_tag_index(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, TaggedMixin):
+            continue
+        if obj in session.new or inspect(obj).attrs.tags.history.has_changes():
+            obj.sync_tags(session)
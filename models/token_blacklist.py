@@ -6,7 +6,9 @@ class TokenBlacklist(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(120), unique=True, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # When the revoked token would have expired anyway; the row can be purged after
+    expires_at = db.Column(db.DateTime, index=True)
     
     def __repr__(self):
         return f'<TokenBlacklist {self.jti}>'
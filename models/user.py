@@ -16,7 +16,7 @@ class UserModel(db.Model):
     role = db.Column(db.String(20), nullable=False, default="customer")
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset pagination key
 
     # Relationships
     bakeries = db.relationship("BakeryModel", back_populates="owner", lazy="dynamic")
@@ -0,0 +1,19 @@
+from datetime import datetime
+from db import db
+
+class UserRecommendationModel(db.Model):
+    """A user's precomputed top surplus bags, written by `flask recs build`"""
+    __tablename__ = "user_recommendations"
+    __table_args__ = (
+        # Cascade deletes of a bag (the primary key covers reads by user)
+        db.Index("ix_user_recommendations_surplus_bag_id", "surplus_bag_id"),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.SmallInteger, primary_key=True)  # 0 = best
+    surplus_bag_id = db.Column(db.Integer, db.ForeignKey("surplus_bags.id", ondelete="CASCADE"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserRecommendation {self.user_id} #{self.rank}>"
@@ -0,0 +1,45 @@
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from db import db
+
+
+class VersionedMixin:
+    """
+    Row version and modification time, the validators behind conditional
+    GETs (utils/conditional.py).
+
+    Every ORM update bumps `version` and refreshes `updated_at`. Bulk
+    UPDATEs bypass the ORM and must include `**Model.version_bump()` in
+    their values. A subclass may name a many-to-one relationship in
+    `__version_parent__`: adding or deleting a row then also bumps the
+    parent, whose pages embed its children.
+    """
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1",
+                        onupdate=db.text("version + 1"))
+
+    @classmethod
+    def version_bump(cls):
+        """Column values for a bulk UPDATE statement on this model"""
+        return {"version": cls.version + 1, "updated_at": datetime.utcnow()}
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_version_parents(session, flush_context, instances):
+    touched = set()
+    for obj in list(session.new) + list(session.deleted):
+        parent_attr = getattr(obj, "__version_parent__", None)
+        if parent_attr is None:
+            continue
+        relationship = inspect(type(obj)).relationships[parent_attr]
+        parent_id = getattr(obj, next(iter(relationship.local_columns)).key)
+        key = (relationship.mapper.class_, parent_id)
+        if parent_id is None or key in touched:
+            continue
+        touched.add(key)
+        with session.no_autoflush:
+            parent = session.get(*key)
+        if parent is not None and parent not in session.deleted:
+            parent.updated_at = datetime.utcnow()
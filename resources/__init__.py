@@ -7,6 +7,10 @@ from resources.orders import blp as OrdersBlueprint
 from resources.reviews import blp as ReviewsBlueprint
 from resources.analytics import blp as AnalyticsBlueprint
 from resources.recommendations import blp as RecommendationsBlueprint
+from resources.tags import blp as TagsBlueprint
+from resources.search import blp as SearchBlueprint
+from resources.inventory import blp as InventoryBlueprint
+from resources.metrics import blp as MetricsBlueprint
 
 def register_blueprints(app):
     app.register_blueprint(AuthBlueprint, url_prefix="/api/v1/auth")
@@ -18,3 +22,7 @@ def register_blueprints(app):
     app.register_blueprint(ReviewsBlueprint, url_prefix="/api/v1/reviews")
     app.register_blueprint(AnalyticsBlueprint, url_prefix="/api/v1/analytics")
     app.register_blueprint(RecommendationsBlueprint, url_prefix="/api/v1/recommendations")
+    app.register_blueprint(TagsBlueprint, url_prefix="/api/v1/tags")
+    app.register_blueprint(SearchBlueprint, url_prefix="/api/v1/search")
+    app.register_blueprint(InventoryBlueprint, url_prefix="/api/v1/inventory")
+    app.register_blueprint(MetricsBlueprint, url_prefix="/api/v1/metrics")
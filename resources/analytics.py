@@ -1,28 +1,175 @@
+from datetime import date, datetime, time, timedelta
+from flask import request, current_app
 from flask.views import MethodView
-from flask_smorest import Blueprint, abort 
+from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db import db
-from models.order import OrderModel
-from models.surplus_bag import SurplusBagModel
-from models.user import UserModel
-from decorators import admin_required
+from models.bakery import BakeryModel
+from decorators import admin_required, current_role
+from utils import analytics
+from utils.cache import TTLCache
 
 blp = Blueprint("Analytics", __name__, description="Analytics operations")
 
+DEFAULT_WINDOW_DAYS = 30
+MAX_TOP_PRODUCTS = 50
+
+# Per-worker cache of aggregate results, keyed on the caller's bakery scope
+analytics_cache = TTLCache(ttl=60, maxsize=2048)
+
+
+def parse_day(name):
+    """Optional YYYY-MM-DD query param"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        abort(400, message=f"{name} must be a date (YYYY-MM-DD)")
+
+
+def scoped_bakery_ids():
+    """
+    Bakeries the caller may see analytics for, narrowed by ?bakery_id.
+    None means every bakery (admins without a filter).
+    """
+    role = current_role()
+    if role not in ["bakery_owner", "admin"]:
+        abort(403, message="Forbidden")
+
+    bakery_id = request.args.get('bakery_id', type=int)
+    if role == "admin":
+        return [bakery_id] if bakery_id else None
+
+    owned = [
+        b_id for (b_id,) in
+        db.session.query(BakeryModel.id).filter(BakeryModel.owner_id == int(get_jwt_identity()))
+    ]
+    if bakery_id:
+        if bakery_id not in owned:
+            abort(403, message="Forbidden")
+        return [bakery_id]
+    return owned
+
+
 @blp.route("/waste-prevented")
 class WastePrevented(MethodView):
     @jwt_required()
     def get(self):
-        user = UserModel.find_by_id(int(get_jwt_identity()))
+        """
+        Completed-order totals from the daily rollups (owners see their own bakeries)
+        Query params: from, to (YYYY-MM-DD, inclusive), bakery_id
+        """
+        start, end = parse_day("from"), parse_day("to")
+        if start and end and start > end:
+            abort(400, message="from must not be after to")
+
+        totals, daily = analytics.summarize(scoped_bakery_ids(), start, end)
+        return {
+            "total_waste_prevented": totals["value_saved"],
+            "from": start.isoformat() if start else None,
+            "to": end.isoformat() if end else None,
+            "totals": totals,
+            "daily": daily,
+        }
+
+
+def time_window():
+    """
+    [start, end) datetimes from the from/to params (inclusive dates);
+    defaults to the last DEFAULT_WINDOW_DAYS days
+    """
+    end_day = parse_day("to") or datetime.utcnow().date()
+    start_day = parse_day("from") or end_day - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if start_day > end_day:
+        abort(400, message="from must not be after to")
+    return datetime.combine(start_day, time.min), datetime.combine(end_day + timedelta(days=1), time.min)
+
+
+def parse_bucket():
+    bucket = (request.args.get('bucket') or "day").lower()
+    if bucket not in analytics.BUCKETS:
+        abort(400, message=f"bucket must be one of {', '.join(analytics.BUCKETS)}")
+    return bucket
 
-        if user.role not in ["bakery_owner", "admin"]:
-            abort(403, message="Forbidden")
 
-        orders = OrderModel.query.all()
-        total = 0
+def cached_series(name, compute, bakery_ids, *params):
+    """Run an aggregate through the TTL cache; the key includes the bakery scope"""
+    scope = None if bakery_ids is None else tuple(sorted(bakery_ids))
+    key = (name, scope) + params
+    ttl = current_app.config.get("ANALYTICS_CACHE_TTL", 60)
+    return analytics_cache.get_or_set(key, lambda: compute(bakery_ids, *params), ttl)
 
-        for o in orders:
-            if o.surplus_bag:
-                total += float(o.surplus_bag.original_value - o.surplus_bag.sale_price)
 
-        return {"total_waste_prevented": total}
+def series_response(start, end, bucket, series):
+    return {
+        "from": start.date().isoformat(),
+        "to": (end - timedelta(days=1)).date().isoformat(),
+        "bucket": bucket,
+        "series": series,
+    }
+
+
+@blp.route("/analytics/revenue")
+class RevenueSeries(MethodView):
+    @jwt_required()
+    def get(self):
+        """
+        Completed-order count and revenue per time bucket
+        Query params: from, to (YYYY-MM-DD, default last 30 days), bucket (hour|day|week), bakery_id
+        """
+        bakery_ids = scoped_bakery_ids()
+        start, end = time_window()
+        bucket = parse_bucket()
+        series = cached_series("revenue", analytics.revenue_series, bakery_ids, start, end, bucket)
+        return series_response(start, end, bucket, series)
+
+
+@blp.route("/analytics/top-products")
+class TopProducts(MethodView):
+    @jwt_required()
+    def get(self):
+        """
+        Best-selling products by quantity in completed orders
+        Query params: from, to (YYYY-MM-DD, default last 30 days), limit (default 10, max 50), bakery_id
+        """
+        bakery_ids = scoped_bakery_ids()
+        start, end = time_window()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_TOP_PRODUCTS)
+        products = cached_series("top-products", analytics.top_products, bakery_ids, start, end, limit)
+        return {
+            "from": start.date().isoformat(),
+            "to": (end - timedelta(days=1)).date().isoformat(),
+            "products": products,
+        }
+
+
+@blp.route("/analytics/no-shows")
+class NoShowSeries(MethodView):
+    @jwt_required()
+    def get(self):
+        """
+        Orders past their pickup time and the share never picked up, per bucket
+        Query params: from, to (YYYY-MM-DD, default last 30 days), bucket (hour|day|week), bakery_id
+        """
+        bakery_ids = scoped_bakery_ids()
+        start, end = time_window()
+        bucket = parse_bucket()
+        series = cached_series("no-shows", analytics.no_show_series, bakery_ids, start, end, bucket)
+        return series_response(start, end, bucket, series)
+
+
+@blp.route("/analytics/sell-through")
+class SellThroughSeries(MethodView):
+    @jwt_required()
+    def get(self):
+        """
+        Surplus bags sold vs listed, bucketed by pickup window start
+        Query params: from, to (YYYY-MM-DD, default last 30 days), bucket (hour|day|week), bakery_id
+        """
+        bakery_ids = scoped_bakery_ids()
+        start, end = time_window()
+        bucket = parse_bucket()
+        series = cached_series("sell-through", analytics.sell_through_series, bakery_ids, start, end, bucket)
+        return series_response(start, end, bucket, series)
@@ -6,11 +6,12 @@ from flask_jwt_extended import (
     jwt_required, get_jwt_identity, get_jwt
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from db import db
 from models.user import UserModel
 from schemas import UserRegisterSchema, UserLoginSchema, UserSchema
+from utils.token_blocklist import token_blocklist
 
 blp = Blueprint("Auth", __name__,  description="Authentication operations")
 
@@ -45,8 +46,10 @@ class Login(MethodView):
         if not user or not check_password_hash(user.password_hash, data["password"]):
             abort(401, message="Invalid credentials")
 
-        access = create_access_token(identity=str(user.id), expires_delta=timedelta(hours=1))
-        refresh = create_refresh_token(identity=str(user.id))
+        # Role travels in the token so authorization checks need no DB lookup
+        claims = {"role": user.role}
+        access = create_access_token(identity=str(user.id), additional_claims=claims, expires_delta=timedelta(hours=1))
+        refresh = create_refresh_token(identity=str(user.id), additional_claims=claims)
 
         return {
             "access_token": access,
@@ -67,7 +70,11 @@ class Refresh(MethodView):
     @jwt_required(refresh=True)
     def post(self):
         user_id = get_jwt_identity()
-        new_access = create_access_token(identity=str(user_id))
+        # Re-read the role so role changes apply from the next refresh
+        user = UserModel.find_by_id(int(user_id))
+        if not user:
+            abort(401, message="User not found")
+        new_access = create_access_token(identity=str(user_id), additional_claims={"role": user.role})
         return {"access_token": new_access}
 
 
@@ -75,6 +82,7 @@ class Refresh(MethodView):
 class Logout(MethodView):
     @jwt_required()
     def post(self):
-        jti = get_jwt()["jti"]
-        # Add to blocklist (you must implement blocklist storage)
+        token = get_jwt()
+        expires_at = datetime.utcfromtimestamp(token["exp"]) if "exp" in token else None
+        token_blocklist.revoke(token["jti"], expires_at=expires_at)
         return {"message": "Logged out"}
@@ -1,24 +1,108 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request
+from flask import request, current_app
+from sqlalchemy import func, literal, select, union_all
 from db import db
 from models.bakery import BakeryModel
-from models.user import UserModel
 from models.product import ProductModel
-from schemas import BakerySchema, BakeryDetailSchema, BakeryCreateSchema, BakeryUpdateSchema
-from decorators import owner_or_admin_required
-import math
+from models.surplus_bag import SurplusBagModel
+from models.tag import parse_tags
+from schemas import BakerySchema, BakeryDetailSchema, BakeryDetailQuerySchema, BakeryCreateSchema, BakeryUpdateSchema, NearbyBakerySchema, SparseListQuerySchema, BAKERY_DETAIL_COLLECTIONS
+from decorators import owner_or_admin_required, current_role, get_resource_or_404
+from resources.tags import parse_tags_match
+from utils.change_tracking import subscribe
+from utils.conditional import conditional, last_modified_of, model_versions
+from utils.fieldsets import fieldset_query, sparse_fieldsets
+from utils.geo import GeoGridIndex, GeoPointSet, bounding_box, haversine_km
+from utils.pagination import keyset_paginate, MAX_PAGE_SIZE, PAGINATION_HEADERS
+from utils.response_cache import cached_response, add_cache_tags
+import time
+from datetime import datetime
 
 blp = Blueprint("Bakeries",__name__,description="Operations on bakeries")
 
+
+DETAIL_PAGE_SIZE = 20
+
+
+class BakeryDetail:
+    """A bakery plus the bounded collections its detail page embeds"""
+
+    def __init__(self, bakery, **embedded):
+        self.bakery = bakery
+        self.__dict__.update(embedded)
+
+    def __getattr__(self, name):
+        # Collections left out by `include` stay out of the response (never
+        # the bakery's unbounded dynamic relationships)
+        if name in BAKERY_DETAIL_COLLECTIONS:
+            raise AttributeError(name)
+        return getattr(self.bakery, name)
+
+
+def bakery_detail(bakery, args):
+    """
+    `bakery` with the collections named in args["include"], at most `limit` each:
+    products oldest first, and available bags (stock left, pickup not over)
+    ending soonest first. Counts are totals; the rest of the products pages
+    through GET /product?bakery_id=<id>.
+    """
+    limit = min(DETAIL_PAGE_SIZE if args.get("limit") is None else args["limit"], MAX_PAGE_SIZE)
+    embedded = {}
+    if "products" in args["include"]:
+        products = ProductModel.query.filter_by(bakery_id=bakery.id)
+        items = products.order_by(ProductModel.created_at, ProductModel.id).limit(limit).all()
+        embedded["products"] = items
+        # A short page is the whole list: no count query
+        embedded["product_count"] = len(items) if len(items) < limit else products.count()
+    if "surplus_bags" in args["include"]:
+        bags = SurplusBagModel.query.filter(SurplusBagModel.bakery_id == bakery.id, SurplusBagModel.available())
+        items = bags.order_by(SurplusBagModel.pickup_end, SurplusBagModel.id).limit(limit).all()
+        embedded["surplus_bags"] = items
+        embedded["surplus_bag_count"] = len(items) if len(items) < limit else bags.count()
+    return BakeryDetail(bakery, **embedded)
+
+
+def bakery_validators(bakery_id):
+    """
+    Versions of a bakery and of what its page can embed, in one query.
+
+    Available bags depend on the clock: a bag whose pickup window ended
+    leaves the page without a write, so expired bags are counted too and the
+    latest pickup_end passed is a modification time.
+    """
+    now = datetime.utcnow()
+    own_bags = SurplusBagModel.bakery_id == bakery_id
+    rows = db.session.execute(union_all(
+        select(literal(0), *model_versions(BakeryModel)).where(BakeryModel.id == bakery_id),
+        select(literal(1), *model_versions(ProductModel)).where(ProductModel.bakery_id == bakery_id),
+        select(literal(2), *model_versions(SurplusBagModel)).where(own_bags, SurplusBagModel.available(now)),
+        select(literal(3), func.count(), literal(None), literal(None), func.max(SurplusBagModel.pickup_end))
+        .where(own_bags, SurplusBagModel.pickup_end <= now),
+    )).all()
+    rows = sorted(tuple(row) for row in rows)
+    if not rows[0][1]:
+        return None  # no such bakery: the view answers 404
+    return rows, last_modified_of(*(row[4] for row in rows))
+
+
 @blp.route("/bakery/<int:bakery_id>")
 class Bakery(MethodView):
 
-    # PUBLIC: Get bakery by ID with products and surplus bags
+    # PUBLIC: Get bakery by ID with its first products and available surplus bags
+    # (ETag / Last-Modified; conditional requests get 304 when unchanged)
+    @conditional(bakery_validators)
+    @cached_response("bakery:{bakery_id}")
+    @blp.arguments(BakeryDetailQuerySchema, location="query")
     @blp.response(200, BakeryDetailSchema)
-    def get(self, bakery_id):
-        return BakeryModel.query.get_or_404(bakery_id)
+    @blp.alt_response(304, description="Not modified (If-None-Match / If-Modified-Since)")
+    def get(self, args, bakery_id):
+        """
+        Query params: include (products, surplus_bags or none; default both),
+        limit (max items per collection, default 20, max 100)
+        """
+        return bakery_detail(BakeryModel.query.get_or_404(bakery_id), args)
 
     # OWNER or ADMIN: Update bakery
     @jwt_required()
@@ -26,7 +110,7 @@ class Bakery(MethodView):
     @blp.arguments(BakeryUpdateSchema)
     @blp.response(200, BakerySchema)
     def put(self, data, bakery_id):
-        bakery = BakeryModel.query.get_or_404(bakery_id)
+        bakery = get_resource_or_404(BakeryModel, bakery_id)
 
         for field, value in data.items():
             setattr(bakery, field, value)
@@ -38,7 +122,7 @@ class Bakery(MethodView):
     @jwt_required()
     @owner_or_admin_required(BakeryModel)
     def delete(self, bakery_id):
-        bakery = BakeryModel.query.get_or_404(bakery_id)
+        bakery = get_resource_or_404(BakeryModel, bakery_id)
         db.session.delete(bakery)
         db.session.commit()
         return {"message": "Bakery deleted"}
@@ -47,64 +131,61 @@ class Bakery(MethodView):
 @blp.route("/bakery/my")
 class MyBakery(MethodView):
     
-    # Get current user's bakery with products and surplus bags
+    # Get current user's bakery with products and surplus bags (include / limit as above)
     @jwt_required()
+    @blp.arguments(BakeryDetailQuerySchema, location="query")
     @blp.response(200, BakeryDetailSchema)
-    def get(self):
+    def get(self, args):
         user_id = int(get_jwt_identity())
         bakery = BakeryModel.query.filter_by(owner_id=user_id).first()
         
         if not bakery:
             abort(404, message="You don't have a bakery yet")
         
-        return bakery
+        return bakery_detail(bakery, args)
 
 
 @blp.route("/bakery")
 class BakeryList(MethodView):
 
     # PUBLIC: Get all bakeries
-    @blp.response(200, BakerySchema(many=True))
-    def get(self):
+    @cached_response("bakeries")
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, BakerySchema(many=True), headers=PAGINATION_HEADERS)
+    @sparse_fieldsets(BakerySchema(many=True))
+    def get(self, page_args):
         """
         Get all bakeries with optional product tag filtering
-        Query params: product_tags (comma-separated, e.g., ?product_tags=croissant,bread)
+        Query params: product_tags (comma-separated, e.g., ?product_tags=croissant,bread),
+        tags_match ("any" or "all" tags on a single product, default "any"),
+        cursor, limit (keyset pagination, oldest first), fields, exclude (sparse fieldsets)
         """
         tags_param = request.args.get('product_tags')
         name_param = request.args.get('name')
+        query = fieldset_query(BakeryModel.query, BakeryModel)
         if name_param:
             # Search bakeries by name (case-insensitive, partial match)
-            return BakeryModel.query.filter(BakeryModel.name.ilike(f"%{name_param}%")).all()
-        if tags_param:
-            # Split tags and find bakeries with matching products
-            search_tags = [tag.strip().lower() for tag in tags_param.split(',')]
-            # Find all products with matching tags
-            products = ProductModel.query.all()
-            bakery_ids = set()
-            for product in products:
-                if product.tags:
-                    product_tags = [tag.strip().lower() for tag in product.tags.split(',')]
-                    if any(tag in product_tags for tag in search_tags):
-                        bakery_ids.add(product.bakery_id)
-            # Get bakeries with matching products
-            if bakery_ids:
-                return BakeryModel.query.filter(BakeryModel.id.in_(bakery_ids)).all()
-            else:
+            query = query.filter(BakeryModel.name.ilike(f"%{name_param}%"))
+        elif tags_param:
+            # Bakeries having at least one product with the requested tags
+            search_tags = parse_tags(tags_param)
+            if not search_tags:
                 return []
-        return BakeryModel.query.all()
+            tags_match = parse_tags_match(request.args.get('tags_match'))
+            add_cache_tags("products")
+            bakery_ids = select(ProductModel.bakery_id).where(ProductModel.tag_filter(search_tags, tags_match))
+            query = query.filter(BakeryModel.id.in_(bakery_ids))
+        return keyset_paginate(query, BakeryModel, page_args)
 
     # OWNER or ADMIN: Create bakery
     @jwt_required()
     @blp.arguments(BakeryCreateSchema)
     @blp.response(201, BakerySchema)
     def post(self, data):
-        user_id = int(get_jwt_identity())
-        user = UserModel.find_by_id(user_id)
-
-        if user.role not in ["bakery_owner", "admin"]:
+        if current_role() not in ["bakery_owner", "admin"]:
             abort(403, message="Only bakery owners or admins can create bakeries")
 
-        bakery = BakeryModel(owner_id=user.id, **data)
+        bakery = BakeryModel(owner_id=int(get_jwt_identity()), **data)
         db.session.add(bakery)
         db.session.commit()
         return bakery
@@ -112,11 +193,11 @@ class BakeryList(MethodView):
 
 @blp.route("/bakery/nearby")
 class NearbyBakeries(MethodView):
-    @blp.response(200, BakerySchema(many=True))
+    @blp.response(200, NearbyBakerySchema(many=True))
     def get(self):
         """
-        Find bakeries near a given location
-        Query params: lat, lng, radius (in km, default 10)
+        Find bakeries near a given location, closest first
+        Query params: lat, lng, radius (in km, default 10), limit (default 20, max 100)
         """
         try:
             lat = float(request.args.get('lat'))
@@ -124,34 +205,110 @@ class NearbyBakeries(MethodView):
         except (TypeError, ValueError):
             abort(400, message="Invalid lat/lng parameters")
 
-        radius = float(request.args.get('radius', 10))  # default 10km
+        radius = request.args.get('radius', 10, type=float)  # default 10km
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_NEARBY_LIMIT)
 
-        # Get all bakeries with coordinates
-        bakeries = BakeryModel.query.filter(
-            BakeryModel.latitude.isnot(None),
-            BakeryModel.longitude.isnot(None)
-        ).all()
+        hits = find_nearby_bakery_ids(lat, lng, radius, limit)
+        if not hits:
+            return []
+
+        bakeries = {
+            b.id: b for b in BakeryModel.query.filter(BakeryModel.id.in_([bakery_id for bakery_id, _ in hits]))
+        }
 
-        # Filter by distance
         nearby = []
-        for bakery in bakeries:
-            distance = calculate_distance(lat, lng, bakery.latitude, bakery.longitude)
-            if distance <= radius:
+        for bakery_id, distance in hits:
+            bakery = bakeries.get(bakery_id)
+            if bakery:
+                bakery.distance = round(distance, 3)
                 nearby.append(bakery)
 
         return nearby
 
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula (in km)"""
-    R = 6371  # Earth's radius in kilometers
+@blp.route("/bakery/top")
+class TopRatedBakeries(MethodView):
+    @blp.response(200, BakerySchema(many=True))
+    def get(self):
+        """
+        Best-rated bakeries by Bayesian average (few reviews pull toward the prior)
+        Query params: limit (default 20, max 100)
+        """
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_NEARBY_LIMIT)
+        # Reads straight off the bayesian_rating index
+        return (
+            BakeryModel.query
+            .order_by(BakeryModel.bayesian_rating.desc(), BakeryModel.id)
+            .limit(limit)
+            .all()
+        )
+
+
+MAX_NEARBY_LIMIT = 100
+
+# In-process spatial index of bakery coordinates, built lazily and kept in
+# sync with bakery writes. Other workers' writes are picked up on rebuild.
+geo_index = GeoGridIndex()
+
+
+def find_nearby_bakery_ids(lat, lng, radius, limit=None):
+    """Return [(bakery_id, distance_km)] within radius, closest first"""
+    ttl = current_app.config.get("GEO_INDEX_TTL", 60)
+
+    if ttl <= 0:
+        # Index disabled: prefilter with the bounding box on the indexed columns
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        rows = db.session.query(BakeryModel.id, BakeryModel.latitude, BakeryModel.longitude).filter(
+            BakeryModel.latitude.between(min_lat, max_lat),
+            BakeryModel.longitude.between(min_lng, max_lng),
+        )
+        hits = []
+        for bakery_id, b_lat, b_lng in rows:
+            distance = haversine_km(lat, lng, b_lat, b_lng)
+            if distance <= radius:
+                hits.append((bakery_id, distance))
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:limit] if limit else hits
 
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
+    return _fresh_geo_index(ttl).nearby(lat, lng, radius, limit)
 
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
 
-    return R * c
\ No newline at end of file
+def bakery_point_set():
+    """
+    Every geolocated bakery as a vectorized GeoPointSet.
+
+    Entry point for batch geo work (dispatch, marketing jobs): e.g.
+    `bakery_point_set().nearest_many(user_locations, n=5)`.
+    """
+    return GeoPointSet.from_rows(_fresh_geo_index(current_app.config.get("GEO_INDEX_TTL", 60)).points())
+
+
+def _fresh_geo_index(ttl):
+    if geo_index.built_at is None or ttl <= 0 or time.monotonic() - geo_index.built_at > ttl:
+        geo_index.rebuild(
+            db.session.query(BakeryModel.id, BakeryModel.latitude, BakeryModel.longitude).filter(
+                BakeryModel.latitude.isnot(None),
+                BakeryModel.longitude.isnot(None)
+            )
+        )
+    return geo_index
+
+
+def _sync_geo_index(action, row):
+    if geo_index.built_at is None:
+        return
+    if action == "delete":
+        geo_index.remove(row["id"])
+    elif "latitude" in row and "longitude" in row:
+        geo_index.upsert(row["id"], row["latitude"], row["longitude"])
+    else:
+        # Partial snapshot: let the next query rebuild from the database
+        geo_index.built_at = None
+
+
+subscribe(BakeryModel, _sync_geo_index)
+
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points using Haversine formula (in km)"""
+    return haversine_km(lat1, lon1, lat2, lon2)
@@ -0,0 +1,60 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from db import db
+from models.surplus_bag import SurplusBagModel
+from schemas import HoldCreateSchema, HoldSchema
+from utils.inventory import (
+    InsufficientInventory, merge_quantities, place_hold, release_hold,
+)
+
+blp = Blueprint("Inventory", __name__, description="Short-lived surplus bag holds")
+
+
+def insufficient_message(exc):
+    bag = db.session.get(SurplusBagModel, exc.bag_id)
+    title = bag.title if bag else f"surplus bag {exc.bag_id}"
+    return f"Not enough {title} available. Only {exc.available} left"
+
+
+@blp.route("/inventory/hold")
+class InventoryHold(MethodView):
+    @jwt_required()
+    @blp.arguments(HoldCreateSchema)
+    @blp.response(201, HoldSchema)
+    def post(self, data):
+        """
+        Set surplus bags aside until checkout.
+        Pass the returned hold_id to POST /order; unused holds expire after
+        INVENTORY_HOLD_TTL seconds and the bags go back on sale.
+        """
+        quantities = merge_quantities((i["surplus_bag_id"], i["quantity"]) for i in data["items"])
+        found = {
+            bag_id for (bag_id,) in
+            db.session.query(SurplusBagModel.id).filter(SurplusBagModel.id.in_(list(quantities)))
+        }
+        missing = sorted(set(quantities) - found)
+        if missing:
+            abort(404, message=f"Surplus bag {missing[0]} not found")
+
+        try:
+            hold_id, expires_at = place_hold(int(get_jwt_identity()), quantities)
+        except InsufficientInventory as exc:
+            abort(400, message=insufficient_message(exc))
+
+        return {
+            "hold_id": hold_id,
+            "expires_at": expires_at,
+            "items": [{"surplus_bag_id": b, "quantity": q} for b, q in quantities.items()],
+        }
+
+
+@blp.route("/inventory/hold/<string:hold_id>")
+class InventoryHoldRelease(MethodView):
+    @jwt_required()
+    def delete(self, hold_id):
+        """Give up a hold early; its bags go straight back on sale"""
+        released = release_hold(hold_id, int(get_jwt_identity()))
+        if not released:
+            abort(404, message="Hold not found")
+        return {"message": "Hold released"}
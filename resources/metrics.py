@@ -0,0 +1,37 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import jwt_required
+from db import db, pool_status
+from decorators import admin_required
+from utils.response_cache import response_cache
+
+blp = Blueprint("Metrics", __name__, description="Operational metrics (admin only)")
+
+
+@blp.route("/metrics/db-pool")
+class DatabasePoolMetrics(MethodView):
+    @jwt_required()
+    @admin_required()
+    def get(self):
+        """
+        Database connection pool of the worker serving this request
+        - size / checkedin / checkedout / overflow: current pool occupancy
+          (queue pools only)
+        - connects, checkouts, invalidations, peak_checked_out: counters
+          since the worker started
+        """
+        return pool_status(db.engine)
+
+
+@blp.route("/metrics/cache")
+class ResponseCacheMetrics(MethodView):
+    @jwt_required()
+    @admin_required()
+    def get(self):
+        """
+        Public catalog response cache, as seen by the worker serving this request
+        - hits / misses / stale (entry found but invalidated) since the worker started
+        - stores, invalidations (tags bumped), errors (backend failures)
+        - keys: entries and tag tokens held (shared by all workers with redis)
+        """
+        return response_cache.stats()
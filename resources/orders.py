@@ -3,23 +3,37 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import insert
 from db import db
 from models.order import OrderModel
 from models.order_item import OrderItemModel
 from models.surplus_bag import SurplusBagModel
 from models.product import ProductModel
-from models.user import UserModel
-from schemas import OrderSchema, OrderCreateSchema, OrderStatusSchema
-from decorators import owner_or_admin_required
+from models.bakery import BakeryModel
+from schemas import OrderSchema, OrderCreateSchema, OrderStatusSchema, SparseListQuerySchema
+from decorators import owner_or_admin_required, current_role, get_resource_or_404
+from utils.fieldsets import fieldset_query, sparse_fieldsets
+from utils.loading import with_eager_loading
+from utils.pagination import keyset_paginate, PAGINATION_HEADERS
+from utils.inventory import (
+    InsufficientInventory, consume_hold, merge_quantities, release_expired_if_due, reserve,
+)
 
 blp = Blueprint("Orders", __name__, description="Operations on orders")
 
+
+def to_money(value):
+    """Decimal rounded to cents; Numeric columns may come back as float on some drivers"""
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
 @blp.route("/order/<int:order_id>/complete")
 class OrderComplete(MethodView):
     @jwt_required()
     @owner_or_admin_required(OrderModel)
     def patch(self, order_id):
-        order = OrderModel.query.get_or_404(order_id)
+        order = get_resource_or_404(OrderModel, order_id)
         if order.status == "completed":
             return {"message": "Order is already completed."}, 400
         order.status = "completed"
@@ -31,10 +45,9 @@ class Order(MethodView):
     @jwt_required()
     @blp.response(200, OrderSchema)
     def get(self, order_id):
-        order = OrderModel.query.get_or_404(order_id)
-        user = UserModel.find_by_id(get_jwt_identity())
+        order = get_resource_or_404(OrderModel, order_id)
 
-        if user.role == "customer" and order.user_id != user.id:
+        if current_role() == "customer" and order.user_id != int(get_jwt_identity()):
             abort(403, message="Forbidden")
 
         return order
@@ -42,7 +55,7 @@ class Order(MethodView):
     @jwt_required()
     @owner_or_admin_required(OrderModel)
     def delete(self, order_id):
-        order = OrderModel.query.get_or_404(order_id)
+        order = get_resource_or_404(OrderModel, order_id)
         db.session.delete(order)
         db.session.commit()
         return {"message": "Order deleted"}, 200
@@ -51,7 +64,7 @@ class Order(MethodView):
     @owner_or_admin_required(OrderModel)
     @blp.arguments(OrderStatusSchema)
     def put(self, data, order_id):
-        order = OrderModel.query.get_or_404(order_id)
+        order = get_resource_or_404(OrderModel, order_id)
         order.status = data["status"]
         db.session.commit()
         return {"message": "Order status updated"}
@@ -60,21 +73,28 @@ class Order(MethodView):
 @blp.route("/order")
 class OrderList(MethodView):
     @jwt_required()
-    @blp.response(200, OrderSchema(many=True))
-    def get(self):
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, OrderSchema(many=True), headers=PAGINATION_HEADERS)
+    @sparse_fieldsets(OrderSchema(many=True))
+    def get(self, page_args):
+        """
+        List orders visible to the caller, newest first
+        Query params: cursor, limit (keyset pagination), fields, exclude (sparse fieldsets)
+        """
         # Add version marker to confirm new code is loaded
         print("ORDER GET - VERSION 2.0", flush=True)
-        user = UserModel.find_by_id(int(get_jwt_identity()))
+        user_id = int(get_jwt_identity())
+        role = current_role()
+        # Users, bakeries, bags and items for the whole page in a fixed number of queries
+        query = fieldset_query(OrderModel.query, OrderModel)
 
-        if user.role == "customer":
-            return OrderModel.query.filter_by(user_id=user.id).all()
+        if role == "customer":
+            query = query.filter_by(user_id=user_id)
+        elif role == "bakery_owner":
+            owned = db.session.query(BakeryModel.id).filter(BakeryModel.owner_id == user_id)
+            query = query.filter(OrderModel.bakery_id.in_(owned))
 
-        if user.role == "bakery_owner":
-            return OrderModel.query.filter(
-                OrderModel.bakery_id.in_([b.id for b in user.bakeries])
-            ).all()
-
-        return OrderModel.query.all()
+        return keyset_paginate(query, OrderModel, page_args, descending=True)
 
     @jwt_required()
     def post(self):
@@ -112,6 +132,30 @@ class OrderList(MethodView):
                 except Exception as e:
                     return {"error": f"Invalid pickup_time format: {str(e)}"}, 400
             
+            for item_data in items_data:
+                quantity = item_data.get("quantity")
+                if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+                    return {"error": "Each item needs a positive integer quantity"}, 400
+                for key in ("product_id", "surplus_bag_id"):
+                    if item_data.get(key):
+                        try:
+                            item_data[key] = int(item_data[key])
+                        except (TypeError, ValueError):
+                            return {"error": f"Invalid {key}: {item_data[key]}"}, 400
+            
+            # Stale holds go back on sale before we look at stock
+            release_expired_if_due()
+            
+            # Resolve every product and bag of the basket: at most two IN queries
+            product_ids = {item["product_id"] for item in items_data if item.get("product_id")}
+            bag_ids = {item["surplus_bag_id"] for item in items_data if item.get("surplus_bag_id")}
+            products = {}
+            bags = {}
+            if product_ids:
+                products = {p.id: p for p in ProductModel.query.filter(ProductModel.id.in_(product_ids))}
+            if bag_ids:
+                bags = {b.id: b for b in SurplusBagModel.query.filter(SurplusBagModel.id.in_(bag_ids))}
+            
             # Create the order
             order = OrderModel(
                 user_id=user_id,
@@ -122,15 +166,18 @@ class OrderList(MethodView):
                 payment_intent_id=data.get("payment_intent_id")
             )
             
-            total_price = 0
+            # Money stays Decimal end to end (Numeric columns load as Decimal)
+            total_price = Decimal("0.00")
+            item_rows = []
+            bag_quantities = []
             
-            # Process each item
+            # Process each item (validation is in memory, no queries)
             for item_data in items_data:
                 quantity = item_data["quantity"]
                 
                 if "product_id" in item_data and item_data["product_id"]:
                     # Handle product order
-                    product = ProductModel.query.get(item_data["product_id"])
+                    product = products.get(item_data["product_id"])
                     if not product:
                         return {"error": f"Product {item_data['product_id']} not found"}, 404
                     
@@ -140,41 +187,39 @@ class OrderList(MethodView):
                     if not product.is_available:
                         return {"error": f"Product {product.name} is not available"}, 400
                     
-                    unit_price = float(product.price)
+                    unit_price = to_money(product.price)
                     subtotal = unit_price * quantity
                     
-                    order_item = OrderItemModel(
-                        product_id=product.id,
-                        quantity=quantity,
-                        unit_price=unit_price,
-                        subtotal=subtotal
-                    )
-                    order.order_items.append(order_item)
+                    item_rows.append({
+                        "product_id": product.id,
+                        "surplus_bag_id": None,
+                        "quantity": quantity,
+                        "unit_price": unit_price,
+                        "subtotal": subtotal,
+                    })
                     total_price += subtotal
                     
                 elif "surplus_bag_id" in item_data and item_data["surplus_bag_id"]:
                     # Handle surplus bag order
-                    bag = SurplusBagModel.query.get(item_data["surplus_bag_id"])
+                    bag = bags.get(item_data["surplus_bag_id"])
                     if not bag:
                         return {"error": f"Surplus bag {item_data['surplus_bag_id']} not found"}, 404
                     
                     if bag.bakery_id != bakery_id:
                         return {"error": f"Surplus bag {bag.title} does not belong to bakery {bakery_id}"}, 400
                     
-                    if bag.quantity_available < quantity:
-                        return {"error": f"Not enough {bag.title} available. Only {bag.quantity_available} left"}, 400
-                    
-                    unit_price = float(bag.sale_price)
+                    # Stock is checked and taken atomically by reserve() below
+                    unit_price = to_money(bag.sale_price)
                     subtotal = unit_price * quantity
                     
-                    order_item = OrderItemModel(
-                        surplus_bag_id=bag.id,
-                        quantity=quantity,
-                        unit_price=unit_price,
-                        subtotal=subtotal
-                    )
-                    order.order_items.append(order_item)
-                    bag.quantity_available -= quantity
+                    item_rows.append({
+                        "product_id": None,
+                        "surplus_bag_id": bag.id,
+                        "quantity": quantity,
+                        "unit_price": unit_price,
+                        "subtotal": subtotal,
+                    })
+                    bag_quantities.append((bag.id, quantity))
                     
                     if len(items_data) == 1:
                         order.surplus_bag_id = bag.id
@@ -184,14 +229,37 @@ class OrderList(MethodView):
                     return {"error": "Each item must have either product_id or surplus_bag_id"}, 400
             
             order.total_price = total_price
+            bag_quantities = merge_quantities(bag_quantities)
+            
+            # Take the bags out of stock: from the customer's hold if they have
+            # one, otherwise with one conditional UPDATE for all bags
+            hold_id = data.get("hold_id")
+            if hold_id:
+                held = consume_hold(hold_id, user_id)
+                if not held:
+                    db.session.rollback()
+                    return {"error": "Hold not found or expired"}, 409
+                if held != bag_quantities:
+                    db.session.rollback()
+                    return {"error": "Order items do not match the held surplus bags"}, 400
+            else:
+                try:
+                    reserve(bag_quantities)
+                except InsufficientInventory as exc:
+                    bag = bags[exc.bag_id]
+                    return {"error": f"Not enough {bag.title} available. Only {exc.available} left"}, 400
             
-            # Save to database
+            # Save to database: the order, then all its items in one executemany
             db.session.add(order)
+            db.session.flush()
+            order_id = order.id
+            db.session.execute(insert(OrderItemModel), [dict(row, order_id=order_id) for row in item_rows])
             db.session.commit()
             
-            # Return success response
-            from schemas import OrderSchema
+            # Return success response; reload with eager loading, since the
+            # commit expired every item, product and bag
             schema = OrderSchema()
+            order = with_eager_loading(OrderModel.query, schema, OrderModel).filter_by(id=order_id).one()
             return schema.dump(order), 201
             
         except Exception as e:
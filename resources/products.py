@@ -6,8 +6,14 @@ from db import db
 from models.product import ProductModel
 from models.bakery import BakeryModel
 from models.user import UserModel
-from schemas import ProductSchema, ProductCreateSchema, ProductUpdateSchema
-from decorators import owner_or_admin_required
+from models.tag import parse_tags
+from schemas import ProductSchema, ProductCreateSchema, ProductUpdateSchema, SparseListQuerySchema
+from decorators import owner_or_admin_required, current_role, get_resource_or_404
+from resources.tags import parse_tags_match
+from utils import product_templates
+from utils.fieldsets import fieldset_query, sparse_fieldsets
+from utils.pagination import keyset_paginate, PAGINATION_HEADERS
+from utils.response_cache import cached_response
 from sqlalchemy import func
 
 blp = Blueprint("Products", __name__, description="Operations on products")
@@ -23,7 +29,7 @@ class Product(MethodView):
     @blp.arguments(ProductUpdateSchema)
     @blp.response(200, ProductSchema)
     def put(self, data, product_id):
-        product = ProductModel.query.get_or_404(product_id)
+        product = get_resource_or_404(ProductModel, product_id)
         for field, value in data.items():
             setattr(product, field, value)
         db.session.commit()
@@ -32,7 +38,7 @@ class Product(MethodView):
     @jwt_required()
     @owner_or_admin_required(ProductModel)
     def delete(self, product_id):
-        product = ProductModel.query.get_or_404(product_id)
+        product = get_resource_or_404(ProductModel, product_id)
         db.session.delete(product)
         db.session.commit()
         return {"message": "Product deleted"}
@@ -40,39 +46,39 @@ class Product(MethodView):
 
 @blp.route("/product")
 class ProductList(MethodView):
-    @blp.response(200, ProductSchema(many=True))
-    def get(self):
+    @cached_response("products", "bakeries")
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, ProductSchema(many=True), headers=PAGINATION_HEADERS)
+    @sparse_fieldsets(ProductSchema(many=True))
+    def get(self, page_args):
         """
         Get all products with optional filtering
         Query params: 
         - bakery_id: filter by bakery
         - tags: comma-separated tags (e.g., ?tags=croissant,pastry)
+        - tags_match: "any" (default) or "all" of the given tags
+        - cursor, limit: keyset pagination (oldest first)
+        - fields, exclude: sparse fieldsets (e.g. ?fields=id,name,price)
         """
         bakery_id = request.args.get('bakery_id', type=int)
         tags_param = request.args.get('tags')
+        tags_match = parse_tags_match(request.args.get('tags_match'))
         name_param = request.args.get('name')
-        # Start with base query
-        query = ProductModel.query
+        # Start with base query (bakery loaded in the same query, not per row)
+        query = fieldset_query(ProductModel.query, ProductModel)
         # Filter by bakery if specified
         if bakery_id:
             query = query.filter_by(bakery_id=bakery_id)
         # Filter by name if specified
         if name_param:
             query = query.filter(ProductModel.name.ilike(f"%{name_param}%"))
-            return query.all()
-        # Filter by tags if specified
+            return keyset_paginate(query, ProductModel, page_args)
+        # Filter by tags if specified (indexed join on the normalized tag tables)
         if tags_param:
-            search_tags = [tag.strip().lower() for tag in tags_param.split(',')]
-            products = query.all()
-            # Filter products that contain any of the search tags
-            filtered_products = []
-            for product in products:
-                if product.tags:
-                    product_tags = [tag.strip().lower() for tag in product.tags.split(',')]
-                    if any(tag in product_tags for tag in search_tags):
-                        filtered_products.append(product)
-            return filtered_products
-        return query.all()
+            search_tags = parse_tags(tags_param)
+            if search_tags:
+                query = query.filter(ProductModel.tag_filter(search_tags, tags_match))
+        return keyset_paginate(query, ProductModel, page_args)
 
     @jwt_required()
     @blp.arguments(ProductCreateSchema)
@@ -99,66 +105,11 @@ class ProductRecommendations(MethodView):
         - exclude_bakery_id: exclude products from specific bakery (usually the owner's bakery)
         - category: filter by category
         """
-        user_id = int(get_jwt_identity())
-        user = UserModel.find_by_id(user_id)
-        
-        # Get bakery_id to exclude (owner's bakery)
         exclude_bakery_id = request.args.get('exclude_bakery_id', type=int)
         category = request.args.get('category')
-        
-        # Build query
-        query = ProductModel.query
-        
-        if exclude_bakery_id:
-            query = query.filter(ProductModel.bakery_id != exclude_bakery_id)
-        
-        if category:
-            query = query.filter(ProductModel.category == category)
-        
-        products = query.all()
-        
-        # Group products by name to find common products
-        product_groups = {}
-        for product in products:
-            name_lower = product.name.lower().strip()
-            if name_lower not in product_groups:
-                product_groups[name_lower] = {
-                    'name': product.name,
-                    'count': 0,
-                    'example': product,
-                    'categories': set(),
-                    'avg_price': []
-                }
-            
-            product_groups[name_lower]['count'] += 1
-            if product.category:
-                product_groups[name_lower]['categories'].add(product.category)
-            if product.price:
-                product_groups[name_lower]['avg_price'].append(float(product.price))
-        
-        # Convert to recommendation list (sorted by popularity)
-        recommendations = []
-        for group in product_groups.values():
-            if group['count'] >= 1:  # Show products that appear at least once
-                avg_price = sum(group['avg_price']) / len(group['avg_price']) if group['avg_price'] else None
-                
-                recommendations.append({
-                    'template_product_id': group['example'].id,
-                    'name': group['name'],
-                    'description': group['example'].description,
-                    'category': group['example'].category,
-                    'allergens': group['example'].allergens,
-                    'tags': group['example'].tags,
-                    'image_url': group['example'].image_url,
-                    'popularity': group['count'],
-                    'avg_price': round(avg_price, 2) if avg_price else None,
-                    'categories': list(group['categories'])
-                })
-        
-        # Sort by popularity
-        recommendations.sort(key=lambda x: x['popularity'], reverse=True)
-        
-        return {'recommendations': recommendations[:50]}  # Limit to top 50
+
+        # Served from the product_templates catalog (grouped in SQL)
+        return {'recommendations': product_templates.popular(category, exclude_bakery_id, limit=50)}
 
 
 @blp.route("/product/from-template/<int:template_product_id>")
@@ -171,7 +122,6 @@ class ProductFromTemplate(MethodView):
         Body: { "bakery_id": int, "price": float, "quantity_available": int, "is_available": bool }
         """
         user_id = int(get_jwt_identity())
-        user = UserModel.find_by_id(user_id)
         
         # Get the template product
         template = ProductModel.query.get_or_404(template_product_id)
@@ -186,7 +136,7 @@ class ProductFromTemplate(MethodView):
         bakery = BakeryModel.query.get_or_404(bakery_id)
         
         # Verify ownership
-        if user.role == "bakery_owner" and bakery.owner_id != user.id:
+        if current_role() == "bakery_owner" and bakery.owner_id != user_id:
             abort(403, message="You can only create products for your own bakery")
         
         # Check if product with same name already exists for this bakery
@@ -1,15 +1,14 @@
+from flask import request
 from flask.views import MethodView
 from flask_smorest import Blueprint
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
-from db import db
+from flask_jwt_extended import jwt_required
 
-from models.user import UserModel
-from models.order import OrderModel
 from models.surplus_bag import SurplusBagModel
-from models.bakery import BakeryModel
+from models.user_recommendation import UserRecommendationModel
 
 from schemas import SurplusBagSchema
+from decorators import current_user
+from utils.loading import with_eager_loading
 
 blp = Blueprint(
     "Recommendations",
@@ -25,63 +24,47 @@ class Recommendations(MethodView):
     @blp.response(200, SurplusBagSchema(many=True))
     def get(self):
         """
-        Recommend surplus bags based on:
-        - User’s past orders
-        - Favorite bakery categories
-        - Bags still available and active
+        Recommend available surplus bags, best match first, scored on:
+        - Bakeries and tags from the user's past orders
+        - Distance from the user's saved location
+        - How soon the pickup window closes
+        - Bakery rating
+        Query params: limit (default 10, max 50)
         """
 
-        user_id = int(get_jwt_identity())
-        user = UserModel.find_by_id(user_id)
+        user = current_user()
 
         if not user:
             return []
 
-        # 1. Get bakeries the user ordered from before
-        past_bakery_ids = (
-            db.session.query(OrderModel.bakery_id)
-            .filter(OrderModel.user_id == user.id)
-            .distinct()
-            .all()
-        )
-        past_bakery_ids = [row[0] for row in past_bakery_ids]
+        # Imported here: numpy is only loaded once someone asks for recommendations
+        from utils import recommendations
 
-        # 2. If user has no history → fallback to popular bags
-        if not past_bakery_ids:
-            return (
-                SurplusBagModel.query
-                .filter(
-                    SurplusBagModel.status == "active",
-                    SurplusBagModel.quantity_available > 0
-                )
-                .order_by(SurplusBagModel.pickup_start.asc())
-                .limit(10)
-                .all()
-            )
+        limit = min(max(request.args.get('limit', 10, type=int), 1), recommendations.MAX_RECOMMENDATIONS)
+        available = SurplusBagModel.available()
+        query = with_eager_loading(SurplusBagModel.query, SurplusBagSchema(), SurplusBagModel)
 
-        # 3. Recommend bags from bakeries the user likes
-        recommended_bags = (
-            SurplusBagModel.query
-            .filter(
-                SurplusBagModel.bakery_id.in_(past_bakery_ids),
-                SurplusBagModel.status == "active",
-                SurplusBagModel.quantity_available > 0
-            )
-            .order_by(SurplusBagModel.pickup_start.asc())
+        # Precomputed by `flask recs build`: one indexed read
+        precomputed = (
+            query.join(UserRecommendationModel, UserRecommendationModel.surplus_bag_id == SurplusBagModel.id)
+            .filter(UserRecommendationModel.user_id == user.id, available)
+            .order_by(UserRecommendationModel.rank)
+            .limit(limit)
             .all()
         )
+        if len(precomputed) == limit:
+            return precomputed
 
-        # 4. If no bags available from favorite bakeries → fallback
-        if not recommended_bags:
-            return (
-                SurplusBagModel.query
-                .filter(
-                    SurplusBagModel.status == "active",
-                    SurplusBagModel.quantity_available > 0
-                )
-                .order_by(SurplusBagModel.pickup_start.asc())
-                .limit(10)
-                .all()
-            )
+        # Users the last build did not cover, or whose stored picks sold out
+        # or expired since: score on request and top up.
+        # Rank a few spares, cached picks may have sold out since.
+        returned = {bag.id for bag in precomputed}
+        bag_ids = [bag_id for bag_id in recommendations.recommend(user, recommendations.MAX_RECOMMENDATIONS)
+                   if bag_id not in returned]
+        if not bag_ids:
+            return precomputed
 
-        return recommended_bags
+        bags = query.filter(SurplusBagModel.id.in_(bag_ids), available).all()
+        position = {bag_id: i for i, bag_id in enumerate(bag_ids)}
+        bags.sort(key=lambda bag: position[bag.id])
+        return precomputed + bags[:limit - len(precomputed)]
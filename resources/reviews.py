@@ -5,8 +5,11 @@ from db import db
 from models.review import ReviewModel
 from models.order import OrderModel
 from models.bakery import BakeryModel
-from schemas import ReviewSchema, ReviewCreateSchema, ReviewUpdateSchema
+from schemas import ReviewSchema, ReviewCreateSchema, ReviewUpdateSchema, SparseListQuerySchema
 from decorators import admin_required
+from utils.fieldsets import fieldset_query, sparse_fieldsets
+from utils.pagination import keyset_paginate, PAGINATION_HEADERS
+from utils import ratings
 
 blp = Blueprint("Reviews", __name__, description="Operations on reviews")
 
@@ -24,12 +27,13 @@ class Review(MethodView):
         if review.user_id != int(get_jwt_identity()):
             abort(403, message="Forbidden")
 
+        old_rating = review.rating
         for field, value in data.items():
             setattr(review, field, value)
 
-        # Update bakery rating
-        if review.bakery_id:
-            update_bakery_rating(review.bakery_id)
+        # Adjust the bakery's rating aggregates in the same transaction
+        if review.rating != old_rating:
+            ratings.review_changed(review.bakery_id, old_rating, review.rating)
 
         db.session.commit()
         return review
@@ -42,22 +46,22 @@ class Review(MethodView):
         if review.user_id != user_id:
             abort(403, message="Forbidden")
 
-        bakery_id = review.bakery_id
+        ratings.review_removed(review.bakery_id, review.rating)
         db.session.delete(review)
         db.session.commit()
 
-        # Update bakery rating after deletion
-        if bakery_id:
-            update_bakery_rating(bakery_id)
-
         return {"message": "Review deleted"}
 
 
 @blp.route("/review")
 class ReviewList(MethodView):
-    @blp.response(200, ReviewSchema(many=True))
-    def get(self):
-        return ReviewModel.query.all()
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, ReviewSchema(many=True), headers=PAGINATION_HEADERS)
+    @sparse_fieldsets(ReviewSchema(many=True))
+    def get(self, page_args):
+        """List reviews, newest first. Query params: cursor, limit, fields, exclude"""
+        query = fieldset_query(ReviewModel.query, ReviewModel)
+        return keyset_paginate(query, ReviewModel, page_args, descending=True)
 
     @jwt_required()
     @blp.arguments(ReviewCreateSchema)
@@ -90,33 +94,21 @@ class ReviewList(MethodView):
         )
 
         db.session.add(review)
+        # Bakery rating aggregates move in the same transaction as the review
+        ratings.review_added(review.bakery_id, review.rating)
         db.session.commit()
 
-        # Update bakery rating
-        if review.bakery_id:
-            update_bakery_rating(review.bakery_id)
-
         return review
 
 
 @blp.route("/bakery/<int:bakery_id>/reviews")
 class BakeryReviews(MethodView):
-    @blp.response(200, ReviewSchema(many=True))
-    def get(self, bakery_id):
-        """Get all reviews for a specific bakery"""
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, ReviewSchema(many=True), headers=PAGINATION_HEADERS)
+    @sparse_fieldsets(ReviewSchema(many=True))
+    def get(self, page_args, bakery_id):
+        """Get reviews for a specific bakery, newest first. Query params: cursor, limit, fields, exclude"""
         bakery = BakeryModel.query.get_or_404(bakery_id)
-        return ReviewModel.query.filter_by(bakery_id=bakery_id).order_by(ReviewModel.created_at.desc()).all()
-
-
-def update_bakery_rating(bakery_id):
-    """Helper function to update bakery's average rating"""
-    bakery = BakeryModel.query.get(bakery_id)
-    if bakery:
-        reviews = ReviewModel.query.filter_by(bakery_id=bakery_id).all()
-        if reviews:
-            bakery.rating = sum(r.rating for r in reviews) / len(reviews)
-            bakery.review_count = len(reviews)
-        else:
-            bakery.rating = 0.0
-            bakery.review_count = 0
-        db.session.commit()
\ No newline at end of file
+        query = fieldset_query(ReviewModel.query, ReviewModel)
+        return keyset_paginate(query.filter_by(bakery_id=bakery_id), ReviewModel, page_args, descending=True)
+
@@ -0,0 +1,81 @@
+from datetime import datetime
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask import request
+from db import db
+from models.bakery import BakeryModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from utils.change_tracking import subscribe
+from utils.search import KINDS, search_index
+
+blp = Blueprint("Search", __name__, description="Full-text search over bakeries, products and bags")
+
+
+@blp.route("/search")
+class Search(MethodView):
+    def get(self):
+        """
+        Ranked full-text search (accent-insensitive, last word matched as a prefix)
+        Query params:
+        - q: search text (e.g., ?q=eclair chocolat)
+        - type: comma-separated subset of bakery,product,surplus_bag (default all)
+        - limit: max hits (default 20, max 100)
+        Each hit's snippet is plain text (not HTML); highlights lists the
+        [start, end) character offsets of the matched words in it.
+        """
+        q = request.args.get('q', '').strip()
+        if not q:
+            abort(400, message="q is required")
+
+        kinds = None
+        if request.args.get('type'):
+            kinds = [k.strip() for k in request.args.get('type').split(',')]
+            if any(k not in KINDS for k in kinds):
+                abort(400, message="type must be bakery, product or surplus_bag")
+
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        # Over-fetch a little: expired bags are dropped below
+        hits = search_index.search(db.engine, q, kinds=kinds, limit=limit + 10)
+
+        bag_ids = [hit["id"] for hit in hits if hit["type"] == "surplus_bag"]
+        if bag_ids:
+            available = {
+                row.id for row in db.session.query(SurplusBagModel.id).filter(
+                    SurplusBagModel.id.in_(bag_ids),
+                    SurplusBagModel.pickup_end >= datetime.utcnow(),
+                    SurplusBagModel.quantity_available > 0
+                )
+            }
+            hits = [hit for hit in hits if hit["type"] != "surplus_bag" or hit["id"] in available]
+
+        return {"query": q, "results": hits[:limit]}
+
+
+@blp.route("/search/autocomplete")
+class SearchAutocomplete(MethodView):
+    def get(self):
+        """
+        Prefix suggestions on bakery, product and bag names
+        Query params: q (typed text), limit (default 10, max 25)
+        """
+        q = request.args.get('q', '').strip()
+        if not q:
+            return {"suggestions": []}
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 25)
+        return {"suggestions": search_index.autocomplete(db.engine, q, limit=limit)}
+
+
+def _index_hook(kind):
+    def sync(action, row):
+        if action == "delete":
+            search_index.remove(db.engine, kind, row["id"])
+        else:
+            search_index.refresh(db.engine, kind, row["id"])
+    sync.__name__ = f"sync_search_{kind}"
+    return sync
+
+
+subscribe(BakeryModel, _index_hook("bakery"))
+subscribe(ProductModel, _index_hook("product"))
+subscribe(SurplusBagModel, _index_hook("surplus_bag"))
@@ -3,11 +3,18 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from flask_jwt_extended import jwt_required
 from flask import request
+from marshmallow import EXCLUDE, ValidationError
 from db import db
 from models.surplus_bag import SurplusBagModel
 from models.bakery import BakeryModel
-from schemas import SurplusBagSchema, SurplusBagCreateSchema, SurplusBagUpdateSchema
-from decorators import owner_or_admin_required
+from models.tag import parse_tags
+from schemas import SurplusBagSchema, SurplusBagCreateSchema, SurplusBagUpdateSchema, CursorPageQuerySchema, SparseListQuerySchema
+from decorators import owner_or_admin_required, get_resource_or_404
+from resources.tags import parse_tags_match
+from utils.conditional import conditional, last_modified_of, version_columns
+from utils.fieldsets import fieldset_query, sparse_fieldsets
+from utils.pagination import keyset_paginate, page_query, PAGINATION_HEADERS
+from utils.response_cache import cached_response
 
 blp = Blueprint("SurplusBags", __name__, description="Operations on surplus bags")
 
@@ -22,7 +29,7 @@ class SurplusBag(MethodView):
     @blp.arguments(SurplusBagUpdateSchema)
     @blp.response(200, SurplusBagSchema)
     def put(self, data, surplus_bag_id):
-        bag = SurplusBagModel.query.get_or_404(surplus_bag_id)
+        bag = get_resource_or_404(SurplusBagModel, surplus_bag_id)
         for field, value in data.items():
             setattr(bag, field, value)
         db.session.commit()
@@ -31,48 +38,75 @@ class SurplusBag(MethodView):
     @jwt_required()
     @owner_or_admin_required(SurplusBagModel)
     def delete(self, surplus_bag_id):
-        bag = SurplusBagModel.query.get_or_404(surplus_bag_id)
+        bag = get_resource_or_404(SurplusBagModel, surplus_bag_id)
         db.session.delete(bag)
         db.session.commit()
         return {"message": "Surplus bag deleted"}
 
 
+def filter_surplus_bags(query):
+    """Apply the list's bakery_id / tags / tags_match query params"""
+    bakery_id = request.args.get('bakery_id', type=int)
+    tags_param = request.args.get('tags')
+    tags_match = parse_tags_match(request.args.get('tags_match'))
+
+    # Filter by bakery if specified
+    if bakery_id:
+        query = query.filter_by(bakery_id=bakery_id)
+
+    # Filter by tags if specified (indexed join on the normalized tag tables)
+    if tags_param:
+        search_tags = parse_tags(tags_param)
+        if search_tags:
+            query = query.filter(SurplusBagModel.tag_filter(search_tags, tags_match))
+    return query
+
+
+def surplus_bag_list_validators():
+    """Versions of the requested page's bags and of their bakeries (embedded in each bag)"""
+    try:
+        page_args = CursorPageQuerySchema().load(request.args, unknown=EXCLUDE)
+    except ValidationError:
+        return None  # the view answers 422
+    query, _ = page_query(filter_surplus_bags(SurplusBagModel.query), SurplusBagModel, page_args)
+    page = query.with_entities(
+        SurplusBagModel.id, SurplusBagModel.bakery_id, SurplusBagModel.version, SurplusBagModel.updated_at
+    ).subquery()
+    row = (
+        db.session.query(
+            *version_columns(page.c.id, page.c.version, page.c.updated_at),
+            db.func.sum(BakeryModel.version),
+            db.func.max(BakeryModel.updated_at),
+        )
+        .select_from(page)
+        .join(BakeryModel, BakeryModel.id == page.c.bakery_id)
+        .one()
+    )
+    return tuple(row), last_modified_of(row[3], row[5])
+
+
 @blp.route("/surplus_bag")
 class SurplusBagList(MethodView):
-    @blp.response(200, SurplusBagSchema(many=True))
-    def get(self):
+    @conditional(surplus_bag_list_validators)
+    @cached_response("surplus_bags", "bakeries")
+    @blp.arguments(SparseListQuerySchema, location="query")
+    @blp.response(200, SurplusBagSchema(many=True), headers=PAGINATION_HEADERS)
+    @blp.alt_response(304, description="Not modified (If-None-Match / If-Modified-Since)")
+    @sparse_fieldsets(SurplusBagSchema(many=True))
+    def get(self, page_args):
         """
         Get all surplus bags with optional filtering
         Query params: 
         - bakery_id: filter by bakery
         - tags: comma-separated tags (e.g., ?tags=sweet,savory)
+        - tags_match: "any" (default) or "all" of the given tags
+        - cursor, limit: keyset pagination (oldest first)
+        - fields, exclude: sparse fieldsets (e.g. ?fields=id,title,price,bakery.name)
+        Sends ETag / Last-Modified; conditional requests get 304 when unchanged.
         """
-        bakery_id = request.args.get('bakery_id', type=int)
-        tags_param = request.args.get('tags')
-        
-        # Start with base query
-        query = SurplusBagModel.query
-        
-        # Filter by bakery if specified
-        if bakery_id:
-            query = query.filter_by(bakery_id=bakery_id)
-        
-        # Filter by tags if specified
-        if tags_param:
-            search_tags = [tag.strip().lower() for tag in tags_param.split(',')]
-            bags = query.all()
-            
-            # Filter bags that contain any of the search tags
-            filtered_bags = []
-            for bag in bags:
-                if bag.tags:
-                    bag_tags = [tag.strip().lower() for tag in bag.tags.split(',')]
-                    if any(tag in bag_tags for tag in search_tags):
-                        filtered_bags.append(bag)
-            
-            return filtered_bags
-        
-        return query.all()
+        # Base query (bakery loaded in the same query, not per row)
+        query = fieldset_query(SurplusBagModel.query, SurplusBagModel)
+        return keyset_paginate(filter_surplus_bags(query), SurplusBagModel, page_args)
 
     @jwt_required()
     @blp.arguments(SurplusBagCreateSchema)
@@ -0,0 +1,45 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint, abort
+from flask import request
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+
+blp = Blueprint("Tags", __name__, description="Tag facets for products and surplus bags")
+
+TAGGED_MODELS = {
+    "product": ProductModel,
+    "surplus_bag": SurplusBagModel,
+}
+
+
+def parse_tags_match(value):
+    """Validate the tags_match query param ("any" or "all")"""
+    value = (value or "any").lower()
+    if value not in ("any", "all"):
+        abort(400, message="tags_match must be 'any' or 'all'")
+    return value
+
+
+@blp.route("/tag")
+class TagFacets(MethodView):
+    def get(self):
+        """
+        Tag counts for building filter facets
+        Query params:
+        - type: "product" (default) or "surplus_bag"
+        - bakery_id: only count items of this bakery
+        - limit: max tags returned (default 50)
+        """
+        kind = request.args.get('type', 'product')
+        model = TAGGED_MODELS.get(kind)
+        if model is None:
+            abort(400, message="type must be 'product' or 'surplus_bag'")
+
+        query = model.query
+        bakery_id = request.args.get('bakery_id', type=int)
+        if bakery_id:
+            query = query.filter_by(bakery_id=bakery_id)
+
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        counts = model.tag_counts(query, limit=limit)
+        return {"type": kind, "tags": [{"name": name, "count": count} for name, count in counts]}
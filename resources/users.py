@@ -1,10 +1,10 @@
 #resources/users.py
 from flask.views import MethodView
 from flask_smorest import Blueprint, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from db import db
-from models.user import UserModel
 from schemas import UserSchema, UserUpdateSchema
+from decorators import current_user
 
 blp = Blueprint("Users", __name__, description="User profile operations")
 
@@ -14,7 +14,7 @@ class UserProfile(MethodView):
     def get(self):
         try:
             from flask import jsonify
-            user = UserModel.find_by_id(get_jwt_identity())
+            user = current_user()
             if not user:
                 abort(404, message="User not found")
             
@@ -42,7 +42,7 @@ class UserProfile(MethodView):
     @blp.arguments(UserUpdateSchema)
     @blp.response(200, UserSchema)
     def put(self, data):
-        user = UserModel.find_by_id(int(get_jwt_identity()))
+        user = current_user()
         if not user:
             abort(404, message="User not found")
 
@@ -59,7 +59,7 @@ class UserProfile(MethodView):
 
     @jwt_required()
     def delete(self):
-        user = UserModel.find_by_id(int(get_jwt_identity()))
+        user = current_user()
         if not user:
             abort(404, message="User not found")
         db.session.delete(user)
@@ -1,11 +1,16 @@
-from marshmallow import Schema, fields, validates, ValidationError, pre_load, post_dump, EXCLUDE
+from marshmallow import Schema, fields, validates, ValidationError, pre_load, post_load, post_dump, EXCLUDE, validate
 import re
 
+from utils.serialization import CompiledSchema
+
+# Response schemas derive from CompiledSchema: same output, generated dump
+# functions (see utils/serialization.py)
+
 # ============================================================
 # USER SCHEMAS
 # ============================================================
 
-class PlainUserSchema(Schema):
+class PlainUserSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     email = fields.Email(required=True)
     first_name = fields.Str()
@@ -72,7 +77,7 @@ class UserUpdateSchema(Schema):
 # BAKERY SCHEMAS
 # ============================================================
 
-class PlainBakerySchema(Schema):
+class PlainBakerySchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     name = fields.Str(required=True)
     city = fields.Str()
@@ -117,21 +122,63 @@ class BakerySchema(PlainBakerySchema):
     longitude = fields.Float()
     specialties = fields.Str()
     review_count = fields.Int(dump_only=True)
+    bayesian_rating = fields.Float(dump_only=True)
+    rating_stddev = fields.Float(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
     # Removed products and surplus_bags to prevent loading all items
 
 
+class NearbyBakerySchema(BakerySchema):
+    distance = fields.Float(dump_only=True)  # km from the requested point
+
+
 class BakeryDetailSchema(BakerySchema):
     """Extended schema with products and surplus bags for detail view"""
     products = fields.List(fields.Nested(lambda: PlainProductSchema()), dump_only=True)
     surplus_bags = fields.List(fields.Nested(lambda: PlainSurplusBagSchema()), dump_only=True)
+    # Totals behind the capped lists (surplus_bag_count: available bags only)
+    product_count = fields.Int(dump_only=True)
+    surplus_bag_count = fields.Int(dump_only=True)
+
+
+BAKERY_DETAIL_COLLECTIONS = ("products", "surplus_bags")
+
+
+class BakeryDetailQuerySchema(Schema):
+    """Query args of a bakery's detail page"""
+    include = fields.Str(metadata={
+        "description": "Comma-separated collections to embed: products, surplus_bags, "
+                       "or none (default: both)"
+    })
+    limit = fields.Int(
+        validate=validate.Range(min=0),
+        metadata={"description": "Max products and max surplus bags embedded (default 20, capped at 100)"},
+    )
+
+    @validates("include")
+    def validate_include(self, value, **kwargs):
+        names = {name.strip() for name in value.split(",") if name.strip()}
+        if names == {"none"}:
+            return
+        unknown = names - set(BAKERY_DETAIL_COLLECTIONS)
+        if unknown:
+            raise ValidationError(
+                f"Unknown collections: {', '.join(sorted(unknown))}. Use products, surplus_bags or none"
+            )
+
+    @post_load
+    def parse_include(self, data, **kwargs):
+        # Blank means the default, like any blank query arg (utils/response_cache.py)
+        names = {name.strip() for name in data.get("include", "").split(",") if name.strip()}
+        data["include"] = names - {"none"} if names else set(BAKERY_DETAIL_COLLECTIONS)
+        return data
 
 
 # ============================================================
 # PRODUCT SCHEMAS
 # ============================================================
 
-class PlainProductSchema(Schema):
+class PlainProductSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     name = fields.Str(required=True)
     price = fields.Float(required=True)
@@ -179,7 +226,7 @@ class ProductSchema(PlainProductSchema):
 # SURPLUS BAG SCHEMAS
 # ============================================================
 
-class PlainSurplusBagSchema(Schema):
+class PlainSurplusBagSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     title = fields.Str(required=True)
     sale_price = fields.Float(required=True)
@@ -337,7 +384,7 @@ class OrderItemCreateSchema(Schema):
     quantity = fields.Int(required=True)
 
 
-class OrderItemSchema(Schema):
+class OrderItemSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     product_id = fields.Int()
     surplus_bag_id = fields.Int()
@@ -352,7 +399,7 @@ class OrderItemSchema(Schema):
 # ORDER SCHEMAS
 # ============================================================
 
-class PlainOrderSchema(Schema):
+class PlainOrderSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     status = fields.Str()
     total_price = fields.Float()
@@ -390,7 +437,7 @@ class OrderSchema(PlainOrderSchema):
 # REVIEW SCHEMAS
 # ============================================================
 
-class PlainReviewSchema(Schema):
+class PlainReviewSchema(CompiledSchema):
     id = fields.Int(dump_only=True)
     rating = fields.Int(required=True)
     comment = fields.Str()
@@ -415,3 +462,48 @@ class ReviewSchema(PlainReviewSchema):
     user = fields.Nested(PlainUserSchema(), dump_only=True)
     bakery = fields.Nested(PlainBakerySchema(), dump_only=True)
 
+
+
+# ============================================================
+# INVENTORY HOLD SCHEMAS
+# ============================================================
+
+class HoldItemSchema(Schema):
+    surplus_bag_id = fields.Int(required=True)
+    quantity = fields.Int(required=True, validate=validate.Range(min=1))
+
+
+class HoldCreateSchema(Schema):
+    items = fields.List(fields.Nested(HoldItemSchema), required=True, validate=validate.Length(min=1))
+
+
+class HoldSchema(CompiledSchema):
+    hold_id = fields.Str(dump_only=True)
+    expires_at = fields.DateTime(dump_only=True)
+    items = fields.List(fields.Nested(HoldItemSchema), dump_only=True)
+
+
+# ============================================================
+# PAGINATION SCHEMAS
+# ============================================================
+
+class CursorPageQuerySchema(Schema):
+    """Keyset pagination query args; the next cursor comes back in X-Next-Cursor / Link"""
+    cursor = fields.Str(metadata={"description": "Opaque cursor from the previous page"})
+    limit = fields.Int(
+        validate=validate.Range(min=1),
+        metadata={"description": "Page size (default 50, capped at 100)"},
+    )
+
+
+class SparseListQuerySchema(CursorPageQuerySchema):
+    """Pagination plus sparse fieldsets (utils/fieldsets.py) for list endpoints"""
+    # Not named fields / exclude: those are Schema attributes
+    only = fields.Str(
+        data_key="fields",
+        metadata={"description": "Comma-separated fields to return, dotted for nested ones (e.g. id,name,bakery.name)"},
+    )
+    exclude_fields = fields.Str(
+        data_key="exclude",
+        metadata={"description": "Comma-separated fields to leave out (e.g. description,bakery)"},
+    )
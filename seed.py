@@ -330,27 +330,23 @@ with app.app_context():
             bakery_id=bakery1.id,
             title="Morning Pastry Mix",
             description="A mix of croissants, pain au chocolat, and brioche",
-            category="pastries",
             tags="sweet,pastry,breakfast,french",
             original_value=12.00,
             sale_price=5.00,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery1.id,
             title="French Pastries Surprise",
             description="Assorted French pastries from today's batch",
-            category="pastries",
             tags="sweet,pastry,french,dessert",
             original_value=15.00,
             sale_price=6.50,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         
         # Bakery 2
@@ -358,27 +354,23 @@ with app.app_context():
             bakery_id=bakery2.id,
             title="Cupcake Surprise Box",
             description="Assorted cupcakes from today's batch",
-            category="desserts",
             tags="sweet,dessert,cupcake",
             original_value=15.00,
             sale_price=6.00,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery2.id,
             title="Cookie & Brownie Mix",
             description="Fresh cookies and brownies",
-            category="desserts",
             tags="sweet,dessert,chocolate,cookie",
             original_value=10.00,
             sale_price=4.00,
             quantity_available=4,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=4),
-            status="available"
         ),
         
         # Bakery 3
@@ -386,27 +378,23 @@ with app.app_context():
             bakery_id=bakery3.id,
             title="Artisan Bread Bundle",
             description="Mix of sourdough, whole wheat, and rye bread",
-            category="bread",
             tags="bread,artisan,healthy,savory",
             original_value=18.00,
             sale_price=7.00,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=5),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery3.id,
             title="Bread & Rolls Mix",
             description="Fresh bread loaves and multigrain rolls",
-            category="bread",
             tags="bread,healthy,savory",
             original_value=12.00,
             sale_price=5.00,
             quantity_available=5,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=6),
-            status="available"
         ),
         
         # Bakery 4
@@ -414,27 +402,23 @@ with app.app_context():
             bakery_id=bakery4.id,
             title="Premium Pastries Box",
             description="Gourmet French pastries including mille-feuille and opera cake",
-            category="pastries",
             tags="sweet,pastry,french,premium,dessert",
             original_value=25.00,
             sale_price=10.00,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery4.id,
             title="Dessert Selection",
             description="Assorted elegant desserts",
-            category="desserts",
             tags="sweet,dessert,french,premium",
             original_value=20.00,
             sale_price=8.00,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         
         # Bakery 5
@@ -442,14 +426,12 @@ with app.app_context():
             bakery_id=bakery5.id,
             title="Breakfast Treats",
             description="Almond croissants, pain aux raisins, and brioches",
-            category="pastries",
             tags="sweet,pastry,breakfast,french",
             original_value=14.00,
             sale_price=5.50,
             quantity_available=4,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         
         # Bakery 6
@@ -457,25 +439,21 @@ with app.app_context():
             bakery_id=bakery6.id,
             title="Traditional Bread Mix",
             description="Baguettes, ciabatta, and focaccia",
-            category="bread",
             original_value=11.00,
             sale_price=4.50,
             quantity_available=6,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=4),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery6.id,
             title="Mediterranean Bread Bag",
             description="Olive bread and focaccia selection",
-            category="bread",
             original_value=13.00,
             sale_price=5.50,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=5),
-            status="available"
         ),
         
         # Bakery 7
@@ -483,25 +461,21 @@ with app.app_context():
             bakery_id=bakery7.id,
             title="Tunisian Sweets Box",
             description="Traditional baklava, makroud, and zlabia",
-            category="desserts",
             original_value=22.00,
             sale_price=9.00,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery7.id,
             title="Mediterranean Desserts",
             description="Assorted traditional sweets",
-            category="desserts",
             original_value=18.00,
             sale_price=7.00,
             quantity_available=4,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=4),
-            status="available"
         ),
         
         # Bakery 8
@@ -509,13 +483,11 @@ with app.app_context():
             bakery_id=bakery8.id,
             title="Brioche Lovers Box",
             description="Chocolate brioche, sugar brioche, and cinnamon rolls",
-            category="pastries",
             original_value=16.00,
             sale_price=6.50,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         
         # Bakery 9
@@ -523,25 +495,21 @@ with app.app_context():
             bakery_id=bakery9.id,
             title="Organic Bread Collection",
             description="Organic sourdough and specialty grain breads",
-            category="bread",
             original_value=24.00,
             sale_price=10.00,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=6),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery9.id,
             title="Healthy Grains Mix",
             description="Spelt, seeded, and kamut breads",
-            category="bread",
             original_value=20.00,
             sale_price=8.50,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=5),
-            status="available"
         ),
         
         # Bakery 10
@@ -549,13 +517,11 @@ with app.app_context():
             bakery_id=bakery10.id,
             title="Savory & Sweet Mix",
             description="Quiches, tarts, and sweet pies",
-            category="mixed",
             original_value=19.00,
             sale_price=7.50,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         
         # Bakery 11
@@ -563,13 +529,11 @@ with app.app_context():
             bakery_id=bakery11.id,
             title="Country Bread Selection",
             description="Country bread, walnut bread, and fougasse",
-            category="bread",
             original_value=17.00,
             sale_price=7.00,
             quantity_available=4,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=4),
-            status="available"
         ),
         
         # Bakery 12
@@ -577,13 +541,11 @@ with app.app_context():
             bakery_id=bakery12.id,
             title="Chocolate Lovers Paradise",
             description="All things chocolate - tarts, mousse, and croissants",
-            category="desserts",
             original_value=21.00,
             sale_price=8.50,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         
         # Bakery 13
@@ -591,13 +553,11 @@ with app.app_context():
             bakery_id=bakery13.id,
             title="Daily Bread Bundle",
             description="Fresh baguettes, rolls, and flatbreads",
-            category="bread",
             original_value=10.00,
             sale_price=4.00,
             quantity_available=5,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=5),
-            status="available"
         ),
         
         # Bakery 14
@@ -605,25 +565,21 @@ with app.app_context():
             bakery_id=bakery14.id,
             title="Gourmet Pastries Box",
             description="Fruit tarts, éclairs, and cream puffs",
-            category="pastries",
             original_value=23.00,
             sale_price=9.50,
             quantity_available=2,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=2),
-            status="available"
         ),
         SurplusBagModel(
             bakery_id=bakery14.id,
             title="Macaron & Treats",
             description="Assorted macarons and petit fours",
-            category="desserts",
             original_value=18.00,
             sale_price=7.50,
             quantity_available=3,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=3),
-            status="available"
         ),
         
         # Bakery 15
@@ -631,13 +587,11 @@ with app.app_context():
             bakery_id=bakery15.id,
             title="Baguette Bundle",
             description="Fresh traditional baguettes",
-            category="bread",
             original_value=8.00,
             sale_price=3.50,
             quantity_available=7,
             pickup_start=datetime.utcnow(),
             pickup_end=datetime.utcnow() + timedelta(hours=6),
-            status="available"
         ),
     ]
 
@@ -1015,4 +969,8 @@ with app.app_context():
     db.session.add_all(reviews)
     db.session.commit()
 
+    # Reviews were inserted directly: fill the bakery rating aggregates
+    from utils import ratings
+    ratings.rebuild()
+
     print("Database seeded successfully!")
@@ -1,5 +1,19 @@
 """Utility modules for Forni API"""
-from .geocoding import GeocodingService
-from .image_upload import save_image, delete_image, allowed_file
 
 __all__ = ['GeocodingService', 'save_image', 'delete_image', 'allowed_file']
+
+# Re-exports resolve on first access: importing any utils submodule should
+# not pull in `requests` (geocoding) for every worker
+_EXPORTS = {
+    'GeocodingService': '.geocoding',
+    'save_image': '.image_upload',
+    'delete_image': '.image_upload',
+    'allowed_file': '.image_upload',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
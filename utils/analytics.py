@@ -0,0 +1,353 @@
+"""
+Daily per-bakery rollups of completed orders.
+
+bakery_daily_stats holds one row per (bakery, order day) with the number of
+completed orders, revenue, surplus bags sold and value saved (original bag
+value minus the price paid, times quantity). Analytics queries read these
+rows, so their cost grows with the number of days asked for, not orders.
+
+Rows are maintained incrementally by a before_flush listener: an order that
+becomes "completed" adds its contribution, one that leaves "completed" (or
+is deleted) subtracts it. The upsert runs on the flush's own connection, so
+it commits or rolls back together with the status change.
+
+`rebuild()` (flask analytics rebuild) recomputes every row from the orders.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from db import db
+from models.bakery_daily_stats import BakeryDailyStatsModel
+from models.order import OrderModel
+from models.order_item import OrderItemModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+
+COMPLETED = "completed"
+ZERO = Decimal("0")
+
+
+def _bag_contributions(conn, order_ids):
+    """{order_id: (bags, value_saved)} from the stored order items"""
+    if not order_ids:
+        return {}
+    rows = conn.execute(
+        select(
+            OrderItemModel.order_id,
+            func.sum(OrderItemModel.quantity),
+            func.sum(OrderItemModel.quantity * (SurplusBagModel.original_value - OrderItemModel.unit_price)),
+        )
+        .join(SurplusBagModel, SurplusBagModel.id == OrderItemModel.surplus_bag_id)
+        .where(OrderItemModel.order_id.in_(order_ids))
+        .group_by(OrderItemModel.order_id)
+    )
+    return {order_id: (int(bags or 0), Decimal(str(value or 0))) for order_id, bags, value in rows}
+
+
+def _legacy_contribution(session, order):
+    # Orders from before order_items: one bag at its listed sale price
+    if not order.surplus_bag_id:
+        return 0, ZERO
+    bag = session.get(SurplusBagModel, order.surplus_bag_id)
+    if bag is None:
+        return 0, ZERO
+    return 1, Decimal(str(bag.original_value)) - Decimal(str(bag.sale_price))
+
+
+def _order_day(order):
+    return (order.created_at or datetime.utcnow()).date()
+
+
+def _changed_orders(session):
+    """[(order, +1/-1)] for orders entering or leaving the completed state"""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, OrderModel) and obj.status == COMPLETED:
+            changes.append((obj, 1))
+    for obj in session.dirty:
+        if not isinstance(obj, OrderModel):
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.has_changes():
+            continue
+        was_completed = COMPLETED in (history.deleted or ())
+        is_completed = obj.status == COMPLETED
+        if was_completed != is_completed:
+            changes.append((obj, 1 if is_completed else -1))
+    for obj in session.deleted:
+        if isinstance(obj, OrderModel) and obj.status == COMPLETED:
+            changes.append((obj, -1))
+    return changes
+
+
+def _add(totals, key, orders, revenue, bags, value):
+    row = totals[key]
+    row["orders"] += orders
+    row["revenue"] += revenue
+    row["bags_saved"] += bags
+    row["value_saved"] += value
+
+
+def _new_totals():
+    return defaultdict(lambda: {"orders": 0, "revenue": ZERO, "bags_saved": 0, "value_saved": ZERO})
+
+
+def upsert(conn, deltas):
+    """Add {(bakery_id, day): {column: delta}} to the rollup table"""
+    if not deltas:
+        return
+    table = BakeryDailyStatsModel.__table__
+    rows = [{"bakery_id": b, "day": d, **values} for (b, d), values in deltas.items()]
+    columns = ("orders", "revenue", "bags_saved", "value_saved")
+
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        for row in rows:
+            stmt = insert(table).values(**row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.bakery_id, table.c.day],
+                set_={c: table.c[c] + stmt.excluded[c] for c in columns},
+            )
+            conn.execute(stmt)
+        return
+
+    # Portable fallback: UPDATE, INSERT when no row matched
+    for row in rows:
+        key = (table.c.bakery_id == row["bakery_id"]) & (table.c.day == row["day"])
+        updated = conn.execute(
+            table.update().where(key).values({c: table.c[c] + row[c] for c in columns})
+        ).rowcount
+        if not updated:
+            conn.execute(table.insert().values(**row))
+
+
+@event.listens_for(Session, "before_flush")
+def _track_completed_orders(session, flush_context, instances):
+    changes = _changed_orders(session)
+    if not changes:
+        return
+
+    with session.no_autoflush:
+        conn = session.connection()
+        stored = _bag_contributions(conn, [o.id for o, _ in changes if o.id is not None])
+        deltas = _new_totals()
+        for order, sign in changes:
+            if order.id in stored:
+                bags, value = stored[order.id]
+            elif order.order_items:
+                # New order: items are still in memory only
+                bags, value = 0, ZERO
+                for item in order.order_items:
+                    if item.surplus_bag_id:
+                        bag = session.get(SurplusBagModel, item.surplus_bag_id)
+                        bags += item.quantity
+                        value += item.quantity * (Decimal(str(bag.original_value)) - Decimal(str(item.unit_price)))
+            else:
+                bags, value = _legacy_contribution(session, order)
+            revenue = Decimal(str(order.total_price or 0))
+            _add(deltas, (order.bakery_id, _order_day(order)), sign, sign * revenue, sign * bags, sign * value)
+        upsert(conn, deltas)
+
+
+def rebuild(session=None):
+    """Recompute every rollup row from the completed orders; returns the number of rows"""
+    session = session or db.session
+    completed = session.query(OrderModel).filter(OrderModel.status == COMPLETED)
+    order_ids = [order_id for (order_id,) in completed.with_entities(OrderModel.id)]
+    stored = {}
+    for start in range(0, len(order_ids), 500):
+        stored.update(_bag_contributions(session.connection(), order_ids[start:start + 500]))
+
+    totals = _new_totals()
+    for order in completed.yield_per(500):
+        bags, value = stored.get(order.id) or _legacy_contribution(session, order)
+        revenue = Decimal(str(order.total_price or 0))
+        _add(totals, (order.bakery_id, _order_day(order)), 1, revenue, bags, value)
+
+    session.query(BakeryDailyStatsModel).delete()
+    if totals:
+        session.execute(
+            BakeryDailyStatsModel.__table__.insert(),
+            [{"bakery_id": b, "day": d, **values} for (b, d), values in totals.items()],
+        )
+    session.commit()
+    return len(totals)
+
+
+def summarize(bakery_ids=None, start=None, end=None):
+    """
+    Daily series and totals from the rollups.
+
+    `bakery_ids` None means every bakery; `start`/`end` are inclusive dates.
+    """
+    stats = BakeryDailyStatsModel
+    query = db.session.query(
+        stats.day,
+        func.sum(stats.orders),
+        func.sum(stats.revenue),
+        func.sum(stats.bags_saved),
+        func.sum(stats.value_saved),
+    )
+    if bakery_ids is not None:
+        query = query.filter(stats.bakery_id.in_(bakery_ids))
+    if start:
+        query = query.filter(stats.day >= start)
+    if end:
+        query = query.filter(stats.day <= end)
+
+    daily = []
+    totals = {"orders": 0, "revenue": 0.0, "bags_saved": 0, "value_saved": 0.0}
+    for day, orders, revenue, bags, value in query.group_by(stats.day).order_by(stats.day):
+        row = {
+            "day": day.isoformat(),
+            "orders": int(orders or 0),
+            "revenue": round(float(revenue or 0), 2),
+            "bags_saved": int(bags or 0),
+            "value_saved": round(float(value or 0), 2),
+        }
+        daily.append(row)
+        for key in totals:
+            totals[key] += row[key]
+    totals["revenue"] = round(totals["revenue"], 2)
+    totals["value_saved"] = round(totals["value_saved"], 2)
+    return totals, daily
+
+
+# ---- time-series queries ----------------------------------------------
+
+BUCKETS = ("hour", "day", "week")
+
+
+def time_bucket(column, bucket):
+    """SQL expression labelling `column` with its bucket start ('YYYY-MM-DD[ HH:00]')"""
+    if db.session.get_bind().dialect.name == "postgresql":
+        fmt = "YYYY-MM-DD HH24:00" if bucket == "hour" else "YYYY-MM-DD"
+        return func.to_char(func.date_trunc(bucket, column), fmt)
+    if bucket == "hour":
+        return func.strftime("%Y-%m-%d %H:00", column)
+    if bucket == "week":
+        # Monday of the (Monday-Sunday) week
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(column)
+
+
+def _window(column, start, end):
+    """Criteria for start <= column < end (datetimes)"""
+    return [column >= start, column < end]
+
+
+def _scope(column, bakery_ids):
+    return [] if bakery_ids is None else [column.in_(bakery_ids)]
+
+
+def revenue_series(bakery_ids, start, end, bucket):
+    label = time_bucket(OrderModel.created_at, bucket).label("bucket")
+    rows = (
+        db.session.query(label, func.count(OrderModel.id), func.sum(OrderModel.total_price))
+        .filter(OrderModel.status == COMPLETED,
+                *_scope(OrderModel.bakery_id, bakery_ids),
+                *_window(OrderModel.created_at, start, end))
+        .group_by(label)
+        .order_by(label)
+    )
+    return [
+        {"bucket": b, "orders": n, "revenue": round(float(revenue or 0), 2)}
+        for b, n, revenue in rows
+    ]
+
+
+def top_products(bakery_ids, start, end, limit):
+    quantity = func.sum(OrderItemModel.quantity).label("quantity")
+    rows = (
+        db.session.query(ProductModel.id, ProductModel.name, quantity, func.sum(OrderItemModel.subtotal))
+        .join(OrderItemModel, OrderItemModel.product_id == ProductModel.id)
+        .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+        .filter(OrderModel.status == COMPLETED,
+                *_scope(OrderModel.bakery_id, bakery_ids),
+                *_window(OrderModel.created_at, start, end))
+        .group_by(ProductModel.id, ProductModel.name)
+        .order_by(quantity.desc(), ProductModel.id)
+        .limit(limit)
+    )
+    return [
+        {"product_id": pid, "name": name, "quantity": int(qty or 0), "revenue": round(float(revenue or 0), 2)}
+        for pid, name, qty, revenue in rows
+    ]
+
+
+def no_show_series(bakery_ids, start, end, bucket):
+    """
+    Orders whose pickup time (the order's, else the latest window end of its
+    bags) has passed, and how many of them were never picked up (not
+    completed). Cancelled orders are left out.
+    """
+    item_due = (
+        db.session.query(OrderItemModel.order_id.label("order_id"),
+                         func.max(SurplusBagModel.pickup_end).label("due"))
+        .join(SurplusBagModel, SurplusBagModel.id == OrderItemModel.surplus_bag_id)
+        .group_by(OrderItemModel.order_id)
+        .subquery()
+    )
+    # Legacy single-bag orders have no items, only orders.surplus_bag_id
+    legacy_bag = SurplusBagModel.__table__.alias("legacy_bag")
+    due = func.coalesce(OrderModel.pickup_time, item_due.c.due, legacy_bag.c.pickup_end)
+    label = time_bucket(due, bucket).label("bucket")
+    missed = func.sum(case((OrderModel.status != COMPLETED, 1), else_=0))
+    rows = (
+        db.session.query(label, func.count(OrderModel.id), missed)
+        .outerjoin(item_due, item_due.c.order_id == OrderModel.id)
+        .outerjoin(legacy_bag, legacy_bag.c.id == OrderModel.surplus_bag_id)
+        .filter(OrderModel.status != "cancelled",
+                due < datetime.utcnow(),
+                *_scope(OrderModel.bakery_id, bakery_ids),
+                *_window(due, start, end))
+        .group_by(label)
+        .order_by(label)
+    )
+    return [
+        {"bucket": b, "due": n, "no_shows": int(m or 0), "no_show_rate": round((m or 0) / n, 4) if n else 0.0}
+        for b, n, m in rows
+    ]
+
+
+def sell_through_series(bakery_ids, start, end, bucket):
+    """Share of listed surplus bags sold, by pickup window start"""
+    sold = (
+        db.session.query(OrderItemModel.surplus_bag_id.label("bag_id"),
+                         func.sum(OrderItemModel.quantity).label("sold"))
+        .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+        .filter(OrderItemModel.surplus_bag_id.isnot(None), OrderModel.status != "cancelled")
+        .group_by(OrderItemModel.surplus_bag_id)
+        .subquery()
+    )
+    label = time_bucket(SurplusBagModel.pickup_start, bucket).label("bucket")
+    sold_total = func.sum(func.coalesce(sold.c.sold, 0))
+    rows = (
+        db.session.query(label, func.count(SurplusBagModel.id), sold_total,
+                         func.sum(SurplusBagModel.quantity_available))
+        .outerjoin(sold, sold.c.bag_id == SurplusBagModel.id)
+        .filter(*_scope(SurplusBagModel.bakery_id, bakery_ids),
+                *_window(SurplusBagModel.pickup_start, start, end))
+        .group_by(label)
+        .order_by(label)
+    )
+    series = []
+    for b, listings, sold_qty, remaining in rows:
+        sold_qty, remaining = int(sold_qty or 0), int(remaining or 0)
+        listed = sold_qty + remaining
+        series.append({
+            "bucket": b,
+            "listings": listings,
+            "sold": sold_qty,
+            "unsold": remaining,
+            "sell_through": round(sold_qty / listed, 4) if listed else 0.0,
+        })
+    return series
@@ -0,0 +1,144 @@
+"""
+Small caches for expensive read endpoints.
+
+TTLCache is a thread-safe dict with per-entry expiry and a size bound
+(least recently used entries evicted first). It is per worker: entries are
+not shared or invalidated across processes, so only cache data that may be
+a few seconds stale, with a short TTL.
+
+RedisCache has the same interface over a Redis-protocol server (Redis,
+Valkey, KeyDB, or a local stand-in such as fakeredis' TCP server), so every
+worker shares entries and invalidations. Values must be JSON-serializable.
+The `redis` package is only needed when it is used.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl=60, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        """Store `value` unless `key` holds a live entry; returns the value kept"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                return entry[1]
+        # Lost races between the check and set() are harmless for our callers
+        self.set(key, value, ttl)
+        return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Cached value for `key`, computing and storing factory() on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    def __init__(self, url, ttl=60, prefix="forni:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, ttl):
+        return max(1, int(round(self.ttl if ttl is None else ttl)))
+
+    def get(self, key, default=None):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json.dumps(value), ex=self._ttl(ttl))
+
+    def add(self, key, value, ttl=None):
+        """SET NX: store `value` unless `key` exists; returns the value kept"""
+        if self._client.set(self.prefix + key, json.dumps(value), ex=self._ttl(ttl), nx=True):
+            return value
+        raw = self._client.get(self.prefix + key)
+        return value if raw is None else json.loads(raw)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return [None if raw is None else json.loads(raw)
+                for raw in self._client.mget([self.prefix + key for key in keys])]
+
+    def get_or_set(self, key, factory, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def pop(self, key):
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        """Delete this cache's keys (only those under its prefix)"""
+        batch = []
+        for key in self._client.scan_iter(match=self.prefix + "*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self._client.delete(*batch)
+                batch = []
+        if batch:
+            self._client.delete(*batch)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(match=self.prefix + "*", count=500))
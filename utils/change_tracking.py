@@ -0,0 +1,74 @@
+"""
+Commit-time change notifications for SQLAlchemy models.
+
+In-process structures (geo index, search index, caches...) subscribe to a
+model and get called once the transaction that touched it has committed.
+Rolled back changes are dropped, so subscribers never see phantom writes.
+
+Bulk statements (UPDATE ... WHERE, executed outside the unit of work) are
+invisible to the ORM; code issuing them registers its own commit-time
+callback with on_commit().
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "change_tracking_pending"
+_subscribers = []
+
+
+def subscribe(model, callback):
+    """
+    Call `callback(action, snapshot)` after every commit touching `model`.
+
+    action is "insert", "update" or "delete"; snapshot is a plain dict of the
+    row's column values taken at flush time (safe to use after commit).
+    """
+    _subscribers.append((model, callback))
+
+
+def on_commit(session, callback, *args):
+    """Call `callback(*args)` once the session's current transaction commits"""
+    session.info.setdefault(_PENDING_KEY, []).append((callback, args))
+
+
+def _snapshot(obj):
+    state = inspect(obj)
+    # Only read what's already loaded: deleted rows can't be refreshed
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _record(session, action, objects):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in objects:
+        for model, callback in _subscribers:
+            if isinstance(obj, model):
+                pending.append((callback, (action, _snapshot(obj))))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    if not _subscribers:
+        return
+    _record(session, "insert", session.new)
+    _record(session, "update", [o for o in session.dirty if session.is_modified(o)])
+    _record(session, "delete", session.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    for callback, args in pending or ():
+        try:
+            callback(*args)
+        except Exception as e:
+            # A broken subscriber must never fail a request that already committed
+            print(f"Change subscriber {callback.__name__} failed: {e}", flush=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,89 @@
+"""
+Conditional GETs (ETag / Last-Modified) from row versions.
+
+Versioned models (models/versioned.py) carry `version` and `updated_at`. A
+view's validators come from one aggregate over those columns for the rows
+it would return - count, sum of ids, sum of versions, max(updated_at) -
+without loading or serializing a single row. Any insert, update or delete
+among those rows changes the ETag.
+
+@conditional(fingerprint) runs before the view (and before the response
+cache): when the client's If-None-Match still matches, or If-Modified-Since
+is not older than the rows when no ETag was sent, the answer is an empty
+304 and the view never runs. Otherwise the view's 200 response gets the ETag
+and Last-Modified headers.
+
+ETags are weak: they identify the data, not the exact bytes. Last-Modified
+cannot see a row that was deleted from a list page (only its bakery's
+bump, when that bakery is still on the page); clients should prefer ETags.
+Pages filtered on the clock (a bakery's available bags) must also summarize
+the rows that aged out, see resources/bakeries.bakery_validators.
+"""
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, request
+from sqlalchemy import func
+
+
+def version_columns(id_col, version_col, updated_at_col):
+    """Aggregate validator columns over a set of versioned rows"""
+    return [func.count(id_col), func.sum(id_col), func.sum(version_col), func.max(updated_at_col)]
+
+
+def model_versions(model):
+    return version_columns(model.id, model.version, model.updated_at)
+
+
+def last_modified_of(*values):
+    """Latest of the given datetimes (naive UTC from the DB), as aware UTC"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return max(values).replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def make_etag(parts):
+    return hashlib.blake2b(repr(tuple(parts)).encode(), digest_size=12).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return last_modified is not None and since is not None and last_modified <= since
+
+
+def conditional(fingerprint):
+    """
+    Answer conditional GETs from `fingerprint(**view_kwargs)` before the view runs.
+
+    The fingerprint returns (parts, last_modified): any hashable summary of
+    the rows the view serves, and their latest modification time (or None).
+    It may return None to skip validation (e.g. the resource does not
+    exist; the view then answers 404 as usual).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            validators = fingerprint(**kwargs)
+            if validators is None:
+                return fn(*args, **kwargs)
+            parts, last_modified = validators
+            etag = make_etag(parts)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                # The response cache keys entries on it: a cached body always
+                # matches the validators sent with it
+                g.etag = etag
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,101 @@
+"""
+Sparse fieldsets for list endpoints: ?fields= and ?exclude=.
+
+    GET /product?fields=id,name,price,image_url
+    GET /product?exclude=description,bakery.description
+    GET /product?fields=id,name,bakery.name
+
+Names are the response's field names, comma-separated; a dotted name
+reaches one level into nested objects. The list is dumped with the response
+schema pruned to those fields, and the same pruning narrows the SQL: the
+page query loads only the columns the pruned schema dumps and eager loads
+only the relationships it still nests (utils/loading.py), so a screen
+showing names and prices never fetches description Text columns or joins
+bakeries.
+
+Unknown or deeper names answer 422, in the shape of any query validation
+error. Blank values are ignored, like any blank query arg (see
+utils/response_cache.py). Pruned schemas are built once per distinct
+fieldset and reused, along with their compiled dump functions.
+"""
+from functools import lru_cache, wraps
+
+from flask import g, jsonify, request
+from flask_smorest import abort
+from marshmallow import fields
+
+from utils.loading import with_eager_loading
+
+
+def parse_fieldset(value):
+    """Comma-separated field names -> sorted tuple (empty when blank)"""
+    return tuple(sorted({name.strip() for name in (value or "").split(",") if name.strip()}))
+
+
+def fieldset_errors(schema, names):
+    """Validation messages for the names `schema` can't prune to, by name"""
+    errors = {}
+    for name in names:
+        current = schema
+        parts = name.split(".")
+        if len(parts) > 2:
+            # marshmallow only passes one level on to nested schema instances
+            errors[name] = ["Only one level of nesting is supported."]
+            continue
+        for part in parts:
+            field = current.dump_fields.get(part) if current is not None else None
+            if field is None:
+                errors[name] = ["Unknown field."]
+                break
+            if isinstance(field, fields.List):
+                field = field.inner
+            current = field.schema if isinstance(field, fields.Nested) else None
+    return errors
+
+
+@lru_cache(maxsize=256)
+def pruned_schema(schema_class, many, only, exclude):
+    """A `schema_class` instance dumping `only` (all if None) minus `exclude`"""
+    return schema_class(many=many, only=only, exclude=exclude)
+
+
+def sparse_fieldsets(schema):
+    """
+    Honor ?fields= / ?exclude= on a list view dumped with `schema`.
+
+    Put it right below @blp.response. The view builds its query with
+    fieldset_query() and returns what it returned before; when a fieldset
+    was requested, the result is dumped here with the pruned schema
+    (flask-smorest passes the finished response through).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            only = parse_fieldset(request.args.get("fields")) or None
+            exclude = parse_fieldset(request.args.get("exclude"))
+            if only is None and not exclude:
+                g.fieldset = schema
+                return fn(*args, **kwargs)
+            errors = {}
+            for param, names in (("fields", only or ()), ("exclude", exclude)):
+                messages = fieldset_errors(schema, names)
+                if messages:
+                    errors[param] = messages
+            if errors:
+                abort(422, errors={"query": errors})
+            g.fieldset = pruned_schema(type(schema), schema.many, only, exclude)
+
+            result = fn(*args, **kwargs)
+            items, *rest = result if isinstance(result, tuple) else (result,)
+            return (jsonify(g.fieldset.dump(items)), *rest)
+        return wrapper
+    return decorator
+
+
+def fieldset_query(query, model):
+    """
+    `query` with loader options for the requested fieldset: eager loads of
+    the nested relationships and load_only of the dumped columns. Lists are
+    keyset paginated, so created_at (and the primary key) always load.
+    """
+    return with_eager_loading(query, g.fieldset, model, load_only=True, required=("created_at",))
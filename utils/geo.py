@@ -0,0 +1,256 @@
+"""
+Geospatial helpers for bakery lookups.
+
+Nearby queries first narrow the search to a lat/lng bounding box (pushed
+into SQL on the indexed coordinate columns, or answered from an in-process
+grid index), then compute exact Haversine distances on the few survivors.
+Bulk work (many points, many origins) goes through the numpy GeoPointSet.
+numpy is imported on first use, so web workers that only answer nearby
+queries never load it.
+"""
+import math
+import threading
+import time
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometers"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = math.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle.
+
+    The box is a superset of the circle; callers still check exact distances.
+    Longitude wrap-around at the antimeridian is not handled (not needed for
+    the regions we serve), the box is just clamped to [-180, 180].
+    """
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        delta_lng = 180.0
+    else:
+        delta_lng = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+    return (
+        max(-90.0, lat - delta_lat),
+        min(90.0, lat + delta_lat),
+        max(-180.0, lng - delta_lng),
+        min(180.0, lng + delta_lng),
+    )
+
+
+class GeoGridIndex:
+    """
+    Fixed-size lat/lng grid of points (id -> (lat, lng)).
+
+    Each cell is `cell_size` degrees wide; a bounding-box query only visits
+    the cells overlapping the box, so lookups cost O(points nearby) instead
+    of O(all points). Thread-safe for concurrent readers and writers.
+    """
+
+    def __init__(self, cell_size=0.1):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lng / self.cell_size)))
+
+    def rebuild(self, points):
+        """Replace the whole index with an iterable of (id, lat, lng)"""
+        cells = {}
+        all_points = {}
+        for point_id, lat, lng in points:
+            all_points[point_id] = (lat, lng)
+            cells.setdefault(self._cell(lat, lng), {})[point_id] = (lat, lng)
+        with self._lock:
+            self._cells = cells
+            self._points = all_points
+            self.built_at = time.monotonic()
+
+    def upsert(self, point_id, lat, lng):
+        with self._lock:
+            self.remove(point_id)
+            if lat is None or lng is None:
+                return
+            self._points[point_id] = (lat, lng)
+            self._cells.setdefault(self._cell(lat, lng), {})[point_id] = (lat, lng)
+
+    def remove(self, point_id):
+        with self._lock:
+            old = self._points.pop(point_id, None)
+            if old is None:
+                return
+            cell = self._cells.get(self._cell(*old))
+            if cell is not None:
+                cell.pop(point_id, None)
+                if not cell:
+                    del self._cells[self._cell(*old)]
+
+    def query_bbox(self, min_lat, max_lat, min_lng, max_lng):
+        """Yield (id, lat, lng) for every point inside the box"""
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, max_col = self._cell(max_lat, max_lng)
+        with self._lock:
+            # Small boxes: walk the covered cells. Huge boxes: cheaper to scan.
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+                candidates = [
+                    item for cell in self._cells.values() for item in cell.items()
+                ]
+            else:
+                candidates = []
+                for row in range(min_row, max_row + 1):
+                    for col in range(min_col, max_col + 1):
+                        cell = self._cells.get((row, col))
+                        if cell:
+                            candidates.extend(cell.items())
+
+        for point_id, (lat, lng) in candidates:
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                yield point_id, lat, lng
+
+    def points(self):
+        """Snapshot of every indexed point as a list of (id, lat, lng)"""
+        with self._lock:
+            return [(point_id, lat, lng) for point_id, (lat, lng) in self._points.items()]
+
+    def nearby(self, lat, lng, radius_km, limit=None):
+        """Return [(id, distance_km)] within radius, closest first"""
+        hits = []
+        for point_id, p_lat, p_lng in self.query_bbox(*bounding_box(lat, lng, radius_km)):
+            distance = haversine_km(lat, lng, p_lat, p_lng)
+            if distance <= radius_km:
+                hits.append((point_id, distance))
+        hits.sort(key=lambda hit: hit[1])
+        return hits[:limit] if limit else hits
+
+
+def haversine_km_many(lat, lng, lats, lngs):
+    """
+    Vectorized Haversine: distances (km) from one point to arrays of points.
+
+    `lats`/`lngs` can be anything numpy accepts; the result is a float64
+    array of the same shape.
+    """
+    import numpy as np
+
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(np.asarray(lngs, dtype=np.float64)) - np.radians(lng)
+
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoPointSet:
+    """
+    Immutable batch of points held in contiguous float64 arrays.
+
+    Built once (e.g. from every bakery) and then queried many times:
+    distances for thousands of points are computed in one numpy call, and
+    `nearest_many` answers "N closest for each origin" for whole batches of
+    origins at a time, for dispatch and marketing jobs.
+    """
+
+    def __init__(self, ids, lats, lngs):
+        import numpy as np
+
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lngs = np.ascontiguousarray(lngs, dtype=np.float64)
+        if not (self.ids.shape == self.lats.shape == self.lngs.shape):
+            raise ValueError("ids, lats and lngs must have the same length")
+
+        # Precomputed terms reused by every query
+        self._lat_rad = np.radians(self.lats)
+        self._lng_rad = np.radians(self.lngs)
+        self._cos_lat = np.cos(self._lat_rad)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from an iterable of (id, lat, lng), skipping missing coordinates"""
+        rows = [row for row in rows if row[1] is not None and row[2] is not None]
+        if not rows:
+            return cls([], [], [])
+        ids, lats, lngs = zip(*rows)
+        return cls(ids, lats, lngs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, lat, lng):
+        """Distances (km) from one origin to every point, in point order"""
+        import numpy as np
+
+        lat_rad = math.radians(lat)
+        a = (
+            np.sin((self._lat_rad - lat_rad) / 2) ** 2
+            + math.cos(lat_rad) * self._cos_lat * np.sin((self._lng_rad - math.radians(lng)) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(self, lat, lng, n=10, radius_km=None):
+        """Return [(id, distance_km)] of the n closest points, closest first"""
+        return self.nearest_many([(lat, lng)], n=n, radius_km=radius_km)[0]
+
+    def nearest_many(self, origins, n=10, radius_km=None, chunk_size=256):
+        """
+        N closest points for each origin.
+
+        origins: sequence of (lat, lng). Returns one [(id, distance_km)] list
+        per origin, in the same order. Origins are processed in chunks so the
+        distance matrix stays around chunk_size * len(self) floats.
+        """
+        import numpy as np
+
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        if len(self) == 0 or n <= 0:
+            return [[] for _ in range(len(origins))]
+        n = min(n, len(self))
+
+        results = []
+        for start in range(0, len(origins), chunk_size):
+            chunk = np.radians(origins[start:start + chunk_size])
+            o_lat = chunk[:, 0:1]
+            o_lng = chunk[:, 1:2]
+
+            a = (
+                np.sin((self._lat_rad - o_lat) / 2) ** 2
+                + np.cos(o_lat) * self._cos_lat * np.sin((self._lng_rad - o_lng) / 2) ** 2
+            )
+            dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+            # Top-n per row without a full sort, then order just those n
+            if n < len(self):
+                top = np.argpartition(dist, n - 1, axis=1)[:, :n]
+            else:
+                top = np.broadcast_to(np.arange(len(self)), dist.shape)
+            top_dist = np.take_along_axis(dist, top, axis=1)
+            order = np.argsort(top_dist, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_dist = np.take_along_axis(top_dist, order, axis=1)
+
+            for row_ids, row_dist in zip(self.ids[top], top_dist):
+                if radius_km is not None:
+                    keep = row_dist <= radius_km
+                    row_ids, row_dist = row_ids[keep], row_dist[keep]
+                results.append(list(zip(row_ids.tolist(), row_dist.tolist())))
+
+        return results
@@ -0,0 +1,189 @@
+"""
+Contention-safe surplus bag inventory.
+
+Stock is never read, checked in Python and written back (two concurrent
+orders could both pass the check and oversell). Instead all bags of an order
+are decremented in ONE conditional statement:
+
+    UPDATE surplus_bags
+       SET quantity_available = quantity_available - CASE id WHEN 1 THEN 2 ... END
+     WHERE id IN (1, ...) AND quantity_available >= CASE id WHEN 1 THEN 2 ... END
+
+The database evaluates the condition under the row lock, so a row either
+has enough stock and is decremented, or is left alone. Fewer matched rows
+than bags means the order can't be filled; the transaction is rolled back,
+which also undoes the rows that did match.
+
+Holds reserve stock for a few minutes (checkout, payment) without an order.
+Expired holds are deleted with DELETE ... RETURNING, so each one is restocked
+exactly once even with several workers releasing at the same time.
+
+Config keys (all optional):
+    INVENTORY_HOLD_TTL          seconds a hold lasts (default 600)
+    INVENTORY_RELEASE_INTERVAL  min seconds between lazy expiry sweeps (default 30)
+"""
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, delete, update
+
+from db import db
+from models.inventory_hold import InventoryHoldModel
+from models.surplus_bag import SurplusBagModel
+from utils.change_tracking import on_commit
+from utils.response_cache import response_cache
+
+_released_at = 0.0
+
+
+class InsufficientInventory(Exception):
+    def __init__(self, bag_id, available, requested):
+        self.bag_id = bag_id
+        self.available = available
+        self.requested = requested
+        super().__init__(f"Surplus bag {bag_id}: requested {requested}, {available} available")
+
+
+def merge_quantities(items):
+    """Sum (bag_id, quantity) pairs into {bag_id: quantity}"""
+    totals = defaultdict(int)
+    for bag_id, quantity in items:
+        totals[bag_id] += quantity
+    return dict(totals)
+
+
+def _adjust_stock(session_or_conn, quantities, restock=False):
+    """One UPDATE taking (or giving back) every bag's quantity; returns matched (id, bakery_id) rows"""
+    amount = case(quantities, value=SurplusBagModel.id)
+    stock = SurplusBagModel.quantity_available
+    stmt = update(SurplusBagModel.__table__).where(SurplusBagModel.id.in_(list(quantities)))
+    if restock:
+        stmt = stmt.values(quantity_available=stock + amount, **SurplusBagModel.version_bump())
+    else:
+        stmt = stmt.where(stock >= amount).values(quantity_available=stock - amount, **SurplusBagModel.version_bump())
+    stmt = stmt.returning(SurplusBagModel.id, SurplusBagModel.bakery_id)
+    return session_or_conn.execute(stmt).all()
+
+
+def _stock_changed(rows):
+    # The UPDATE bypasses change tracking: drop cached listings and details
+    response_cache.invalidate("surplus_bags", *{f"bakery:{bakery_id}" for _, bakery_id in rows})
+
+
+def _expire_loaded(session, bag_ids):
+    # The UPDATE bypasses the ORM; reload stock on next access
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, SurplusBagModel) and obj.id in bag_ids:
+            session.expire(obj, ["quantity_available", "version", "updated_at"])
+
+
+def reserve(quantities, session=None):
+    """
+    Atomically take {bag_id: quantity} out of stock, all or nothing.
+
+    Runs inside the caller's transaction (commit to make it stick). On
+    failure the session is rolled back and InsufficientInventory names the
+    first bag that was short.
+    """
+    session = session or db.session
+    if not quantities:
+        return
+    rows = _adjust_stock(session, quantities)
+    if len(rows) == len(quantities):
+        _expire_loaded(session, quantities)
+        on_commit(session, _stock_changed, rows)
+        return
+
+    session.rollback()
+    stock = dict(
+        session.query(SurplusBagModel.id, SurplusBagModel.quantity_available)
+        .filter(SurplusBagModel.id.in_(list(quantities)))
+    )
+    for bag_id in sorted(quantities):
+        available = stock.get(bag_id, 0)
+        if available < quantities[bag_id]:
+            raise InsufficientInventory(bag_id, available, quantities[bag_id])
+    # Stock was freed between the UPDATE and the re-read; report the first bag
+    bag_id = min(quantities)
+    raise InsufficientInventory(bag_id, stock.get(bag_id, 0), quantities[bag_id])
+
+
+def place_hold(user_id, quantities, ttl=None):
+    """Reserve stock for `ttl` seconds; returns (hold_id, expires_at). Commits."""
+    release_expired_if_due()
+    ttl = ttl or current_app.config.get("INVENTORY_HOLD_TTL", 600)
+    reserve(quantities)
+    hold_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+    db.session.add_all(
+        InventoryHoldModel(hold_id=hold_id, user_id=user_id, surplus_bag_id=bag_id,
+                           quantity=quantity, expires_at=expires_at)
+        for bag_id, quantity in quantities.items()
+    )
+    db.session.commit()
+    return hold_id, expires_at
+
+
+def _take_hold_rows(conn, *criteria):
+    stmt = (
+        delete(InventoryHoldModel.__table__)
+        .where(*criteria)
+        .returning(InventoryHoldModel.surplus_bag_id, InventoryHoldModel.quantity)
+    )
+    return merge_quantities(conn.execute(stmt).all())
+
+
+def consume_hold(hold_id, user_id, session=None):
+    """
+    Turn an unexpired hold into a sale: delete it without restocking.
+
+    Returns the held {bag_id: quantity} ({} when missing or expired). Runs in
+    the caller's transaction, so a rolled-back order keeps its hold.
+    """
+    session = session or db.session
+    return _take_hold_rows(
+        session,
+        InventoryHoldModel.hold_id == hold_id,
+        InventoryHoldModel.user_id == user_id,
+        InventoryHoldModel.expires_at >= datetime.utcnow(),
+    )
+
+
+def release_hold(hold_id, user_id):
+    """Cancel a hold and put its stock back; returns the released quantities"""
+    released = _take_hold_rows(
+        db.session,
+        InventoryHoldModel.hold_id == hold_id,
+        InventoryHoldModel.user_id == user_id,
+    )
+    if released:
+        rows = _adjust_stock(db.session, released, restock=True)
+        _expire_loaded(db.session, released)
+        on_commit(db.session, _stock_changed, rows)
+    db.session.commit()
+    return released
+
+
+def release_expired():
+    """Restock every expired hold; returns the number of bags restocked"""
+    global _released_at
+    # Own connection: never commits whatever the request session holds
+    rows = []
+    with db.engine.begin() as conn:
+        released = _take_hold_rows(conn, InventoryHoldModel.expires_at < datetime.utcnow())
+        if released:
+            rows = _adjust_stock(conn, released, restock=True)
+    if rows:
+        _stock_changed(rows)
+    _released_at = time.monotonic()
+    return sum(released.values())
+
+
+def release_expired_if_due():
+    """Lazy expiry sweep, at most once per INVENTORY_RELEASE_INTERVAL per worker"""
+    interval = current_app.config.get("INVENTORY_RELEASE_INTERVAL", 30)
+    if time.monotonic() - _released_at >= interval:
+        release_expired()
@@ -0,0 +1,95 @@
+"""
+Eager-loading options derived from response schemas.
+
+Every Nested field of a marshmallow schema that maps to a relationship gets
+a loader: joinedload for many-to-one (one row each, no duplication),
+selectinload for collections (one extra IN query per relationship). Dumping
+a list then costs a fixed number of queries instead of one lazy load per row
+and relationship (N+1).
+
+With `load_only=True` the options also narrow the SELECT to the columns the
+schema dumps (plus primary and foreign keys the loaders need), at every
+level. A level whose schema dumps a Python property of the model (e.g.
+BakeryModel.rating_stddev) loads all its columns: which ones the property
+reads is unknown.
+"""
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only as load_only_option, selectinload
+
+_cache = {}
+# Sparse fieldsets make keys client-controlled: keep the newest only
+_MAX_CACHED = 1024
+
+
+def _nested(field):
+    if isinstance(field, fields.List):
+        field = field.inner
+    return field if isinstance(field, fields.Nested) else None
+
+
+def eager_options(schema, model, max_depth=3, load_only=False, required=()):
+    """
+    Loader options covering every nested relationship `schema` will dump.
+
+    Dynamic relationships (lazy="dynamic") can't be eager loaded and are
+    skipped; schemas should not dump them in list views anyway. With
+    `load_only`, only dumped columns are fetched; `required` names more
+    columns of `model` the caller reads itself (e.g. a pagination key).
+    """
+    dump_fields, shape = schema.__dict__.get("_eager_shape", (None, None))
+    if dump_fields is not schema.dump_fields:
+        shape = _shape(schema, max_depth)
+        schema._eager_shape = (schema.dump_fields, shape)
+    key = (type(schema), shape, model, max_depth, load_only, tuple(required))
+    if key not in _cache:
+        if len(_cache) >= _MAX_CACHED:
+            del _cache[next(iter(_cache))]
+        _cache[key] = _build(schema, model, max_depth, load_only, required)
+    return _cache[key]
+
+
+def _shape(schema, depth):
+    """The fields `schema` dumps, nested ones included: marshmallow flattens
+    dotted only/exclude into the nested schemas"""
+    if depth <= 0:
+        return None
+    return tuple(
+        (name, _shape(nested.schema, depth - 1) if (nested := _nested(field)) else None)
+        for name, field in schema.dump_fields.items()
+    )
+
+
+def _build(schema, model, depth, load_only, required=()):
+    if depth <= 0:
+        return []
+    mapper = inspect(model)
+    relationships = mapper.relationships
+    options = []
+    columns = set(required)
+    narrow = load_only
+    for name, field in schema.dump_fields.items():
+        attribute = field.attribute or name
+        nested = _nested(field)
+        rel = relationships.get(attribute)
+        if nested is None or rel is None or rel.lazy == "dynamic":
+            if attribute in mapper.column_attrs:
+                columns.add(attribute)
+            elif rel is None and hasattr(model, attribute):
+                narrow = False  # a property: its columns are unknown
+            continue
+
+        attr = getattr(model, rel.key)
+        loader = selectinload(attr) if rel.uselist else joinedload(attr)
+        children = _build(nested.schema, rel.mapper.class_, depth - 1, load_only)
+        options.append(loader.options(*children) if children else loader)
+        # Keys the loader joins on (many-to-one: our foreign key)
+        columns.update(mapper.get_property_by_column(col).key for col in rel.local_columns)
+    if narrow:
+        options.append(load_only_option(*(getattr(model, key) for key in sorted(columns))))
+    return options
+
+
+def with_eager_loading(query, schema, model, load_only=False, required=()):
+    """Apply `eager_options(schema, model, ...)` to a query"""
+    return query.options(*eager_options(schema, model, load_only=load_only, required=required))
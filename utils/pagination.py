@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+Each page is fetched with `WHERE (created_at, id) > (:last_created_at, :last_id)`
+(or `<` for newest-first lists) against a composite index, so page N costs
+the same as page 1 and concurrent inserts never shift rows between pages the
+way OFFSET does. Cursors are opaque to clients: urlsafe base64 of the last
+row's key. The key columns are NOT NULL (migrate_db.py backfills legacy
+rows): the row comparison would never match a NULL created_at.
+
+The next page is advertised in the `Link` (rel="next") and `X-Next-Cursor`
+response headers; both are absent on the last page. Response bodies stay
+plain lists.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from flask import request
+from flask_smorest import abort
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+PAGINATION_HEADERS = {
+    "Link": {
+        "description": 'URL of the next page (rel="next"); absent on the last page',
+        "schema": {"type": "string"},
+    },
+    "X-Next-Cursor": {
+        "description": "Cursor to pass as `cursor` for the next page; absent on the last page",
+        "schema": {"type": "string"},
+    },
+}
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, aborting with 400 when malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        abort(400, message="Invalid cursor")
+
+
+def _next_link(cursor):
+    args = request.args.to_dict(flat=False)
+    args["cursor"] = [cursor]
+    return f'<{request.base_url}?{urlencode(args, doseq=True)}>; rel="next"'
+
+
+def page_query(query, model, page_args, descending=False):
+    """
+    `query` narrowed to one page (plus one lookahead row); returns (query, limit).
+
+    `page_args` is the loaded CursorPageQuerySchema (cursor, limit).
+    """
+    limit = min(page_args.get("limit") or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    key = tuple_(model.created_at, model.id)
+
+    cursor = page_args.get("cursor")
+    if cursor:
+        last = decode_cursor(cursor)
+        query = query.filter(key < last if descending else key > last)
+
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    # One extra row tells us whether there is a next page
+    return query.limit(limit + 1), limit
+
+
+def keyset_paginate(query, model, page_args, descending=False):
+    """
+    Fetch one page of `query` ordered by (created_at, id).
+
+    Returns (items, headers) - ready to be returned from a blp.response view.
+    """
+    query, limit = page_query(query, model, page_args, descending)
+    items = query.all()
+    headers = {}
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = _next_link(next_cursor)
+    return items, headers
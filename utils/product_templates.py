@@ -0,0 +1,201 @@
+"""
+Catalog of product templates: every product grouped by normalized name
+(lower(trim(name))) and category, with the product count, price total and
+a representative (lowest id) product.
+
+The grouping is done in SQL. An after_flush listener regroups just the
+names touched by a product insert, update or delete, inside the same
+transaction, so /product/recommendations reads a table with one row per
+distinct name and category instead of loading every product.
+
+`rebuild()` (flask templates rebuild) regroups the whole products table.
+"""
+from sqlalchemy import delete, event, exists, func, inspect, insert, select, true
+from sqlalchemy.orm import Session
+
+from db import db
+from models.product import ProductModel
+from models.product_template import ProductTemplateModel
+
+_TRACKED = ("name", "category", "price")
+
+
+def name_key(column):
+    return func.lower(func.trim(column))
+
+
+def _grouped(names=None):
+    """SELECT of template rows from products, for the given raw names or all"""
+    key = name_key(ProductModel.name).label("name_key")
+    category = func.coalesce(ProductModel.category, "").label("category")
+    stmt = select(key, category, func.count(ProductModel.id), func.sum(ProductModel.price),
+                  func.min(ProductModel.id))
+    if names is not None:
+        stmt = stmt.where(name_key(ProductModel.name).in_([name_key(name) for name in names]))
+    return stmt.group_by(key, category)
+
+
+def refresh(conn, names=None):
+    """Regroup the templates of the given raw product names (all when None)"""
+    table = ProductTemplateModel.__table__
+    columns = ["name_key", "category", "product_count", "price_sum", "template_product_id"]
+
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        # Groups with no product left
+        gone = delete(table).where(~exists().where(
+            name_key(ProductModel.name) == table.c.name_key,
+            func.coalesce(ProductModel.category, "") == table.c.category,
+        ))
+        if names is not None:
+            gone = gone.where(table.c.name_key.in_([name_key(name) for name in names]))
+        conn.execute(gone)
+        # Upsert, not DELETE + INSERT: a concurrent transaction regrouping
+        # the same name (its rows not yet visible to our DELETE) would make
+        # our INSERT fail on the primary key. SQLite needs the WHERE to
+        # parse INSERT ... SELECT ... ON CONFLICT.
+        stmt = upsert(table).from_select(columns, _grouped(names).where(true()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name_key, table.c.category],
+            set_={c: stmt.excluded[c] for c in columns[2:]},
+        )
+        conn.execute(stmt)
+        return
+
+    # Portable fallback
+    stale = delete(table)
+    if names is not None:
+        stale = stale.where(table.c.name_key.in_([name_key(name) for name in names]))
+    conn.execute(stale)
+    conn.execute(insert(table).from_select(columns, _grouped(names)))
+
+
+def _touched_names(session):
+    names = set()
+    for obj in session.new:
+        if isinstance(obj, ProductModel):
+            names.add(obj.name)
+    for obj in session.deleted:
+        if isinstance(obj, ProductModel):
+            names.add(obj.name)
+            names.update(inspect(obj).attrs.name.history.deleted)
+    for obj in session.dirty:
+        if not isinstance(obj, ProductModel):
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[key].history.has_changes() for key in _TRACKED):
+            names.add(obj.name)
+            names.update(attrs.name.history.deleted)
+    names.discard(None)
+    return names
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_touched_templates(session, flush_context):
+    names = _touched_names(session)
+    if names:
+        refresh(session.connection(), sorted(names))
+
+
+def rebuild(session=None):
+    """Regroup every product; returns the number of templates"""
+    session = session or db.session
+    refresh(session.connection())
+    session.commit()
+    return session.query(ProductTemplateModel).count()
+
+
+def popular(category=None, exclude_bakery_id=None, limit=50, session=None):
+    """
+    Most common product names (optionally within a category), leaving out
+    one bakery's own products. Returns dicts in the shape of the
+    /product/recommendations response.
+    """
+    session = session or db.session
+    t = ProductTemplateModel
+    total = func.sum(t.product_count).label("total")
+    scope = [t.category == category] if category else []
+
+    # The excluded bakery's own products, subtracted from the totals below
+    own = {}
+    if exclude_bakery_id:
+        own_stmt = (
+            select(name_key(ProductModel.name), func.count(ProductModel.id), func.sum(ProductModel.price))
+            .where(ProductModel.bakery_id == exclude_bakery_id)
+            .group_by(name_key(ProductModel.name))
+        )
+        if category:
+            own_stmt = own_stmt.where(ProductModel.category == category)
+        own = {key: (count, price) for key, count, price in session.execute(own_stmt)}
+
+    rows = (
+        session.query(t.name_key, total, func.sum(t.price_sum), func.min(t.template_product_id))
+        .filter(*scope)
+        .group_by(t.name_key)
+        .order_by(total.desc(), t.name_key)
+        # Subtracting the excluded bakery can reorder at most len(own) names
+        .limit(limit + len(own))
+        .all()
+    )
+
+    groups = []
+    for key, count, price_sum, template_id in rows:
+        own_count, own_price = own.get(key, (0, 0))
+        count -= own_count
+        if count <= 0:
+            continue
+        price_sum = float(price_sum or 0) - float(own_price or 0)
+        groups.append({"key": key, "count": count, "avg_price": price_sum / count, "template_id": template_id})
+    groups.sort(key=lambda g: (-g["count"], g["key"]))
+    groups = groups[:limit]
+    if not groups:
+        return []
+
+    keys = [g["key"] for g in groups]
+    if exclude_bakery_id:
+        # Representatives must come from another bakery
+        stmt = (
+            select(name_key(ProductModel.name), func.min(ProductModel.id))
+            .where(name_key(ProductModel.name).in_(keys), ProductModel.bakery_id != exclude_bakery_id,
+                   *([ProductModel.category == category] if category else []))
+            .group_by(name_key(ProductModel.name))
+        )
+        replacements = dict(session.execute(stmt).all())
+        for group in groups:
+            group["template_id"] = replacements.get(group["key"])
+
+    if category:
+        categories = {key: [category] for key in keys}
+    else:
+        categories = {key: [] for key in keys}
+        for key, cat in session.query(t.name_key, t.category).filter(t.name_key.in_(keys)).order_by(t.category):
+            if cat:
+                categories[key].append(cat)
+
+    examples = {
+        p.id: p for p in ProductModel.query.filter(ProductModel.id.in_([g["template_id"] for g in groups]))
+    }
+    recommendations = []
+    for group in groups:
+        # None when the table is behind the products (never built, or a
+        # bulk UPDATE that bypassed the session hook): skip the group
+        example = examples.get(group["template_id"])
+        if example is None:
+            continue
+        recommendations.append({
+            'template_product_id': example.id,
+            'name': example.name,
+            'description': example.description,
+            'category': example.category,
+            'allergens': example.allergens,
+            'tags': example.tags,
+            'image_url': example.image_url,
+            'popularity': group["count"],
+            'avg_price': round(group["avg_price"], 2) if group["avg_price"] else None,
+            'categories': categories[group["key"]],
+        })
+    return recommendations
@@ -0,0 +1,107 @@
+"""
+Incremental bakery rating aggregates.
+
+Each bakery row carries review_count, rating_sum and rating_sq_sum. A review
+write changes them with one atomic UPDATE in the caller's transaction:
+
+    UPDATE bakeries SET review_count = review_count + :dc,
+                        rating_sum = rating_sum + :ds, ...
+
+so concurrent reviews never lose an increment and nothing rescans the
+reviews table. The derived columns (`rating` mean, `bayesian_rating`) are
+recomputed in the same statement from the pre-update values plus the delta.
+
+`rebuild()` (flask ratings rebuild) recomputes everything from the reviews
+table, for repair after manual edits or imports.
+"""
+from sqlalchemy import bindparam, case, func, update
+
+from db import db
+from models.bakery import BakeryModel, RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT
+from models.review import ReviewModel
+from utils.change_tracking import on_commit
+from utils.response_cache import response_cache
+
+
+def _derived(count, total):
+    """Column expressions for the mean and Bayesian average from count and sum"""
+    mean = case((count > 0, total * 1.0 / count), else_=0.0)
+    bayesian = (RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + total * 1.0) / (RATING_PRIOR_WEIGHT + count)
+    return mean, bayesian
+
+
+def apply_delta(bakery_id, count=0, total=0, squares=0, session=None):
+    """Add the given deltas to a bakery's aggregates (one UPDATE, no commit)"""
+    if not bakery_id or not (count or total or squares):
+        return
+    session = session or db.session
+    new_count = func.coalesce(BakeryModel.review_count, 0) + count
+    new_total = BakeryModel.rating_sum + total
+    mean, bayesian = _derived(new_count, new_total)
+    session.execute(
+        update(BakeryModel.__table__)
+        .where(BakeryModel.id == bakery_id)
+        .values(
+            review_count=new_count,
+            rating_sum=new_total,
+            rating_sq_sum=BakeryModel.rating_sq_sum + squares,
+            rating=mean,
+            bayesian_rating=bayesian,
+            **BakeryModel.version_bump(),
+        )
+    )
+    # The UPDATE bypasses the ORM; reload the bakery on next access
+    bakery = session.identity_map.get(session.identity_key(BakeryModel, bakery_id))
+    if bakery is not None:
+        session.expire(bakery, ["review_count", "rating_sum", "rating_sq_sum", "rating", "bayesian_rating",
+                                "version", "updated_at"])
+    on_commit(session, response_cache.invalidate, "bakeries", f"bakery:{bakery_id}")
+
+
+def review_added(bakery_id, rating, session=None):
+    apply_delta(bakery_id, 1, rating, rating * rating, session)
+
+
+def review_removed(bakery_id, rating, session=None):
+    apply_delta(bakery_id, -1, -rating, -rating * rating, session)
+
+
+def review_changed(bakery_id, old_rating, new_rating, session=None):
+    apply_delta(bakery_id, 0, new_rating - old_rating, new_rating ** 2 - old_rating ** 2, session)
+
+
+def rebuild(session=None):
+    """Recompute every bakery's aggregates from the reviews table; returns bakeries with reviews"""
+    session = session or db.session
+    table = BakeryModel.__table__
+    session.execute(
+        update(table).values(review_count=0, rating_sum=0, rating_sq_sum=0, rating=0.0,
+                             bayesian_rating=RATING_PRIOR_MEAN, **BakeryModel.version_bump())
+    )
+
+    rows = (
+        session.query(
+            ReviewModel.bakery_id,
+            func.count(ReviewModel.id),
+            func.sum(ReviewModel.rating),
+            func.sum(ReviewModel.rating * ReviewModel.rating),
+        )
+        .filter(ReviewModel.bakery_id.isnot(None))
+        .group_by(ReviewModel.bakery_id)
+        .all()
+    )
+    if rows:
+        count, total = bindparam("n", type_=db.Integer), bindparam("s", type_=db.Integer)
+        mean, bayesian = _derived(count, total)
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(review_count=count, rating_sum=total, rating_sq_sum=bindparam("sq"),
+                    rating=mean, bayesian_rating=bayesian)
+        )
+        session.execute(stmt, [{"b_id": b, "n": n, "s": s, "sq": sq} for b, n, s, sq in rows])
+    session.commit()
+    session.expire_all()
+    # Every bakery's rating may have changed
+    response_cache.clear()
+    return len(rows)
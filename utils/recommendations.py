@@ -0,0 +1,397 @@
+"""
+Surplus bag recommendations.
+
+A bag's score for a user blends five signals, each scaled to [0, 1]:
+
+- bakery affinity: how much of the user's order history is with the bag's
+  bakery (relative to their most ordered-from bakery)
+- tag affinity: how well the bag's tags match the tags of what they bought
+- proximity: decays with the distance from the user's saved location
+- freshness: bags whose pickup window closes soon rank higher
+- rating: the bakery's Bayesian rating
+
+Requests never scan the catalogue. Available bags, with their bakery's
+coordinates, rating and tag ids, are held in a CandidatePool snapshot
+(numpy arrays) rebuilt every RECS_CANDIDATE_TTL seconds; a user's affinity
+is two small GROUP BY queries, and their ranked list is cached for
+RECS_USER_TTL seconds (dropped as soon as they place an order).
+
+`build()` (flask recs build) scores users in bulk: users x bakeries and
+users x tags affinity matrices are filled from two GROUP BY queries per
+chunk of users, every score is a few matrix operations, and each user's
+top MAX_RECOMMENDATIONS bags are written to user_recommendations. The
+endpoint reads that table and scores on request for users the last build
+did not cover, or to top up a stored list whose bags sold out or expired.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, func, insert, or_, select
+
+from db import db
+from models.bakery import BakeryModel
+from models.order import OrderModel
+from models.order_item import OrderItemModel
+from models.surplus_bag import SurplusBagModel
+from models.tag import product_tags, surplus_bag_tags
+from models.user import UserModel
+from models.user_recommendation import UserRecommendationModel
+from utils.cache import TTLCache
+from utils.change_tracking import subscribe
+from utils.geo import haversine_km_many
+
+WEIGHTS = {
+    "bakery": 0.35,
+    "tags": 0.25,
+    "proximity": 0.2,
+    "freshness": 0.1,
+    "rating": 0.1,
+}
+DISTANCE_SCALE_KM = 5.0     # proximity is 0.5 at this distance
+FRESHNESS_HALF_LIFE_H = 12.0  # freshness halves for every 12h of pickup window left
+MAX_RECOMMENDATIONS = 50
+
+user_cache = TTLCache(ttl=300, maxsize=10000)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _utc_seconds(moment):
+    """Seconds since the epoch for a naive UTC datetime (as stored)"""
+    return (moment - _EPOCH).total_seconds()
+
+
+class CandidatePool:
+    """Snapshot of every bag that can still be ordered, as parallel arrays"""
+
+    def __init__(self, rows, tag_pairs):
+        rows = list(rows)
+        self.bag_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.bakery_ids = np.array([r[1] for r in rows], dtype=np.int64)
+        self.pickup_end = np.array([_utc_seconds(r[2]) for r in rows], dtype=np.float64)
+        self.lats = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+        self.lngs = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        self.ratings = np.array([r[5] or 0.0 for r in rows], dtype=np.float64)
+
+        # Bag-tag incidence as (row index, tag id) pairs
+        index = {bag_id: i for i, bag_id in enumerate(self.bag_ids.tolist())}
+        pairs = [(index[bag_id], tag_id) for bag_id, tag_id in tag_pairs if bag_id in index]
+        self.tag_rows = np.array([p[0] for p in pairs], dtype=np.int64)
+        self.tag_ids = np.array([p[1] for p in pairs], dtype=np.int64)
+        self.tag_counts = np.bincount(self.tag_rows, minlength=len(rows)).astype(np.float64)
+
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.bag_ids)
+
+    @classmethod
+    def load(cls, session=None):
+        session = session or db.session
+        rows = (
+            session.query(
+                SurplusBagModel.id,
+                SurplusBagModel.bakery_id,
+                SurplusBagModel.pickup_end,
+                BakeryModel.latitude,
+                BakeryModel.longitude,
+                BakeryModel.bayesian_rating,
+            )
+            .join(BakeryModel, BakeryModel.id == SurplusBagModel.bakery_id)
+            .filter(SurplusBagModel.quantity_available > 0,
+                    SurplusBagModel.pickup_end > datetime.utcnow())
+            .all()
+        )
+        tag_pairs = []
+        if rows:
+            tag_pairs = (
+                session.query(surplus_bag_tags.c.surplus_bag_id, surplus_bag_tags.c.tag_id)
+                .join(SurplusBagModel, SurplusBagModel.id == surplus_bag_tags.c.surplus_bag_id)
+                .filter(SurplusBagModel.quantity_available > 0,
+                        SurplusBagModel.pickup_end > datetime.utcnow())
+                .all()
+            )
+        return cls(rows, tag_pairs)
+
+    def static_scores(self, now=None):
+        """Freshness and rating terms, which are the same for every user"""
+        now = _utc_seconds(datetime.utcnow()) if now is None else now
+        hours_left = np.maximum(self.pickup_end - now, 0.0) / 3600.0
+        freshness = 0.5 ** (hours_left / FRESHNESS_HALF_LIFE_H)
+        rating = np.clip((self.ratings - 1.0) / 4.0, 0.0, 1.0)
+        return WEIGHTS["freshness"] * freshness + WEIGHTS["rating"] * rating
+
+    def proximity(self, lat, lng):
+        if lat is None or lng is None or not len(self):
+            return np.zeros(len(self))
+        distances = haversine_km_many(lat, lng, self.lats, self.lngs)
+        # Bakeries without coordinates get no proximity credit
+        return np.nan_to_num(1.0 / (1.0 + distances / DISTANCE_SCALE_KM), nan=0.0)
+
+    def proximity_many(self, lats, lngs):
+        """users x bags proximity; users without a location get zeros"""
+        lats = np.asarray([np.nan if v is None else v for v in lats], dtype=np.float64)[:, None]
+        lngs = np.asarray([np.nan if v is None else v for v in lngs], dtype=np.float64)[:, None]
+        distances = haversine_km_many(lats, lngs, self.lats[None, :], self.lngs[None, :])
+        return np.nan_to_num(1.0 / (1.0 + distances / DISTANCE_SCALE_KM), nan=0.0)
+
+    def affinity(self, bakery_weights, tag_weights):
+        """Bakery and tag affinity per bag from {bakery_id: w} / {tag_id: w}"""
+        bakery = np.fromiter((bakery_weights.get(b, 0.0) for b in self.bakery_ids.tolist()),
+                             dtype=np.float64, count=len(self))
+        if not tag_weights or not len(self.tag_ids):
+            return bakery, np.zeros(len(self))
+        pair_weights = np.fromiter((tag_weights.get(t, 0.0) for t in self.tag_ids.tolist()),
+                                   dtype=np.float64, count=len(self.tag_ids))
+        totals = np.bincount(self.tag_rows, weights=pair_weights, minlength=len(self))
+        return bakery, totals / np.maximum(self.tag_counts, 1.0)
+
+    def columns(self):
+        """
+        Column layout for the batch matrices: (bakery ids, each bag's bakery
+        column, tag ids, bags x tags incidence matrix)
+        """
+        bakery_ids, bakery_cols = np.unique(self.bakery_ids, return_inverse=True)
+        tag_ids, tag_cols = np.unique(self.tag_ids, return_inverse=True)
+        incidence = np.zeros((len(self), len(tag_ids)))
+        incidence[self.tag_rows, tag_cols] = 1.0
+        return bakery_ids, bakery_cols, tag_ids, incidence
+
+    def rank(self, scores, limit):
+        """Bag ids of the `limit` best scores, earliest pickup end first on ties"""
+        order = np.lexsort((self.pickup_end, -scores))
+        return self.bag_ids[order[:limit]].tolist()
+
+    def rank_many(self, scores, limit):
+        """Row-wise rank() of a users x bags score matrix: (bag ids, scores) arrays"""
+        ends = np.broadcast_to(self.pickup_end, scores.shape)
+        order = np.lexsort((ends, -scores), axis=-1)[:, :limit]
+        return self.bag_ids[order], np.take_along_axis(scores, order, axis=1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def candidate_pool(ttl=None):
+    """The current CandidatePool, rebuilt when older than `ttl` seconds"""
+    global _pool
+    if ttl is None:
+        ttl = current_app.config.get("RECS_CANDIDATE_TTL", 300)
+    pool = _pool
+    if pool is None or ttl <= 0 or time.monotonic() - pool.built_at > ttl:
+        with _pool_lock:
+            if _pool is pool:
+                _pool = CandidatePool.load()
+            pool = _pool
+    return pool
+
+
+def _normalized(rows):
+    weights = {key: float(value or 0) for key, value in rows}
+    top = max(weights.values(), default=0.0)
+    return {key: value / top for key, value in weights.items()} if top > 0 else {}
+
+
+def _ordered_tags(session, criteria):
+    """(user_id, tag_id, quantity) for every tagged bag or product in matching orders"""
+    def items(tag_table, fk, item_column):
+        return (
+            session.query(OrderModel.user_id.label("user_id"), tag_table.c.tag_id.label("tag_id"),
+                          OrderItemModel.quantity.label("quantity"))
+            .join(OrderItemModel, item_column == tag_table.c[fk])
+            .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+            .filter(*criteria)
+        )
+    return items(surplus_bag_tags, "surplus_bag_id", OrderItemModel.surplus_bag_id).union_all(
+        items(product_tags, "product_id", OrderItemModel.product_id)
+    ).subquery()
+
+
+def user_affinity(user_id, session=None):
+    """
+    ({bakery_id: weight}, {tag_id: weight}) from the user's non-cancelled
+    orders, each scaled so the strongest preference is 1.
+    """
+    session = session or db.session
+    placed = (OrderModel.user_id == user_id, OrderModel.status != "cancelled")
+    bakeries = (
+        session.query(OrderModel.bakery_id, func.count(OrderModel.id))
+        .filter(*placed)
+        .group_by(OrderModel.bakery_id)
+        .all()
+    )
+    if not bakeries:
+        return {}, {}
+
+    item_tags = _ordered_tags(session, placed)
+    tags = (
+        session.query(item_tags.c.tag_id, func.sum(item_tags.c.quantity))
+        .group_by(item_tags.c.tag_id)
+        .all()
+    )
+    return _normalized(bakeries), _normalized(tags)
+
+
+def _blend(pool, bakery, tags, proximity, now=None):
+    return (
+        WEIGHTS["bakery"] * bakery
+        + WEIGHTS["tags"] * tags
+        + WEIGHTS["proximity"] * proximity
+        + pool.static_scores(now)
+    )
+
+
+def score_bags(pool, bakery_weights, tag_weights, lat=None, lng=None, now=None):
+    """Blended score of every bag in `pool` for one user"""
+    bakery, tags = pool.affinity(bakery_weights, tag_weights)
+    return _blend(pool, bakery, tags, pool.proximity(lat, lng), now)
+
+
+def _affinity_matrix(rows, user_index, column_ids):
+    """
+    Dense users x columns matrix from (user_id, column id, weight) rows,
+    each user's row scaled so their strongest preference is 1.
+    """
+    matrix = np.zeros((len(user_index), len(column_ids)))
+    rows = [(user_index[u], key, float(w or 0)) for u, key, w in rows]
+    if rows and len(column_ids):
+        users, keys, weights = (np.array(col) for col in zip(*rows))
+        # Columns only exist for bakeries / tags that have a candidate bag
+        cols = np.searchsorted(column_ids, keys).clip(max=len(column_ids) - 1)
+        known = column_ids[cols] == keys
+        np.add.at(matrix, (users[known], cols[known]), weights[known])
+    top = matrix.max(axis=1, keepdims=True)
+    return np.divide(matrix, top, out=np.zeros_like(matrix), where=top > 0)
+
+
+def score_users(pool, users, layout=None, session=None, now=None):
+    """
+    users x bags score matrix for [(user_id, lat, lng)], the batch
+    equivalent of user_affinity() + score_bags() for each user.
+    """
+    session = session or db.session
+    bakery_ids, bakery_cols, tag_ids, incidence = layout or pool.columns()
+    user_ids = [u[0] for u in users]
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    placed = (OrderModel.user_id.in_(user_ids), OrderModel.status != "cancelled")
+
+    bakery_rows = (
+        session.query(OrderModel.user_id, OrderModel.bakery_id, func.count(OrderModel.id))
+        .filter(*placed)
+        .group_by(OrderModel.user_id, OrderModel.bakery_id)
+        .all()
+    )
+    item_tags = _ordered_tags(session, placed)
+    tag_rows = (
+        session.query(item_tags.c.user_id, item_tags.c.tag_id, func.sum(item_tags.c.quantity))
+        .group_by(item_tags.c.user_id, item_tags.c.tag_id)
+        .all()
+    )
+    user_bakery = _affinity_matrix(bakery_rows, user_index, bakery_ids)
+    user_tag = _affinity_matrix(tag_rows, user_index, tag_ids)
+
+    bakery = user_bakery[:, bakery_cols]
+    tags = (user_tag @ incidence.T) / np.maximum(pool.tag_counts, 1.0)
+    proximity = pool.proximity_many([u[1] for u in users], [u[2] for u in users])
+    return _blend(pool, bakery, tags, proximity, now)
+
+
+def build(full=False, chunk_size=500, session=None):
+    """
+    Recompute user_recommendations; returns a stats dict.
+
+    By default only users whose stored list went stale are rescored:
+    orders placed since the last build, a stored bag no longer available,
+    or a list older than RECS_MAX_AGE seconds (it can't include bags
+    listed since). The first run, and full=True, rescore every user with
+    a non-cancelled order in the last RECS_ACTIVE_DAYS days.
+    """
+    started = time.perf_counter()
+    session = session or db.session
+    table = UserRecommendationModel.__table__
+    now = datetime.utcnow()
+
+    last_build = None if full else session.query(func.max(table.c.computed_at)).scalar()
+    if last_build is None:
+        active_days = current_app.config.get("RECS_ACTIVE_DAYS", 90)
+        recent = (OrderModel.status != "cancelled",
+                  OrderModel.created_at >= now - timedelta(days=active_days))
+        stale = UserModel.id.in_(select(OrderModel.user_id).where(*recent))
+    else:
+        max_age = current_app.config.get("RECS_MAX_AGE", 6 * 3600)
+        stale = or_(
+            UserModel.id.in_(select(OrderModel.user_id).where(OrderModel.created_at > last_build)),
+            UserModel.id.in_(select(table.c.user_id).where(table.c.computed_at < now - timedelta(seconds=max_age))),
+            UserModel.id.in_(
+                select(table.c.user_id)
+                .join(SurplusBagModel, SurplusBagModel.id == table.c.surplus_bag_id)
+                .where(~SurplusBagModel.available(now))
+            ),
+        )
+    users = (
+        session.query(UserModel.id, UserModel.latitude, UserModel.longitude)
+        .filter(stale)
+        .order_by(UserModel.id)
+        .all()
+    )
+
+    pool = CandidatePool.load(session)
+    layout = pool.columns()
+    limit = min(MAX_RECOMMENDATIONS, len(pool))
+    written = 0
+    for start in range(0, len(users), chunk_size):
+        chunk = users[start:start + chunk_size]
+        chunk_ids = [u[0] for u in chunk]
+        rows = []
+        if limit:
+            scores = score_users(pool, chunk, layout, session, _utc_seconds(now))
+            bag_ids, top_scores = pool.rank_many(scores, limit)
+            for user_id, user_bags, user_scores in zip(chunk_ids, bag_ids.tolist(), top_scores.tolist()):
+                rows.extend(
+                    {"user_id": user_id, "rank": rank, "surplus_bag_id": bag_id,
+                     "score": round(score, 6), "computed_at": now}
+                    for rank, (bag_id, score) in enumerate(zip(user_bags, user_scores))
+                )
+        session.execute(delete(table).where(table.c.user_id.in_(chunk_ids)))
+        if rows:
+            session.execute(insert(table), rows)
+        session.commit()
+        written += len(rows)
+        for user_id in chunk_ids:
+            user_cache.pop(user_id)
+
+    seconds = time.perf_counter() - started
+    return {
+        "users": len(users),
+        "rows": written,
+        "candidates": len(pool),
+        "seconds": seconds,
+        "incremental": last_build is not None,
+    }
+
+
+def recommend(user, limit=10):
+    """Ids of the top `limit` bags for `user`, best first"""
+    def compute():
+        pool = candidate_pool()
+        if not len(pool):
+            return []
+        bakery_weights, tag_weights = user_affinity(user.id)
+        scores = score_bags(pool, bakery_weights, tag_weights, user.latitude, user.longitude)
+        return pool.rank(scores, MAX_RECOMMENDATIONS)
+
+    ttl = current_app.config.get("RECS_USER_TTL", 300)
+    return user_cache.get_or_set(user.id, compute, ttl)[:limit]
+
+
+def _forget_user(action, row):
+    # A new or changed order shifts the user's affinity
+    if row.get("user_id") is not None:
+        user_cache.pop(row["user_id"])
+
+
+subscribe(OrderModel, _forget_user)
@@ -0,0 +1,168 @@
+"""
+Structured request logging that stays off the request's critical path.
+
+Each sampled request produces one JSON line. The request thread only builds
+a small dict and drops it on a bounded queue; a background listener thread
+does the JSON encoding and the (size-rotated) file writes. When the queue
+is full, entries are dropped rather than blocking the request.
+
+Every process writes its own file: rotation is not safe across processes,
+so gunicorn workers sharing one path would lose and interleave lines. Keep
+{pid} in REQUEST_LOG_PATH whenever more than one process serves the app.
+
+Config keys (all optional):
+    REQUEST_LOG_ENABLED       turn the middleware on/off (default True)
+    REQUEST_LOG_PATH          log file, {pid} is the process id (default requests-{pid}.log)
+    REQUEST_LOG_SAMPLE_RATE   fraction of requests logged, 0..1 (default 1.0)
+    REQUEST_LOG_BODIES        include redacted JSON bodies (default False)
+    REQUEST_LOG_MAX_BYTES     rotate after this size (default 10 MB)
+    REQUEST_LOG_BACKUP_COUNT  rotated files kept (default 5)
+    REQUEST_LOG_QUEUE_SIZE    max pending entries (default 10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+REDACTED = "[REDACTED]"
+REDACT_KEYS = {
+    "password", "new_password", "old_password", "token", "access_token",
+    "refresh_token", "payment_intent_id", "secret", "authorization",
+}
+MAX_BODY_CHARS = 2000
+
+
+def redact(value):
+    """Recursively mask sensitive keys in a JSON-like structure"""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if k.lower() in REDACT_KEYS else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, default=str, separators=(",", ":"))
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands the raw record to the queue; never blocks, never formats"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+class RequestLogger:
+    def __init__(self):
+        self.logger = logging.getLogger("forni.requests")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self._config = {}
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        config = {
+            "enabled": app.config.get("REQUEST_LOG_ENABLED", True),
+            "path": app.config.get("REQUEST_LOG_PATH", "requests-{pid}.log"),
+            "sample_rate": float(app.config.get("REQUEST_LOG_SAMPLE_RATE", 1.0)),
+            "bodies": app.config.get("REQUEST_LOG_BODIES", False),
+            "max_bytes": int(app.config.get("REQUEST_LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            "backup_count": int(app.config.get("REQUEST_LOG_BACKUP_COUNT", 5)),
+            "queue_size": int(app.config.get("REQUEST_LOG_QUEUE_SIZE", 10000)),
+        }
+        self._config = config
+        if not config["enabled"] or config["sample_rate"] <= 0:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        # Started lazily so forked workers (gunicorn --preload) get their own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            config = self._config
+            file_handler = logging.handlers.RotatingFileHandler(
+                config["path"].format(pid=os.getpid()),
+                maxBytes=config["max_bytes"],
+                backupCount=config["backup_count"],
+                encoding="utf-8",
+                delay=True,
+            )
+            file_handler.setFormatter(JsonLineFormatter())
+
+            log_queue = queue.Queue(maxsize=config["queue_size"])
+            self.logger.handlers = [_DroppingQueueHandler(log_queue)]
+            self._listener = logging.handlers.QueueListener(log_queue, file_handler)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Flush pending entries and stop the writer thread"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def _before_request(self):
+        g.request_log_sampled = random.random() < self._config["sample_rate"]
+        if g.request_log_sampled:
+            g.request_log_start = time.perf_counter()
+
+    def _after_request(self, response):
+        if not g.get("request_log_sampled"):
+            return response
+        self._ensure_started()
+
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("latin-1") or None,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - g.request_log_start) * 1000, 2),
+            "remote_addr": request.remote_addr,
+        }
+        if self._config["bodies"] and request.is_json:
+            body = request.get_json(silent=True)
+            if body is not None:
+                body = redact(body)
+                encoded = json.dumps(body, default=str)
+                entry["body"] = body if len(encoded) <= MAX_BODY_CHARS else encoded[:MAX_BODY_CHARS] + "..."
+
+        self.logger.info(entry)
+        return response
+
+    @property
+    def dropped(self):
+        return _DroppingQueueHandler.dropped
+
+
+request_logger = RequestLogger()
@@ -0,0 +1,216 @@
+"""
+Whole-response cache for the public catalog GETs.
+
+Bakery, product and surplus bag listings and bakery details are most of the
+traffic and identical for every caller. A cached 200 response is replayed
+(body and headers) without touching the database or marshmallow.
+
+Keys are the host, path and normalized query string: parameters sorted,
+blank values dropped, so `?limit=20&bakery_id=3` and `?bakery_id=3&limit=20&name=`
+share an entry. Views behind @conditional (utils/conditional.py) also key on
+their ETag, so a cached body always matches the validators sent with it, even
+when another worker's write has not reached this worker's cache.
+
+Invalidation is tag based. An entry records the tags it depends on
+("bakeries", "bakery:7", ...) with each tag's version token at the time the
+handler ran; a committed write replaces the tokens of the tags it touches,
+which makes every dependent entry stale at once without tracking keys per
+tag. Tokens are read before the handler queries the database, so a response
+computed while a write commits is never stored as fresh. ORM writes are
+picked up through utils.change_tracking; bulk UPDATEs call invalidate()
+themselves (see utils/inventory.py, utils/ratings.py).
+
+Backends (RESPONSE_CACHE_BACKEND):
+    memory  per-worker LRU with TTL (default); writes served by other
+            workers are only seen once entries expire
+    redis   shared by every worker at RESPONSE_CACHE_URL, so invalidation
+            is global (needs the `redis` package)
+    none    disabled
+
+Config keys (all optional):
+    RESPONSE_CACHE_TTL      seconds an entry lives (default 30)
+    RESPONSE_CACHE_MAXSIZE  entries per worker, memory backend (default 4096)
+"""
+import secrets
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+
+from models.bakery import BakeryModel
+from models.product import ProductModel
+from models.surplus_bag import SurplusBagModel
+from utils.cache import RedisCache, TTLCache
+from utils.change_tracking import subscribe
+
+# Tag tokens outlive the entries referencing them; an expired token only
+# turns those entries into misses
+TAG_TTL_FACTOR = 10
+# Recomputed by the server for the replayed body
+_SKIPPED_HEADERS = {"content-length"}
+
+
+def cache_key():
+    """Host, path and normalized query string of the current request"""
+    args = sorted((k, v.strip()) for k, v in request.args.items(multi=True) if v.strip())
+    key = f"resp:{request.host}{request.path}?{urlencode(args)}"
+    etag = g.get("etag")
+    return f"{key}#{etag}" if etag else key
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = None
+        self.backend_name = "none"
+        self.ttl = 30
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("RESPONSE_CACHE_TTL", self.ttl)
+        self.backend_name = app.config.get("RESPONSE_CACHE_BACKEND", "memory")
+        if self.backend_name == "memory":
+            self.backend = TTLCache(ttl=self.ttl, maxsize=app.config.get("RESPONSE_CACHE_MAXSIZE", 4096))
+        elif self.backend_name == "redis":
+            self.backend = RedisCache(app.config["RESPONSE_CACHE_URL"], ttl=self.ttl, prefix="forni:")
+        elif self.backend_name == "none":
+            self.backend = None
+        else:
+            raise ValueError(f"RESPONSE_CACHE_BACKEND must be memory, redis or none, not {self.backend_name!r}")
+
+    # ---- tags --------------------------------------------------------
+
+    def _tag_versions(self, tags):
+        keys = [f"tag:{tag}" for tag in tags]
+        tokens = self.backend.get_many(keys)
+        for i, token in enumerate(tokens):
+            if token is None:
+                # First use (or evicted): start a new version, never reuse one
+                tokens[i] = self.backend.add(keys[i], secrets.token_hex(6), self.ttl * TAG_TTL_FACTOR)
+        return dict(zip(tags, tokens))
+
+    def invalidate(self, *tags):
+        """Make every entry depending on any of `tags` stale (all workers, with redis)"""
+        if self.backend is None or not tags:
+            return
+        tags = set(tags)
+        try:
+            for tag in tags:
+                self.backend.set(f"tag:{tag}", secrets.token_hex(6), self.ttl * TAG_TTL_FACTOR)
+        except Exception as e:
+            # Entries expire on their own; a cache outage must not fail a write
+            self.errors += 1
+            print(f"Response cache invalidation failed: {e}", flush=True)
+            return
+        self.invalidations += len(tags)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    # ---- serving -----------------------------------------------------
+
+    def serve(self, view, args, kwargs, tags):
+        key = cache_key()
+        try:
+            entry = self.backend.get(key)
+            if entry is not None:
+                if self._tag_versions(list(entry["tags"])) == entry["tags"]:
+                    self.hits += 1
+                    response = current_app.response_class(entry["body"], status=200, headers=entry["headers"])
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+                self.stale += 1
+            else:
+                self.misses += 1
+            g.response_cache_tags = self._tag_versions(tags)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response cache lookup failed: {e}", flush=True)
+            return view(*args, **kwargs)
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and response.is_json and not response.direct_passthrough:
+            entry = {
+                "tags": g.response_cache_tags,
+                "headers": [[k, v] for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS],
+                "body": response.get_data(as_text=True),
+            }
+            try:
+                self.backend.set(key, entry)
+                self.stores += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Response cache store failed: {e}", flush=True)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.stale
+        try:
+            keys = len(self.backend) if self.backend is not None else 0
+        except Exception:
+            keys = None
+        return {
+            "backend": self.backend_name,
+            "ttl": self.ttl,
+            "keys": keys,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(*tags):
+    """
+    Cache a public GET view's 200 JSON responses, dependent on `tags`.
+
+    Tags may name the view's URL arguments, e.g. "bakery:{bakery_id}".
+    Dependencies that come from query parameters are added by the handler
+    with add_cache_tags(). Put this decorator above the smorest ones: a hit
+    skips argument parsing and serialization entirely.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if response_cache.backend is None:
+                return fn(*args, **kwargs)
+            return response_cache.serve(fn, args, kwargs, [tag.format(**kwargs) for tag in tags])
+        return wrapper
+    return decorator
+
+
+def add_cache_tags(*tags):
+    """Extra dependencies for the response being cached (no-op otherwise)"""
+    if "response_cache_tags" in g:
+        g.response_cache_tags.update(response_cache._tag_versions(list(tags)))
+
+
+# ---- invalidation on committed ORM writes ----------------------------
+
+def _bakery_changed(action, row):
+    response_cache.invalidate("bakeries", f"bakery:{row['id']}")
+
+
+def _product_changed(action, row):
+    response_cache.invalidate("products", f"bakery:{row.get('bakery_id')}")
+
+
+def _surplus_bag_changed(action, row):
+    response_cache.invalidate("surplus_bags", f"bakery:{row.get('bakery_id')}")
+
+
+subscribe(BakeryModel, _bakery_changed)
+subscribe(ProductModel, _product_changed)
+subscribe(SurplusBagModel, _surplus_bag_changed)
@@ -0,0 +1,358 @@
+"""
+Full-text search over bakeries, products and surplus bags.
+
+One document per searchable row (name, description, specialties, tags,
+city), stored in a SQLite FTS5 virtual table or, on Postgres, a table with a
+weighted tsvector column and a GIN index. Accents are folded on both sides,
+so "eclair" finds "Éclair".
+
+Document ids pack the row kind into the low bits (id * 4 + kind) so a single
+integer key addresses each document on both backends.
+
+Snippets are plain text, never markup: the backends mark matched words
+with private-use characters (stripped from indexed text), which are
+turned into [start, end) character offsets. Clients render the
+highlighting themselves, so user-written text is never interpreted as HTML.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+KINDS = {"bakery": 1, "product": 2, "surplus_bag": 3}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Match markers the backends put around snippet words
+MARK_START, MARK_END = "\ue000", "\ue001"
+_MARKS_RE = re.compile(f"([{MARK_START}{MARK_END}])")
+_NO_MARKS = {ord(MARK_START): None, ord(MARK_END): None}
+
+
+def normalize_text(value):
+    """Lowercase and strip accents ("Éclair" -> "eclair")"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def query_terms(q):
+    """Split user input into safe search terms (no operators leak through)"""
+    return _WORD_RE.findall(normalize_text(q))[:10]
+
+
+def split_highlights(marked):
+    """Snippet with match markers -> (plain text, [[start, end], ...] of the matches)"""
+    parts, highlights = [], []
+    position, start = 0, None
+    for piece in _MARKS_RE.split(marked or ""):
+        if piece == MARK_START:
+            start = position
+        elif piece == MARK_END:
+            if start is not None:
+                highlights.append([start, position])
+            start = None
+        else:
+            parts.append(piece)
+            position += len(piece)
+    return "".join(parts), highlights
+
+
+def doc_id(kind, ref_id):
+    return ref_id * 4 + KINDS[kind]
+
+
+def split_doc_id(value):
+    return KIND_NAMES[value % 4], value // 4
+
+
+# Source rows for each kind, with the owning bakery's city joined in.
+_SOURCE_SQL = {
+    "bakery": """
+        SELECT b.id, b.id AS bakery_id, b.name AS title,
+               coalesce(b.description, '') || ' ' || coalesce(b.specialties, '') || ' ' ||
+               coalesce(b.address, '') AS body,
+               '' AS tags, coalesce(b.city, '') || ' ' || coalesce(b.governorate, '') AS city
+        FROM bakeries b
+    """,
+    "product": """
+        SELECT p.id, p.bakery_id, p.name AS title,
+               coalesce(p.description, '') || ' ' || coalesce(p.category, '') AS body,
+               coalesce(p.tags, '') AS tags, coalesce(b.city, '') || ' ' || coalesce(b.governorate, '') AS city
+        FROM products p JOIN bakeries b ON b.id = p.bakery_id
+    """,
+    "surplus_bag": """
+        SELECT s.id, s.bakery_id, s.title AS title,
+               coalesce(s.description, '') AS body,
+               coalesce(s.tags, '') AS tags, coalesce(b.city, '') || ' ' || coalesce(b.governorate, '') AS city
+        FROM surplus_bags s JOIN bakeries b ON b.id = s.bakery_id
+    """,
+}
+
+_SOURCE_ALIAS = {"bakery": "b", "product": "p", "surplus_bag": "s"}
+
+
+class SqliteSearchBackend:
+    """FTS5 with accent folding; bm25 ranks title > tags > city > body"""
+
+    def create_schema(self, conn):
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "bakery_id UNINDEXED, title, body, tags, city, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+    def drop_schema(self, conn):
+        conn.execute(text("DROP TABLE IF EXISTS search_index"))
+
+    def upsert(self, conn, rows):
+        for row in rows:
+            conn.execute(text("DELETE FROM search_index WHERE rowid = :id"), {"id": row["id"]})
+        if rows:
+            conn.execute(text(
+                "INSERT INTO search_index (rowid, bakery_id, title, body, tags, city) "
+                "VALUES (:id, :bakery_id, :title, :body, :tags, :city)"
+            ), rows)
+
+    def delete(self, conn, ids):
+        for value in ids:
+            conn.execute(text("DELETE FROM search_index WHERE rowid = :id"), {"id": value})
+
+    def doc_city(self, conn, value):
+        return conn.execute(text("SELECT city FROM search_index WHERE rowid = :id"), {"id": value}).scalar()
+
+    def set_city(self, conn, bakery_id, city):
+        conn.execute(text("UPDATE search_index SET city = :city WHERE bakery_id = :bakery_id"),
+                     {"city": city, "bakery_id": bakery_id})
+
+    def _match(self, terms, column=None):
+        # Every term must match; the last one as a prefix (search-as-you-type)
+        phrases = [f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*']
+        expr = " ".join(phrases)
+        return f"{column} : ({expr})" if column else expr
+
+    def search(self, conn, terms, kinds, limit):
+        kind_filter = ",".join(str(KINDS[k]) for k in kinds)
+        result = conn.execute(text(
+            "SELECT rowid, bakery_id, title, "
+            "snippet(search_index, -1, :mark_start, :mark_end, '…', 12) AS snippet, "
+            "bm25(search_index, 0.0, 10.0, 1.0, 5.0, 2.0) AS rank "
+            "FROM search_index WHERE search_index MATCH :match "
+            f"AND (rowid % 4) IN ({kind_filter}) "
+            "ORDER BY rank LIMIT :limit"
+        ), {"match": self._match(terms), "limit": limit, "mark_start": MARK_START, "mark_end": MARK_END})
+        # bm25 is "lower is better"; flip it so higher scores rank first
+        return [(r.rowid, r.bakery_id, r.title, r.snippet, -r.rank) for r in result]
+
+    def autocomplete(self, conn, terms, limit):
+        result = conn.execute(text(
+            "SELECT title FROM search_index WHERE search_index MATCH :match "
+            "ORDER BY bm25(search_index, 0.0, 10.0, 1.0, 5.0, 2.0) LIMIT :limit"
+        ), {"match": self._match(terms, column="title"), "limit": limit * 3})
+        return [r.title for r in result]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector (title A, tags B, city C, body D) with a GIN index"""
+
+    _DOCUMENT_SQL = (
+        "setweight(to_tsvector('simple', :title_norm), 'A') || "
+        "setweight(to_tsvector('simple', :tags_norm), 'B') || "
+        "setweight(to_tsvector('simple', :city_norm), 'C') || "
+        "setweight(to_tsvector('simple', :body_norm), 'D')"
+    )
+
+    def create_schema(self, conn):
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "id BIGINT PRIMARY KEY, kind SMALLINT NOT NULL, bakery_id INTEGER, "
+            "title TEXT, body TEXT, tags TEXT, city TEXT, document TSVECTOR NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_document "
+            "ON search_documents USING GIN (document)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_bakery_id ON search_documents (bakery_id)"
+        ))
+
+    def drop_schema(self, conn):
+        conn.execute(text("DROP TABLE IF EXISTS search_documents"))
+
+    def _with_normalized(self, row):
+        row = dict(row)
+        for field in ("title", "body", "tags", "city"):
+            row[f"{field}_norm"] = normalize_text(row[field])
+        row["kind"] = row["id"] % 4
+        return row
+
+    def upsert(self, conn, rows):
+        if not rows:
+            return
+        conn.execute(text(
+            "INSERT INTO search_documents (id, kind, bakery_id, title, body, tags, city, document) "
+            f"VALUES (:id, :kind, :bakery_id, :title, :body, :tags, :city, {self._DOCUMENT_SQL}) "
+            "ON CONFLICT (id) DO UPDATE SET bakery_id = EXCLUDED.bakery_id, title = EXCLUDED.title, "
+            "body = EXCLUDED.body, tags = EXCLUDED.tags, city = EXCLUDED.city, document = EXCLUDED.document"
+        ), [self._with_normalized(row) for row in rows])
+
+    def delete(self, conn, ids):
+        if ids:
+            conn.execute(text("DELETE FROM search_documents WHERE id = ANY(:ids)"), {"ids": list(ids)})
+
+    def doc_city(self, conn, value):
+        return conn.execute(text("SELECT city FROM search_documents WHERE id = :id"), {"id": value}).scalar()
+
+    def set_city(self, conn, bakery_id, city):
+        # City is part of the weighted document: re-index that bakery's documents
+        rows = conn.execute(text(
+            "SELECT id, bakery_id, title, body, tags FROM search_documents WHERE bakery_id = :bakery_id"
+        ), {"bakery_id": bakery_id}).mappings().all()
+        self.upsert(conn, [dict(row, city=city) for row in rows])
+
+    def _tsquery(self, terms, weight=""):
+        return " & ".join(terms[:-1] + [f"{terms[-1]}:*{weight}"])
+
+    def search(self, conn, terms, kinds, limit):
+        result = conn.execute(text(
+            "SELECT id, bakery_id, title, "
+            "ts_headline('simple', body, to_tsquery('simple', :q), :headline) AS snippet, "
+            "ts_rank(document, to_tsquery('simple', :q)) AS rank "
+            "FROM search_documents WHERE document @@ to_tsquery('simple', :q) "
+            "AND kind = ANY(:kinds) ORDER BY rank DESC LIMIT :limit"
+        ), {"q": self._tsquery(terms), "kinds": [KINDS[k] for k in kinds], "limit": limit,
+            "headline": f'StartSel="{MARK_START}", StopSel="{MARK_END}", MaxWords=20, MinWords=8'})
+        return [(r.id, r.bakery_id, r.title, r.snippet, r.rank) for r in result]
+
+    def autocomplete(self, conn, terms, limit):
+        result = conn.execute(text(
+            "SELECT title FROM search_documents WHERE document @@ to_tsquery('simple', :q) "
+            "ORDER BY ts_rank(document, to_tsquery('simple', :q)) DESC LIMIT :limit"
+        ), {"q": self._tsquery(terms, weight="A"), "limit": limit * 3})
+        return [r.title for r in result]
+
+
+class SearchIndex:
+    """Dialect-aware facade used by the /search endpoints and the sync hooks"""
+
+    def __init__(self):
+        self._backends = {}
+        self._ready = set()
+
+    def backend(self, engine):
+        name = engine.dialect.name
+        if name not in self._backends:
+            if name == "sqlite":
+                self._backends[name] = SqliteSearchBackend()
+            elif name == "postgresql":
+                self._backends[name] = PostgresSearchBackend()
+            else:
+                raise RuntimeError(f"Full-text search is not supported on '{name}'")
+        return self._backends[name]
+
+    def _ensure_schema(self, engine, conn):
+        if engine.url not in self._ready:
+            self.backend(engine).create_schema(conn)
+            self._ready.add(engine.url)
+
+    def _load_rows(self, conn, kind, ids=None, bakery_id=None):
+        sql = _SOURCE_SQL[kind]
+        alias = _SOURCE_ALIAS[kind]
+        if ids is not None:
+            sql += f" WHERE {alias}.id IN ({','.join(str(int(i)) for i in ids) or 'NULL'})"
+        rows = []
+        for row in conn.execute(text(sql)).mappings():
+            rows.append({
+                "id": doc_id(kind, row["id"]),
+                "bakery_id": row["bakery_id"],
+                "title": row["title"].translate(_NO_MARKS),
+                "body": row["body"].translate(_NO_MARKS).strip(),
+                "tags": row["tags"].translate(_NO_MARKS).replace(",", " "),
+                "city": row["city"].translate(_NO_MARKS).strip(),
+            })
+        return rows
+
+    def refresh(self, engine, kind, ref_id):
+        """Re-index one row from the database (removes it if it's gone)"""
+        with engine.begin() as conn:
+            self._ensure_schema(engine, conn)
+            backend = self.backend(engine)
+            rows = self._load_rows(conn, kind, ids=[ref_id])
+            if rows:
+                old_city = backend.doc_city(conn, rows[0]["id"]) if kind == "bakery" else None
+                backend.upsert(conn, rows)
+                if kind == "bakery" and old_city is not None and old_city != rows[0]["city"]:
+                    # Products and bags carry their bakery's city
+                    backend.set_city(conn, ref_id, rows[0]["city"])
+            else:
+                backend.delete(conn, [doc_id(kind, ref_id)])
+
+    def remove(self, engine, kind, ref_id):
+        with engine.begin() as conn:
+            self._ensure_schema(engine, conn)
+            self.backend(engine).delete(conn, [doc_id(kind, ref_id)])
+
+    def rebuild(self, engine, batch_size=500):
+        """Drop and re-create the whole index; returns {kind: count}"""
+        counts = {}
+        with engine.begin() as conn:
+            backend = self.backend(engine)
+            backend.drop_schema(conn)
+            backend.create_schema(conn)
+            self._ready.add(engine.url)
+            for kind in KINDS:
+                rows = self._load_rows(conn, kind)
+                for start in range(0, len(rows), batch_size):
+                    backend.upsert(conn, rows[start:start + batch_size])
+                counts[kind] = len(rows)
+        return counts
+
+    def search(self, engine, q, kinds=None, limit=20):
+        """Ranked hits: [{type, id, bakery_id, title, snippet, highlights, score}]"""
+        terms = query_terms(q)
+        if not terms:
+            return []
+        kinds = [k for k in (kinds or KINDS) if k in KINDS]
+        with engine.connect() as conn:
+            self._ensure_schema(engine, conn)
+            hits = self.backend(engine).search(conn, terms, kinds, limit)
+            conn.commit()
+
+        results = []
+        for value, bakery_id, title, snippet, score in hits:
+            kind, ref_id = split_doc_id(value)
+            snippet, highlights = split_highlights(snippet)
+            results.append({
+                "type": kind,
+                "id": ref_id,
+                "bakery_id": bakery_id,
+                "title": title,
+                "snippet": snippet,
+                "highlights": highlights,
+                "score": float(score),
+            })
+        return results
+
+    def autocomplete(self, engine, prefix, limit=10):
+        """Distinct titles whose words start with the typed prefix"""
+        terms = query_terms(prefix)
+        if not terms:
+            return []
+        with engine.connect() as conn:
+            self._ensure_schema(engine, conn)
+            titles = self.backend(engine).autocomplete(conn, terms, limit)
+            conn.commit()
+
+        suggestions = []
+        seen = set()
+        for title in titles:
+            key = normalize_text(title).strip()
+            if key not in seen:
+                seen.add(key)
+                suggestions.append(title)
+        return suggestions[:limit]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,251 @@
+"""
+Compiled schema dumps and a fast JSON provider for responses.
+
+marshmallow's dump() walks every field through generic machinery per row:
+accessor lookup, Field.serialize, missing/default checks, hook dispatch.
+CompiledSchema generates a plain Python function per schema instance and
+class of object dumped, from the schema's dump fields, on first dump, and
+runs that instead. It reads loaded model columns and relationships straight
+from the instance __dict__ (everything else through getattr), converts the
+common field types inline and calls nested schemas' compiled functions
+directly. The output is the same dict marshmallow would build, key order
+included:
+
+  - Int/Float/Str/Email/Url/DateTime/Bool are converted inline with the
+    same functions marshmallow uses (int(), float(), str(),
+    datetime.isoformat, ...); any other field calls its own _serialize().
+  - Nested and List(Nested) call the nested schema's compiled function.
+  - post_dump hooks (not pass_collection / pass_original) run per row,
+    with the same arguments; a schema with pre_dump hooks, collection
+    hooks or a custom get_attribute keeps the stock dump().
+  - Mappings (anything with __getitem__) are dumped by marshmallow, whose
+    key-then-attribute lookup they need.
+
+The JSON provider encodes response bodies with orjson when it is installed
+(JSON_PROVIDER=auto|orjson|default). It keeps Flask's output rules - sorted
+keys, RFC 822 dates for raw datetimes, Decimal/UUID as strings - and falls
+back to the stdlib encoder for anything orjson rejects. Non-ASCII text is
+sent as UTF-8 instead of \\u escapes; NaN becomes null instead of invalid
+JSON.
+
+Config keys (all optional):
+    COMPILED_SERIALIZERS  false = marshmallow's stock dump() (default true)
+    JSON_PROVIDER         auto (orjson if installed, default), orjson, default
+"""
+import itertools
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import InstrumentedAttribute, Mapper, RelationshipProperty
+
+_enabled = True
+_names = itertools.count()
+
+
+class CompiledSchema(Schema):
+    """Schema whose dump() runs a function generated from its fields"""
+
+    def dump(self, obj, *, many=None):
+        many = self.many if many is None else bool(many)
+        if not _enabled or (many and obj is None):
+            return super().dump(obj, many=many)
+        dumper = compiled_dumper(self)
+        if dumper is None:
+            return super().dump(obj, many=many)
+        if many:
+            return [dumper(item, True) for item in obj]
+        return dumper(obj, False)
+
+
+def compiled_dumper(schema):
+    """The generated `dump(obj, many)` of a schema instance, or None if it can't have one"""
+    # Keyed on the dump_fields dict: Nested(only=...) copies a schema
+    # instance (__dict__ included) and then re-initializes its fields
+    fields_, dumper = schema.__dict__.get("_compiled_dump", (None, None))
+    if fields_ is schema.dump_fields:
+        return dumper
+    # Placeholder while compiling: a schema nesting itself dumps the stock way
+    schema._compiled_dump = (schema.dump_fields, None)
+    dumper = _compile(schema)
+    schema._compiled_dump = (schema.dump_fields, dumper)
+    return dumper
+
+
+def _compile(schema):
+    if schema._hooks[PRE_DUMP] or type(schema).get_attribute is not Schema.get_attribute \
+            or schema.dict_class is not dict:
+        return None
+    hooks = []
+    for attr_name, pass_collection, hook_kwargs in schema._hooks[POST_DUMP]:
+        if pass_collection or hook_kwargs.get("pass_original"):
+            return None
+        hooks.append(getattr(schema, attr_name))
+
+    # One generated function per class of object dumped
+    by_class = {}
+
+    def dump(obj, many):
+        fn = by_class.get(obj.__class__)
+        if fn is None:
+            fn = by_class[obj.__class__] = _specialize(schema, hooks, obj.__class__)
+        return fn(obj, many)
+    return dump
+
+
+def _loaded_attributes(cls):
+    """Mapped attributes of `cls` whose loaded value sits in the instance __dict__"""
+    mapper = sa_inspect(cls, raiseerr=False)
+    if not isinstance(mapper, Mapper):
+        return set()
+    names = set()
+    for prop in mapper.attrs:
+        if isinstance(prop, RelationshipProperty) and prop.lazy in ("dynamic", "write_only"):
+            continue
+        if isinstance(getattr(cls, prop.key, None), InstrumentedAttribute):
+            names.add(prop.key)
+    return names
+
+
+def _specialize(schema, hooks, cls):
+    if hasattr(cls, "__getitem__"):
+        # Mappings need marshmallow's key-then-attribute lookup
+        return lambda obj, many: Schema.dump(schema, obj, many=False)
+
+    namespace = {"missing": missing, "schema": schema}
+
+    def const(value):
+        name = f"c{next(_names)}"
+        namespace[name] = value
+        return name
+
+    loaded = _loaded_attributes(cls)
+    lines = ["def dump(obj, many):", "    ret = {}"]
+    if loaded:
+        # Loaded columns and relationships: skip the ORM descriptors
+        lines.append("    loaded = obj.__dict__")
+    for attr_name, field in schema.dump_fields.items():
+        key = field.data_key if field.data_key is not None else attr_name
+        attribute = field.attribute if field.attribute is not None else attr_name
+        if not field._CHECK_ATTRIBUTE or field.dump_default is not missing or "." in attribute:
+            # Computed fields, defaults and dotted paths: the field does it all
+            lines += [
+                f"    value = {const(field)}.serialize({attr_name!r}, obj, accessor=schema.get_attribute)",
+                "    if value is not missing:",
+                f"        ret[{key!r}] = value",
+            ]
+            continue
+        if attribute in loaded:
+            lines.append(f"    value = loaded[{attribute!r}] if {attribute!r} in loaded "
+                         f"else getattr(obj, {attribute!r}, missing)")
+        else:
+            lines.append(f"    value = getattr(obj, {attribute!r}, missing)")
+        lines += [
+            "    if value is not missing:",
+            f"        ret[{key!r}] = {_value_expr(field, attr_name, 'value', const)}",
+        ]
+    for hook in hooks:
+        lines.append(f"    ret = {const(hook)}(ret, many=many)")
+    lines.append("    return ret")
+
+    exec(compile("\n".join(lines), f"<dump {type(schema).__name__}: {cls.__name__}>", "exec"), namespace)
+    return namespace["dump"]
+
+
+def _value_expr(field, attr_name, var, const):
+    """Python expression serializing `var` (not missing) the way `field` does"""
+    serialize = type(field)._serialize
+    if serialize is fields.Number._serialize and not field.as_string \
+            and type(field)._format_num is fields.Number._format_num:
+        num_type = const(field.num_type)
+        return f"None if {var} is None else {var} if {var}.__class__ is {num_type} else {num_type}({var})"
+    if serialize is fields.String._serialize:
+        return f"None if {var} is None else {var} if {var}.__class__ is str else {const(field)}._serialize({var}, {attr_name!r}, obj)"
+    if serialize is fields.DateTime._serialize and field.format in field.SERIALIZATION_FUNCS:
+        return f"None if {var} is None else {const(field.SERIALIZATION_FUNCS[field.format])}({var})"
+    if serialize is fields.Boolean._serialize:
+        return f"{var} if {var} is None or {var} is True or {var} is False else {const(field)}._serialize({var}, {attr_name!r}, obj)"
+    if serialize is fields.Nested._serialize:
+        nested = field.schema
+        many = nested.many or field.many
+        dumper = compiled_dumper(nested)
+        if dumper is None:
+            return f"None if {var} is None else {const(nested)}.dump({var}, many={many})"
+        dumper = const(dumper)
+        if many:
+            return f"None if {var} is None else [{dumper}(item, True) for item in {var}]"
+        return f"None if {var} is None else {dumper}({var}, False)"
+    if serialize is fields.List._serialize and type(field.inner)._serialize is fields.Nested._serialize:
+        inner = field.inner.schema
+        many = inner.many or field.inner.many
+        dumper = compiled_dumper(inner)
+        if dumper is None or many:
+            return f"{const(field)}._serialize({var}, {attr_name!r}, obj)"
+        dumper = const(dumper)
+        return f"None if {var} is None else [None if item is None else {dumper}(item, False) for item in {var}]"
+    return f"{const(field)}._serialize({var}, {attr_name!r}, obj)"
+
+
+# ---- JSON ------------------------------------------------------------
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON behaviour, encoded by orjson"""
+
+    def __init__(self, app):
+        import orjson
+        super().__init__(app)
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _encode(self, obj, indent=False):
+        option = self._option
+        if self.sort_keys:
+            option |= self._orjson.OPT_SORT_KEYS
+        if indent:
+            option |= self._orjson.OPT_INDENT_2
+        return self._orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) - {"indent", "separators"} or kwargs.get("indent") not in (None, 2) \
+                or kwargs.get("separators") not in (None, (",", ":")):
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._encode(obj, indent=bool(kwargs.get("indent"))).decode()
+        except TypeError:
+            # Integers over 64 bits and the like; the stdlib decides
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return self._orjson.loads(s)
+        except ValueError:
+            # Same result (or error) as Flask's own decoder
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = self._encode(obj, indent=indent) + b"\n"
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_serialization(app):
+    global _enabled
+    _enabled = app.config.get("COMPILED_SERIALIZERS", True)
+
+    provider = app.config.get("JSON_PROVIDER", "auto")
+    if provider not in ("auto", "orjson", "default"):
+        raise ValueError(f"JSON_PROVIDER must be auto, orjson or default, not {provider!r}")
+    if provider == "default":
+        return
+    try:
+        app.json = OrjsonProvider(app)
+    except ImportError:
+        if provider == "orjson":
+            raise
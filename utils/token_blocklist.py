@@ -0,0 +1,172 @@
+"""
+Revoked-JWT lookups without a database query per request.
+
+Two in-memory layers sit in front of the token_blacklist table:
+- a bloom filter of every revoked JTI: "definitely not revoked" answers
+  (the common case) need no I/O at all;
+- an LRU of JTIs confirmed revoked, so repeat hits skip the DB too.
+Only bloom-filter hits that miss the LRU (real revocations or the rare
+false positive) go to the database.
+
+Workers learn about each other's logouts by polling the table for recent
+rows every BLOCKLIST_SYNC_INTERVAL seconds, which bounds how long a token
+revoked in another worker can still be accepted. Rows whose token has
+expired anyway are purged every BLOCKLIST_PURGE_INTERVAL seconds and the
+filter is rebuilt.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models.token_blacklist import TokenBlacklist
+
+# Re-read rows this far behind the watermark: transactions can commit out
+# of created_at order across workers
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """Not thread-safe for writers: add() is a read-modify-write of shared bytes"""
+
+    def __init__(self, capacity=100_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        # Kirsch-Mitzenmacher: k positions from two 64-bit hashes
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class TokenBlocklist:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._revoked = OrderedDict()
+        self._watermark = None
+        self._synced_at = 0.0
+        self._purged_at = 0.0
+        self.sync_interval = 2
+        self.purge_interval = 3600
+        self.cache_size = 10_000
+        self.capacity = 100_000
+
+    def init_app(self, app):
+        self.sync_interval = app.config.get("BLOCKLIST_SYNC_INTERVAL", self.sync_interval)
+        self.purge_interval = app.config.get("BLOCKLIST_PURGE_INTERVAL", self.purge_interval)
+        self.cache_size = app.config.get("BLOCKLIST_CACHE_SIZE", self.cache_size)
+        self.capacity = app.config.get("BLOCKLIST_BLOOM_CAPACITY", self.capacity)
+
+    # ---- public API -------------------------------------------------
+
+    def is_revoked(self, jti):
+        self._refresh()
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            if jti in self._revoked:
+                self._revoked.move_to_end(jti)
+                return True
+
+        revoked = db.session.query(TokenBlacklist.id).filter_by(jti=jti).first() is not None
+        if revoked:
+            self._remember(jti)
+        return revoked
+
+    def revoke(self, jti, expires_at=None):
+        """Persist a revoked JTI and make this worker see it immediately"""
+        if not db.session.query(TokenBlacklist.id).filter_by(jti=jti).first():
+            db.session.add(TokenBlacklist(jti=jti, expires_at=expires_at))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A concurrent logout with the same token (double click,
+                # retry) committed it first: already revoked
+                db.session.rollback()
+        self._refresh()
+        with self._lock:
+            self._bloom.add(jti)
+        self._remember(jti)
+
+    def purge_expired(self):
+        """Delete rows for tokens past their own expiry and rebuild the filter"""
+        # Own connection: never commits whatever the request session holds
+        with db.engine.begin() as conn:
+            deleted = conn.execute(
+                delete(TokenBlacklist).where(TokenBlacklist.expires_at < datetime.utcnow())
+            ).rowcount
+        self._rebuild()
+        return deleted
+
+    # ---- internals --------------------------------------------------
+
+    def _remember(self, jti):
+        with self._lock:
+            self._revoked[jti] = True
+            self._revoked.move_to_end(jti)
+            while len(self._revoked) > self.cache_size:
+                self._revoked.popitem(last=False)
+
+    def _rebuild(self):
+        bloom = BloomFilter(self.capacity)
+        watermark = None
+        rows = db.session.query(TokenBlacklist.jti, TokenBlacklist.created_at).filter(
+            (TokenBlacklist.expires_at.is_(None)) | (TokenBlacklist.expires_at >= datetime.utcnow())
+        )
+        for jti, created_at in rows.yield_per(1000):
+            bloom.add(jti)
+            if created_at and (watermark is None or created_at > watermark):
+                watermark = created_at
+        with self._lock:
+            self._bloom = bloom
+            self._revoked.clear()
+            self._watermark = watermark
+            self._synced_at = self._purged_at = time.monotonic()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._bloom is None:
+            self._rebuild()
+            return
+        if now - self._purged_at >= self.purge_interval:
+            self.purge_expired()
+            return
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            # Claim this sync: one thread queries, the others go on with the
+            # current filter
+            self._synced_at = now
+            since = self._watermark
+
+        query = db.session.query(TokenBlacklist.jti, TokenBlacklist.created_at)
+        if since is not None:
+            query = query.filter(TokenBlacklist.created_at >= since - SYNC_OVERLAP)
+        rows = query.all()
+        with self._lock:
+            watermark = self._watermark
+            for jti, created_at in rows:
+                self._bloom.add(jti)
+                if created_at and (watermark is None or created_at > watermark):
+                    watermark = created_at
+            self._watermark = watermark
+
+
+token_blocklist = TokenBlocklist()